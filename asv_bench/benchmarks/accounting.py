@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+from tonyear import (
+    Ledger,
+    TonYearIndex,
+    calculate_portfolio,
+    calculate_tonyears,
+    calculate_tonyears_grid,
+    get_baseline_curve,
+    simulate_reversals,
+)
+
+METHODS = ["mc", "lashof", "car", "qc"]
+
+
+class CalculateTonyears:
+    params = (METHODS, [100, 1000, 10000], ["trapz", "analytic"])
+    param_names = ["method", "time_horizon", "integration"]
+
+    def setup(self, method, time_horizon, integration):
+        if integration == "analytic":
+            self.baseline = "joos_2013"
+        else:
+            self.baseline = get_baseline_curve("joos_2013", time_horizon + 1)
+
+    def time_calculate_tonyears(self, method, time_horizon, integration):
+        calculate_tonyears(
+            method, self.baseline, time_horizon, time_horizon // 2, 0.02, integration
+        )
+
+
+class DelaySweep:
+    """The list-comprehension-over-delays pattern from the notebooks"""
+
+    params = ([10, 100, 1000], [1001, 10000])
+    param_names = ["delays", "time_horizon"]
+
+    def setup(self, delays, time_horizon):
+        self.baseline = get_baseline_curve("joos_2013", time_horizon + 1)
+        self.delays = np.linspace(1, time_horizon, delays).astype(int)
+
+    def time_loop(self, delays, time_horizon):
+        for delay in self.delays:
+            calculate_tonyears("lashof", self.baseline, time_horizon, delay, 0.02)
+
+    def time_loop_lazy(self, delays, time_horizon):
+        for delay in self.delays:
+            calculate_tonyears(
+                "lashof", self.baseline, time_horizon, delay, 0.02, lazy=True
+            )
+
+    def time_tonyear_index(self, delays, time_horizon):
+        index = TonYearIndex(self.baseline, 0.02)
+        index.num_for_equivalence("lashof", time_horizon, self.delays)
+
+
+class Grid:
+    params = ([10, 100, 1000], [10, 100], ["trapz", "analytic"])
+    param_names = ["delays", "time_horizons", "integration"]
+
+    def setup(self, delays, time_horizons, integration):
+        self.baseline = "joos_2013"
+        if integration == "trapz":
+            self.baseline = get_baseline_curve("joos_2013", 10001)
+        self.horizons = np.linspace(100, 10000, time_horizons).astype(int)
+        self.delays = np.linspace(1, 100, delays).astype(int)
+        self.discount_rates = np.linspace(0, 0.1, 10)
+
+    def time_calculate_tonyears_grid(self, delays, time_horizons, integration):
+        calculate_tonyears_grid(
+            METHODS,
+            self.baseline,
+            self.horizons,
+            self.delays,
+            self.discount_rates,
+            integration=integration,
+        )
+
+    def peakmem_calculate_tonyears_grid(self, delays, time_horizons, integration):
+        calculate_tonyears_grid(
+            METHODS,
+            self.baseline,
+            self.horizons,
+            self.delays,
+            self.discount_rates,
+            integration=integration,
+        )
+
+
+class InverseSolve:
+    params = ([1, 1000, 100000], ["lashof", "mc"])
+    param_names = ["targets", "method"]
+
+    def setup(self, targets, method):
+        self.index = TonYearIndex(get_baseline_curve("joos_2013", 1001), 0.02)
+        self.targets = np.random.default_rng(0).uniform(1, 100, targets)
+
+    def time_solve_delay(self, targets, method):
+        self.index.solve_delay(method, 1000, self.targets)
+
+    def time_solve_time_horizon(self, targets, method):
+        self.index.solve_time_horizon(method, 30, self.targets)
+
+
+class Reversals:
+    params = (["constant", "weibull", "empirical"], [10**5, 10**7])
+    param_names = ["hazard", "draws"]
+    timeout = 300
+
+    def time_simulate_reversals(self, hazard, draws):
+        simulate_reversals(
+            "lashof",
+            "joos_2013",
+            100,
+            hazard,
+            draws,
+            rate=0.01,
+            shape=1.5,
+            scale=80,
+            table=np.full(100, 0.01),
+            seed=0,
+        )
+
+
+class IncrementalLedger:
+    params = ([10**5, 10**6], [1000])
+    param_names = ["projects", "changed"]
+    timeout = 300
+
+    def setup(self, projects, changed):
+        rng = np.random.default_rng(0)
+        self.projects = pd.DataFrame(
+            {
+                "method": rng.choice(METHODS, projects),
+                "tonnes": rng.uniform(1, 100, projects),
+                "time_horizon": rng.choice([100, 1000], projects),
+                "delay": rng.integers(1, 100, projects),
+                "vintage": rng.integers(2000, 2025, projects),
+            }
+        )
+        self.ledger = Ledger()
+        self.ledger.append(self.projects)
+        self.changes = pd.DataFrame(
+            {"project": np.arange(changed), "delay": rng.integers(1, 100, changed)}
+        )
+
+    def time_full_recompute(self, projects, changed):
+        calculate_portfolio(self.projects)
+
+    def time_update(self, projects, changed):
+        self.ledger.update(self.changes)
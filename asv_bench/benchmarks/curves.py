@@ -0,0 +1,43 @@
+import numpy as np
+
+from tonyear import get_baseline_curve, joos_2013
+from tonyear.core import _cached_baseline_curve, sum_of_exponentials
+
+
+class BaselineCurve:
+    params = (["joos_2013", "ipcc_2000"], [100, 1001, 10000])
+    param_names = ["curve_name", "t_horizon"]
+
+    def setup(self, curve_name, t_horizon):
+        get_baseline_curve(curve_name, t_horizon)
+
+    def time_get_baseline_curve_cached(self, curve_name, t_horizon):
+        get_baseline_curve(curve_name, t_horizon)
+
+    def time_get_baseline_curve_uncached(self, curve_name, t_horizon):
+        _cached_baseline_curve.cache_clear()
+        get_baseline_curve(curve_name, t_horizon)
+
+    def time_joos_2013(self, curve_name, t_horizon):
+        joos_2013(t_horizon)
+
+
+class SumOfExponentials:
+    params = ([1, 1000, 100000], [100, 1001, 10000])
+    param_names = ["curves", "t_horizon"]
+
+    def setup(self, curves, t_horizon):
+        if curves * t_horizon > 1e8:
+            raise NotImplementedError("skipped: result would not fit in memory")
+        rng = np.random.default_rng(0)
+        self.a = rng.uniform(0, 0.3, (curves, 4))
+        self.tau = np.concatenate(
+            (np.zeros((curves, 1)), rng.uniform(1, 400, (curves, 3))), axis=1
+        )
+        self.t = np.arange(t_horizon)
+
+    def time_sum_of_exponentials(self, curves, t_horizon):
+        sum_of_exponentials(self.a, self.tau, self.t)
+
+    def peakmem_sum_of_exponentials(self, curves, t_horizon):
+        sum_of_exponentials(self.a, self.tau, self.t)
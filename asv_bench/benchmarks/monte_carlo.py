@@ -0,0 +1,113 @@
+import numpy as np
+
+from tonyear import (
+    calculate_forcing,
+    calculate_sensitivity,
+    calculate_tonyears_monte_carlo,
+    joos_2013_monte_carlo,
+    joos_2013_monte_carlo_summary,
+)
+from tonyear.ghgforcing import sample_gas_parameters, sample_joos_2013_parameters
+
+
+class MonteCarlo:
+    params = ([100, 10000, 100000], [101, 1001])
+    param_names = ["runs", "t_horizon"]
+    timeout = 300
+
+    def time_joos_2013_monte_carlo(self, runs, t_horizon):
+        joos_2013_monte_carlo(runs, t_horizon, seed=0)
+
+    def peakmem_joos_2013_monte_carlo(self, runs, t_horizon):
+        joos_2013_monte_carlo(runs, t_horizon, seed=0)
+
+    def time_joos_2013_monte_carlo_float32(self, runs, t_horizon):
+        joos_2013_monte_carlo(runs, t_horizon, seed=0, dtype="float32")
+
+
+class MonteCarloSummary:
+    """Streaming summaries, up to ensembles too large to hold in memory"""
+
+    params = ([100, 10000, 1000000], ["exact", "sketch"])
+    param_names = ["runs", "percentiles"]
+    timeout = 600
+
+    def time_joos_2013_monte_carlo_summary(self, runs, percentiles):
+        joos_2013_monte_carlo_summary(runs, 1001, seed=0, percentiles=percentiles)
+
+    def peakmem_joos_2013_monte_carlo_summary(self, runs, percentiles):
+        joos_2013_monte_carlo_summary(runs, 1001, seed=0, percentiles=percentiles)
+
+
+class MonteCarloTonyears:
+    params = ([100, 10000, 1000000], ["trapz", "analytic"])
+    param_names = ["runs", "integration"]
+    timeout = 600
+
+    def time_calculate_tonyears_monte_carlo(self, runs, integration):
+        calculate_tonyears_monte_carlo(
+            "lashof", 100, 30, 0.02, runs=runs, seed=0, integration=integration
+        )
+
+    def peakmem_calculate_tonyears_monte_carlo(self, runs, integration):
+        calculate_tonyears_monte_carlo(
+            "lashof", 100, 30, 0.02, runs=runs, seed=0, integration=integration
+        )
+
+
+class MultiGasForcing:
+    """Forcing of CO2, CH4 and N2O emission scenarios across Monte Carlo runs"""
+
+    params = ([1, 100], [100, 1000])
+    param_names = ["scenarios", "runs"]
+
+    def setup(self, scenarios, runs):
+        rng = np.random.default_rng(0)
+        self.emissions = rng.uniform(size=(scenarios, 3, 200))
+        self.parameters = sample_gas_parameters(runs=runs, seed=0)
+
+    def time_calculate_forcing(self, scenarios, runs):
+        calculate_forcing(self.emissions, parameters=self.parameters)
+
+    def peakmem_calculate_forcing(self, scenarios, runs):
+        calculate_forcing(self.emissions, parameters=self.parameters)
+
+
+class Samplers:
+    params = (["random", "sobol", "lhs", "antithetic"], [1024, 65536])
+    param_names = ["sampler", "runs"]
+
+    def time_sample_joos_2013_parameters(self, sampler, runs):
+        sample_joos_2013_parameters(runs, seed=0, sampler=sampler)
+
+    def track_mean_error(self, sampler, runs):
+        """Error in the mean Lashof equivalence ratio against a large Sobol' reference"""
+        if not hasattr(self, "reference"):
+            self.reference = self._mean(2**20, "sobol", 1)
+        return abs(self._mean(runs, sampler, 0) - self.reference)
+
+    @staticmethod
+    def _mean(runs, sampler, seed):
+        out = calculate_tonyears_monte_carlo(
+            "lashof",
+            100,
+            50,
+            0,
+            runs=runs,
+            seed=seed,
+            sampler=sampler,
+            integration="analytic",
+            chunk_size=2**20,
+        )
+        return out["num_for_equivalence"].mean()
+
+
+class Sensitivity:
+    params = [1024, 16384]
+    param_names = ["runs"]
+    timeout = 300
+
+    def time_calculate_sensitivity(self, runs):
+        calculate_sensitivity(
+            "lashof", delay=(1, 100), discount_rate=(0, 0.03), runs=runs, seed=0
+        )
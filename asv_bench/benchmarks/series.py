@@ -0,0 +1,27 @@
+import numpy as np
+
+from tonyear import (
+    calculate_tonyears_series,
+    get_atmospheric_burden,
+    get_baseline_curve,
+)
+
+
+class AtmosphericBurden:
+    params = (["direct", "fft", "auto"], [50, 1001, 5000], [1, 100])
+    param_names = ["method", "length", "series"]
+
+    def setup(self, method, length, series):
+        self.baseline = get_baseline_curve("joos_2013", length)
+        self.flux = np.random.default_rng(0).normal(size=(series, length))
+
+    def time_get_atmospheric_burden(self, method, length, series):
+        get_atmospheric_burden(self.flux, self.baseline, method=method)
+
+
+class TonYearsSeries:
+    def setup(self):
+        self.flux = np.random.default_rng(0).normal(size=(100, 1001))
+
+    def time_calculate_tonyears_series(self):
+        calculate_tonyears_series(self.flux, "joos_2013", 1000, 0.02)
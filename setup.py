@@ -26,6 +26,16 @@ setup(
     include_package_data=True,
     python_requires=PYTHON_REQUIRES,
     install_requires=INSTALL_REQUIRES,
+    extras_require={
+        "parquet": ["pyarrow"],
+        "xarray": ["xarray", "dask[array]", "zarr"],
+    },
+    entry_points={
+        "console_scripts": [
+            "tonyear=tonyear.cli:main",
+            "tonyear-server=tonyear.server:main",
+        ]
+    },
     tests_require=["pytest"],
     license="MIT",
     keywords="carbon, climate, tonyear",
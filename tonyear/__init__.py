@@ -1,12 +1,85 @@
 # flake8: noqa
 
-from pkg_resources import DistributionNotFound, get_distribution
+import importlib
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version as _get_version
+from typing import TYPE_CHECKING
+
+from .core import (
+    TonYearIndex,
+    TonYearResult,
+    calculate_delay_for_equivalence,
+    calculate_time_horizon_for_equivalence,
+    calculate_tonyears,
+    calculate_tonyears_grid,
+    get_baseline_curve,
+    get_time_grid,
+    print_benefit_report,
+    register_baseline_curve,
+)
+from .profiling import profile
+
+# Functions from modules that need pandas or scipy are imported on first access, so that
+# `import tonyear` stays fast for callers that only use the core accounting functions
+_LAZY_IMPORTS = {
+    "ResultCache": "cache",
+    "calculate_tonyears_dataset": "datasets",
+    "joos_2013_monte_carlo_dataset": "datasets",
+    "to_dataset": "datasets",
+    "calculate_forcing": "ghgforcing",
+    "calculate_tonyears_monte_carlo": "ghgforcing",
+    "global_warming_potential": "ghgforcing",
+    "iter_joos_2013_monte_carlo": "ghgforcing",
+    "joos_2013": "ghgforcing",
+    "joos_2013_monte_carlo": "ghgforcing",
+    "joos_2013_monte_carlo_summary": "ghgforcing",
+    "Ledger": "ledger",
+    "calculate_portfolio": "portfolio",
+    "calculate_sensitivity": "sensitivity",
+    "sample_storage_durations": "reversal",
+    "simulate_reversals": "reversal",
+    "calculate_tonyears_series": "series",
+    "get_atmospheric_burden": "series",
+}
+
+if TYPE_CHECKING:
+    from .cache import ResultCache
+    from .datasets import (
+        calculate_tonyears_dataset,
+        joos_2013_monte_carlo_dataset,
+        to_dataset,
+    )
+    from .ghgforcing import (
+        calculate_forcing,
+        calculate_tonyears_monte_carlo,
+        global_warming_potential,
+        iter_joos_2013_monte_carlo,
+        joos_2013,
+        joos_2013_monte_carlo,
+        joos_2013_monte_carlo_summary,
+    )
+    from .ledger import Ledger
+    from .portfolio import calculate_portfolio
+    from .reversal import sample_storage_durations, simulate_reversals
+    from .sensitivity import calculate_sensitivity
+    from .series import calculate_tonyears_series, get_atmospheric_burden
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(f".{_LAZY_IMPORTS[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
 
-from .core import calculate_tonyears, get_baseline_curve, print_benefit_report
-from .ghgforcing import joos_2013, joos_2013_monte_carlo
 
 try:
-    version = get_distribution(__name__).version
-except DistributionNotFound:  # pragma: no cover
+    version = _get_version(__name__)
+except PackageNotFoundError:  # pragma: no cover
     version = "0.0.0"  # pragma: no cover
 __version__ = version
@@ -0,0 +1,325 @@
+"""Persistent on-disk cache for expensive ensembles and sweeps"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from collections.abc import Mapping
+from contextlib import closing
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .profiling import count
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    function TEXT NOT NULL,
+    structure TEXT NOT NULL,
+    nbytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+class _Uncacheable(Exception):
+    """Raised for calls whose result does not depend on their arguments alone"""
+
+
+def _canonical(value):
+    """JSON-serializable form of an argument value, used to hash a call"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise _Uncacheable
+        digest = hashlib.sha256(np.ascontiguousarray(value).data).hexdigest()
+        return {"ndarray": [value.dtype.str, list(value.shape), digest]}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, Mapping):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, np.dtype) or (
+        isinstance(value, type) and issubclass(value, np.generic)
+    ):
+        return {"dtype": np.dtype(value).str}
+    if isinstance(value, np.random.SeedSequence):
+        return {"seed_sequence": [_canonical(value.entropy), list(value.spawn_key)]}
+    if type(value).__module__.startswith("pandas"):
+        import pandas as pd
+
+        if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+            hashed = pd.util.hash_pandas_object(value, index=True).to_numpy()
+            labels = list(value.columns) if isinstance(value, pd.DataFrame) else []
+            return {"pandas": [_canonical(hashed), _canonical(labels)]}
+    # e.g. np.random.Generator, whose results depend on its state
+    raise _Uncacheable
+
+
+def _function_id(func: Callable) -> Tuple[str, str]:
+    """Qualified name of a function and a hash of its source code"""
+    name = f"{func.__module__}.{func.__qualname__}"
+    try:
+        source = inspect.getsource(func).encode()
+    except (OSError, TypeError):
+        source = getattr(getattr(func, "__code__", None), "co_code", name.encode())
+    return name, hashlib.sha256(source).hexdigest()
+
+
+class ResultCache:
+    """Opt-in persistent cache of function results in a local directory.
+
+    Results are keyed by a SHA-256 hash of the function (its qualified name and source
+    code), its arguments (including defaults, so ``f(10)`` and ``f(10, seed=0)`` share an
+    entry if ``seed=0`` is the default), and the tonyear version. Arrays are stored as
+    ``.npy`` files and loaded back as read-only memory maps, so a repeat call returns in
+    milliseconds whatever the size of the result. Other values are stored in a small
+    SQLite index alongside the size and last access time of each entry, and least
+    recently used entries are evicted once the cache grows past ``max_bytes``.
+
+    Calls that are not reproducible are run without the cache: calls with a `seed`
+    argument that is None or a ``np.random.Generator``, and calls with argument values
+    that cannot be hashed by content.
+
+    Results may be arrays, numbers, strings, None, pandas DataFrames and Series of numeric
+    columns, and tuples, lists and dicts of these.
+
+    Parameters
+    ----------
+    directory : str or os.PathLike
+        Directory holding the cache, created if needed. Several processes may share it.
+    max_bytes : int, optional
+        Maximum total size of the stored arrays (default 1 GiB), or None for no limit
+
+    Examples
+    --------
+    >>> cache = ResultCache("~/.cache/tonyear")
+    >>> summary, ensemble = cache(joos_2013_monte_carlo, runs=100000, seed=0)
+
+    or, equivalently,
+
+    >>> monte_carlo = cache.memoize(joos_2013_monte_carlo)
+    >>> summary, ensemble = monte_carlo(runs=100000, seed=0)
+    """
+
+    def __init__(self, directory, max_bytes: Optional[int] = 2**30) -> None:
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError("max_bytes cannot be negative")
+        self.directory = os.path.abspath(os.path.expanduser(os.fspath(directory)))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(os.path.join(self.directory, "index.sqlite"), timeout=60)
+
+    def key(self, func: Callable, *args, **kwargs) -> Optional[str]:
+        """Cache key of a call, or None if the call cannot be cached"""
+        from . import __version__
+
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        seed = bound.arguments.get("seed", 0)
+        if seed is None or isinstance(seed, np.random.Generator):
+            return None
+        try:
+            arguments = _canonical(dict(bound.arguments))
+        except _Uncacheable:
+            return None
+        payload = json.dumps(
+            [_function_id(func), arguments, __version__], sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def __call__(self, func: Callable, *args, **kwargs) -> Any:
+        """Return ``func(*args, **kwargs)``, from the cache if it was stored before"""
+        key = self.key(func, *args, **kwargs)
+        if key is None:
+            self.bypasses += 1
+            count("result_cache.bypasses")
+            return func(*args, **kwargs)
+        found, value = self._load(key)
+        if found:
+            self.hits += 1
+            count("result_cache.hits")
+            return value
+        self.misses += 1
+        count("result_cache.misses")
+        value = func(*args, **kwargs)
+        self._store(key, _function_id(func)[0], value)
+        return value
+
+    def memoize(self, func: Callable) -> Callable:
+        """Wrap ``func`` so that its calls go through the cache"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self(func, *args, **kwargs)
+
+        return wrapper
+
+    def _load(self, key: str) -> Tuple[bool, Any]:
+        with closing(self._connect()) as db, db:
+            row = db.execute(
+                "SELECT structure FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None
+            try:
+                value = _decode(json.loads(row[0]), os.path.join(self.directory, key))
+            except FileNotFoundError:
+                # files removed from under the index
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return False, None
+            db.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        return True, value
+
+    def _store(self, key: str, function: str, value: Any) -> None:
+        arrays: List[np.ndarray] = []
+        structure = json.dumps(_encode(value, arrays))
+        nbytes = sum(array.nbytes for array in arrays)
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return
+
+        # write into a private directory first so readers never see partial entries
+        path = os.path.join(self.directory, key)
+        scratch = os.path.join(self.directory, f".{key}-{uuid.uuid4().hex}")
+        os.makedirs(scratch)
+        for i, array in enumerate(arrays):
+            np.save(os.path.join(scratch, f"{i}.npy"), array, allow_pickle=False)
+        try:
+            os.replace(scratch, path)
+        except OSError:
+            # stored concurrently by another process
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, function, structure, nbytes, now, now),
+            )
+            if self.max_bytes is not None:
+                self._evict(db, self.max_bytes, keep=key)
+
+    def _evict(self, db: sqlite3.Connection, max_bytes: int, keep: str = "") -> None:
+        """Remove least recently used entries until the total size is at most max_bytes"""
+        total = db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+        if total <= max_bytes:
+            return
+        rows = db.execute(
+            "SELECT key, nbytes FROM entries WHERE key != ? ORDER BY accessed", (keep,)
+        ).fetchall()
+        for key, nbytes in rows:
+            if total <= max_bytes:
+                break
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            total -= nbytes
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the stored arrays"""
+        with closing(self._connect()) as db:
+            return db.execute(
+                "SELECT COALESCE(SUM(nbytes), 0) FROM entries"
+            ).fetchone()[0]
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with closing(self._connect()) as db, db:
+            self._evict(db, 0)
+
+
+def _encode(value, arrays: List[np.ndarray]):
+    """JSON structure of a result, with arrays replaced by their index in ``arrays``"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise TypeError("Arrays of Python objects cannot be cached")
+        arrays.append(value)
+        return {"__array__": len(arrays) - 1}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(item, arrays) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item, arrays) for item in value]
+    if isinstance(value, Mapping):
+        if not all(isinstance(k, str) for k in value):
+            raise TypeError("Only mappings with string keys can be cached")
+        return {"__dict__": {k: _encode(v, arrays) for k, v in value.items()}}
+    if type(value).__module__.startswith("pandas"):
+        import pandas as pd
+
+        if isinstance(value, pd.Series):
+            return {
+                "__series__": {
+                    "values": _encode(value.to_numpy(), arrays),
+                    "index": _encode(value.index.to_numpy(), arrays),
+                    "index_name": value.index.name,
+                    "name": value.name,
+                }
+            }
+        if isinstance(value, pd.DataFrame):
+            return {
+                "__frame__": {
+                    "columns": [_encode(value[c].to_numpy(), arrays) for c in value],
+                    "labels": list(value.columns),
+                    "index": _encode(value.index.to_numpy(), arrays),
+                    "index_name": value.index.name,
+                }
+            }
+    raise TypeError(f"Results of type {type(value).__name__} cannot be cached")
+
+
+def _decode(structure, path: str):
+    """Rebuild a result from its JSON structure, memory-mapping its arrays from ``path``"""
+    if isinstance(structure, list):
+        return [_decode(item, path) for item in structure]
+    if not isinstance(structure, dict):
+        return structure
+    if "__array__" in structure:
+        return np.load(
+            os.path.join(path, f"{structure['__array__']}.npy"), mmap_mode="r"
+        )
+    if "__tuple__" in structure:
+        return tuple(_decode(item, path) for item in structure["__tuple__"])
+    if "__dict__" in structure:
+        return {k: _decode(v, path) for k, v in structure["__dict__"].items()}
+
+    import pandas as pd
+
+    if "__series__" in structure:
+        series = structure["__series__"]
+        return pd.Series(
+            _decode(series["values"], path),
+            index=pd.Index(_decode(series["index"], path), name=series["index_name"]),
+            name=series["name"],
+        )
+    frame = structure["__frame__"]
+    columns = [_decode(column, path) for column in frame["columns"]]
+    return pd.DataFrame(
+        dict(zip(range(len(columns)), columns)),
+        index=pd.Index(_decode(frame["index"], path), name=frame["index_name"]),
+    ).set_axis(frame["labels"], axis=1)
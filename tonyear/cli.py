@@ -0,0 +1,227 @@
+"""Command line batch runner: ``tonyear scenarios.csv -o results.parquet``"""
+
+import argparse
+import os
+import sys
+from typing import IO, Any, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .core import METHODS
+from .parallel import imap_blocks
+from .portfolio import _check_scenarios, evaluate_scenarios
+
+INPUT_FORMATS = ("csv", "parquet", "jsonl")
+OUTPUT_FORMATS = ("csv", "parquet")
+REQUIRED_COLUMNS = ["method", "time_horizon", "delay"]
+OPTIONAL_COLUMNS = {"curve": "joos_2013", "discount_rate": 0.0}
+REPORT_KEYS = ["method", "curve", "time_horizon", "discount_rate"]
+
+
+def _format(path: Optional[str], fmt: Optional[str], formats: tuple) -> str:
+    """File format from an explicit option or the file extension (csv for stdin/stdout)"""
+    if fmt is None:
+        if path is None or path == "-":
+            return "csv"
+        fmt = os.path.splitext(path)[1].lstrip(".").lower()
+        fmt = {"pq": "parquet", "ndjson": "jsonl"}.get(fmt, fmt)
+    if fmt not in formats:
+        raise ValueError(
+            f"Unsupported file format {fmt}, expected one of {', '.join(formats)}"
+        )
+    return fmt
+
+
+def read_scenarios(path: str, fmt: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read a scenario table in chunks of at most ``chunk_size`` rows"""
+    source = sys.stdin if path == "-" else path
+    if fmt == "csv":
+        yield from pd.read_csv(source, chunksize=chunk_size)
+    elif fmt == "jsonl":
+        yield from pd.read_json(source, lines=True, chunksize=chunk_size)
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:  # pragma: no cover
+            raise ImportError("Reading Parquet files requires pyarrow") from None
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+def evaluate_chunk(chunk: pd.DataFrame, integration: str = "trapz") -> pd.DataFrame:
+    """Evaluate one chunk of scenarios, appending the ton-year results as columns"""
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing scenario columns: {', '.join(missing)}")
+    chunk = chunk.copy()
+    if "curve" not in chunk.columns and "baseline" in chunk.columns:
+        chunk = chunk.rename(columns={"baseline": "curve"})
+    for column, default in OPTIONAL_COLUMNS.items():
+        if column not in chunk.columns:
+            chunk[column] = default
+    unknown = set(chunk["method"]) - set(METHODS)
+    if unknown:
+        raise ValueError(f"No ton-year accounting method called {sorted(unknown)[0]}")
+
+    # as in calculate_portfolio, rather than truncating fractional years or writing NaN
+    _check_scenarios(chunk["time_horizon"], chunk["delay"])
+
+    # fixed dtypes keep the schema identical across chunks
+    chunk = chunk.astype(
+        {
+            "method": str,
+            "curve": str,
+            "time_horizon": np.int64,
+            "delay": np.int64,
+            "discount_rate": np.float64,
+        }
+    )
+
+    cost, benefit = evaluate_scenarios(
+        chunk.rename(columns={"curve": "baseline"}), integration
+    )
+    chunk["baseline_atm_cost"] = cost
+    chunk["benefit"] = benefit
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chunk["num_for_equivalence"] = cost / benefit
+    return chunk
+
+
+class _ResultWriter:
+    """Append result chunks to a CSV or Parquet file (or CSV on stdout)"""
+
+    def __init__(self, path: Optional[str], fmt: str) -> None:
+        self.path = path
+        self.fmt = fmt
+        self._file: Optional[IO] = None
+        self._parquet: Any = None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.fmt == "csv":
+            header = self._file is None
+            if self._file is None:
+                if self.path is None or self.path == "-":
+                    self._file = sys.stdout
+                else:
+                    self._file = open(self.path, "w", newline="")
+            chunk.to_csv(self._file, header=header, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+
+    def close(self) -> None:
+        if self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def _report_partial(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Mergeable per-chunk statistics for the summary report"""
+    grouped = chunk.groupby(REPORT_KEYS)
+    return pd.DataFrame(
+        {
+            "scenarios": grouped.size(),
+            "benefit_sum": grouped["benefit"].sum(),
+            "ratio_sum": grouped["num_for_equivalence"].sum(),
+            "ratio_min": grouped["num_for_equivalence"].min(),
+            "ratio_max": grouped["num_for_equivalence"].max(),
+        }
+    )
+
+
+def summary_report(partials: List[pd.DataFrame]) -> pd.DataFrame:
+    """Combine per-chunk statistics into one row per method, curve, horizon and rate"""
+    combined = pd.concat(partials).groupby(level=REPORT_KEYS)
+    totals = combined[["scenarios", "benefit_sum", "ratio_sum"]].sum()
+    return pd.DataFrame(
+        {
+            "scenarios": totals["scenarios"],
+            "mean_benefit": totals["benefit_sum"] / totals["scenarios"],
+            "mean_num_for_equivalence": totals["ratio_sum"] / totals["scenarios"],
+            "min_num_for_equivalence": combined["ratio_min"].min(),
+            "max_num_for_equivalence": combined["ratio_max"].max(),
+        }
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="tonyear",
+        description=(
+            "Evaluate a table of ton-year scenarios. The input needs method, time_horizon and "
+            "delay columns, and optionally curve (default joos_2013) and discount_rate "
+            "(default 0). Time horizons and delays must be whole years, with delays no longer "
+            "than the time horizon. Results are appended as baseline_atm_cost, benefit and "
+            "num_for_equivalence columns."
+        ),
+    )
+    parser.add_argument(
+        "input", help="scenario table (CSV, Parquet or JSONL), '-' for stdin"
+    )
+    parser.add_argument(
+        "-o", "--output", help="output file (CSV or Parquet); CSV on stdout if omitted"
+    )
+    parser.add_argument("--input-format", choices=INPUT_FORMATS)
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS)
+    parser.add_argument(
+        "--chunk-size", type=int, default=100000, help="rows evaluated per task"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of worker processes"
+    )
+    parser.add_argument("--integration", choices=("trapz", "analytic"), default="trapz")
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help=(
+            "print a summary for each method, curve, time horizon and discount rate; rows "
+            "are then only written if --output is given"
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        if args.chunk_size <= 0:
+            raise ValueError("chunk_size must be a positive integer")
+        input_format = _format(args.input, args.input_format, INPUT_FORMATS)
+        output_format = _format(args.output, args.output_format, OUTPUT_FORMATS)
+        if output_format == "parquet" and args.output in (None, "-"):
+            raise ValueError("Parquet output needs an --output file")
+
+        write_rows = args.output is not None or not args.report
+        writer = _ResultWriter(args.output, output_format) if write_rows else None
+        tasks = (
+            (chunk, args.integration)
+            for chunk in read_scenarios(args.input, input_format, args.chunk_size)
+        )
+        partials = []
+        try:
+            for result in imap_blocks(evaluate_chunk, tasks, workers=args.workers):
+                if writer is not None:
+                    writer.write(result)
+                if args.report:
+                    partials.append(_report_partial(result))
+        finally:
+            if writer is not None:
+                writer.close()
+    except BrokenPipeError:
+        # the reader went away (e.g. `tonyear scenarios.csv | head`); silence the final flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (ValueError, OSError) as e:
+        print(f"tonyear: error: {e}", file=sys.stderr)
+        return 1
+
+    if args.report and partials:
+        print(summary_report(partials).to_string(float_format="{:.2f}".format))
+    return 0
@@ -1,17 +1,216 @@
+import functools
 import json
+from typing import Dict, Iterator, Mapping, Optional, Sequence, Tuple, Union
 
 import numpy as np
+from numpy.typing import DTypeLike
 
+from .profiling import count, instrumented, is_profiling, stage
 
-def get_baseline_curve(curve_name: str, t_horizon: int = 1001) -> np.ndarray:
-    """Build the baseline curve
+# Impulse response function (IRF) parameters for each named baseline curve. Each curve is
+# a sum of exponentials, IRF(t) = sum_i a[i] * exp(-t / tau[i]), where a timescale of zero
+# marks the constant (non-decaying) term.
+_IRF_PARAMETERS: Dict[str, Tuple[Tuple[float, ...], Tuple[float, ...]]] = {
+    # parameters from Joos et al., 2013 (Table 5)
+    # https://doi.org/10.5194/acp-13-2793-2013
+    "joos_2013": ((0.2173, 0.2240, 0.2824, 0.2763), (0, 394.4, 36.54, 4.304)),
+    # parameters from IPCC AR4 2007 (Chapter 2, page 213)
+    # https://www.ipcc.ch/site/assets/uploads/2018/02/ar4-wg1-chapter2-1.pdf
+    "ipcc_2007": ((0.217, 0.259, 0.338, 0.186), (0, 172.9, 18.51, 1.186)),
+    # parameters from IPCC LULUCF Special Report 2000 (Chapter 2.3.6.3, Footnote 4)
+    # https://archive.ipcc.ch/ipccreports/sres/land_use/index.php?idp=74
+    "ipcc_2000": (
+        (0.175602, 0.137467, 0.18576, 0.242302, 0.258868),
+        (0, 421.093, 70.5965, 21.42165, 3.41537),
+    ),
+}
+
+
+def register_baseline_curve(
+    curve_name: str, a: Sequence[float], tau: Sequence[float], overwrite: bool = False
+) -> None:
+    """Register IRF parameters for a new baseline curve
+
+    Parameters
+    ----------
+    curve_name : str
+        Name of baseline curve
+    a : sequence of float
+        Weights of each term of the IRF
+    tau : sequence of float
+        Timescale of each term of the IRF (years). A timescale of zero marks a constant term.
+    overwrite : bool
+        Whether to replace the parameters of an already registered curve
+    """
+
+    if curve_name in _IRF_PARAMETERS and not overwrite:
+        raise ValueError(f"Baseline curve {curve_name} is already registered.")
+    if len(a) != len(tau):
+        raise ValueError("a and tau must have the same length")
+    if any(t < 0 for t in tau):
+        raise ValueError("tau cannot be negative")
+
+    _IRF_PARAMETERS[curve_name] = (
+        tuple(float(v) for v in a),
+        tuple(float(v) for v in tau),
+    )
+    _cached_baseline_curve.cache_clear()
+
+
+def get_curve_parameters(
+    curve_name: str,
+) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+    """Get the IRF parameters of a registered baseline curve
 
     Parameters
     ----------
     curve_name : str
         Name of baseline curve
+
+    Returns
+    -------
+    a, tau : tuple of float
+        Weights and timescales (years) of each term of the IRF
+    """
+
+    try:
+        return _IRF_PARAMETERS[curve_name]
+    except KeyError:
+        raise ValueError(
+            f"No baseline curve parameters by the name {curve_name}."
+        ) from None
+
+
+@instrumented()
+def sum_of_exponentials(a, tau, t, dtype: DTypeLike = np.float64) -> np.ndarray:
+    """Evaluate an IRF expressed as a sum of exponentials
+
+    Parameters
+    ----------
+    a : array_like
+        Weights of each term, with terms along the last axis. Leading axes (e.g. Monte Carlo
+        runs) are broadcast against ``tau``.
+    tau : array_like
+        Timescales of each term (years), with terms along the last axis. A timescale of zero
+        marks a constant term.
+    t : array_like
+        1D array of times (years) at which to evaluate the IRF
+    dtype : data-type
+        Data type of the output array
+
+    Returns
+    -------
+    IRF : np.ndarray
+        IRF evaluated at ``t``, with shape ``broadcast(a, tau).shape[:-1] + t.shape``
+    """
+
+    a, tau = np.broadcast_arrays(
+        np.asarray(a, dtype=dtype), np.asarray(tau, dtype=dtype)
+    )
+    t = np.asarray(t, dtype=dtype)
+    # an infinite timescale turns the constant term into exp(0) == 1
+    tau = np.where(tau == 0, np.inf, tau)
+
+    IRF = np.zeros(a.shape[:-1] + t.shape, dtype=dtype)
+    term = np.empty_like(IRF)
+    for i in range(a.shape[-1]):
+        if np.all(np.isinf(tau[..., i])):
+            IRF += a[..., i, np.newaxis]
+            continue
+        # evaluate each term in place to avoid allocating temporaries of the output's size
+        np.divide(-t, tau[..., i, np.newaxis], out=term)
+        np.exp(term, out=term)
+        term *= a[..., i, np.newaxis]
+        IRF += term
+    return IRF
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_baseline_curve(curve_name: str, t_horizon: int, dtype: str) -> np.ndarray:
+    a, tau = get_curve_parameters(curve_name)
+    baseline_curve = sum_of_exponentials(a, tau, np.arange(t_horizon), dtype=dtype)
+    baseline_curve.flags.writeable = False
+    return baseline_curve
+
+
+def get_time_grid(
+    t_end: float, dt: float = 1.0, dt_max: Optional[float] = None, growth: float = 1.02
+) -> np.ndarray:
+    """Build a time coordinate (years) running from 0 to t_end
+
+    Steps are uniform (e.g. ``dt=1/12`` for monthly steps), or, with ``dt_max``, start at
+    ``dt`` and grow geometrically up to ``dt_max``. An adaptive grid resolves the fast
+    initial decay of an IRF while taking few steps through its slowly varying tail.
+
+    Parameters
+    ----------
+    t_end : float
+        Last time of the grid (years)
+    dt : float
+        Time step (years), or the first time step of an adaptive grid
+    dt_max : float, optional
+        Largest time step of an adaptive grid
+    growth : float
+        Ratio between successive steps of an adaptive grid. A ratio of 1 gives uniform
+        steps of ``dt``.
+
+    Returns
+    -------
+    time : np.ndarray
+        Increasing times from 0 to t_end. The last step is shortened to end at t_end.
+    """
+
+    if t_end <= 0:
+        raise ValueError("t_end must be greater than zero")
+    if dt <= 0:
+        raise ValueError("dt must be greater than zero")
+    if dt_max is not None:
+        if dt_max < dt:
+            raise ValueError("dt_max cannot be smaller than dt")
+        if growth < 1:
+            raise ValueError("growth cannot be less than 1")
+    # steps that never grow stay at dt
+    if dt_max is None or growth == 1:
+        steps = int(np.ceil(t_end / dt - 1e-9))
+        return np.minimum(np.arange(steps + 1) * dt, t_end)
+
+    # steps grow up to dt_max, then stay at dt_max
+    n_growing = int(np.floor(np.log(dt_max / dt) / np.log(growth))) + 1
+    step = dt * growth ** np.arange(n_growing, dtype=float)
+    growing = np.concatenate(([0], np.cumsum(step)))
+    if growing[-1] >= t_end:
+        time = growing[: np.searchsorted(growing, t_end)]
+    else:
+        n_max = int(np.ceil((t_end - growing[-1]) / dt_max - 1e-9))
+        time = np.concatenate((growing, growing[-1] + dt_max * np.arange(1, n_max)))
+        time = time[time < t_end]
+    return np.append(time, t_end)
+
+
+@instrumented()
+def get_baseline_curve(
+    curve_name: str,
+    t_horizon: int = 1001,
+    dtype: DTypeLike = np.float64,
+    time=None,
+) -> np.ndarray:
+    """Build the baseline curve
+
+    Curves are cached, so the returned array is read-only. Use ``.copy()`` to get an array
+    that can be modified in place.
+
+    Parameters
+    ----------
+    curve_name : str
+        Name of baseline curve, either one of the built-in curves ('joos_2013', 'ipcc_2007',
+        'ipcc_2000') or one added with ``register_baseline_curve``
     t_horizon : int
         Length of the time horizon (years)
+    dtype : data-type
+        Data type of the baseline curve
+    time : array_like, optional
+        Times (years) at which to evaluate the curve, e.g. from ``get_time_grid``, instead
+        of the annual timesteps 0, 1, ..., t_horizon - 1
 
     Returns
     -------
@@ -19,35 +218,39 @@ def get_baseline_curve(curve_name: str, t_horizon: int = 1001) -> np.ndarray:
         Baseline curve in the form of an 1D array
     """
 
+    if time is not None:
+        baseline_curve = sum_of_exponentials(
+            *get_curve_parameters(curve_name), time, dtype=dtype
+        )
+        baseline_curve.flags.writeable = False
+        return baseline_curve
+
     if t_horizon <= 0:
         raise ValueError("t_horizon must be a postive integer")
+    get_curve_parameters(curve_name)
 
-    if curve_name == "joos_2013":
-        # parameters from Joos et al., 2013 (Table 5)
-        # https://doi.org/10.5194/acp-13-2793-2013
-        a = [0.2173, 0.2240, 0.2824, 0.2763]
-        tau = [0, 394.4, 36.54, 4.304]
-    elif curve_name == "ipcc_2007":
-        # parameters from IPCC AR4 2007 (Chapter 2, page 213)
-        # https://www.ipcc.ch/site/assets/uploads/2018/02/ar4-wg1-chapter2-1.pdf
-        a = [0.217, 0.259, 0.338, 0.186]
-        tau = [0, 172.9, 18.51, 1.186]
-    elif curve_name == "ipcc_2000":
-        # parameters from IPCC LULUCF Special Report 2000 (Chapter 2.3.6.3, Footnote 4)
-        # https://archive.ipcc.ch/ipccreports/sres/land_use/index.php?idp=74
-        a = [0.175602, 0.137467, 0.18576, 0.242302, 0.258868]
-        tau = [0, 421.093, 70.5965, 21.42165, 3.41537]
+    key = (curve_name, int(t_horizon), np.dtype(dtype).str)
+    if not is_profiling():
+        return _cached_baseline_curve(*key)
+    hits = _cached_baseline_curve.cache_info().hits
+    baseline_curve = _cached_baseline_curve(*key)
+    if _cached_baseline_curve.cache_info().hits > hits:
+        count("baseline_curve_cache.hits")
     else:
-        raise ValueError(f"No baseline curve parameters by the name {curve_name}.")
-
-    baseline_curve = np.full(t_horizon, a[0])
-    for t in range(t_horizon):
-        for i in np.arange(1, len(a)):
-            baseline_curve[t] += a[i] * np.exp(-t / tau[i])
+        count("baseline_curve_cache.misses")
     return baseline_curve
 
 
-def get_discounted_curve(discount_rate: float, curve: np.ndarray) -> np.ndarray:
+def _discount_divisor(discount_rate: float, time, continuous: bool = False):
+    """Inverse of the discount factor at each time (years)"""
+    if continuous:
+        return np.exp(discount_rate * np.asarray(time, dtype=float))
+    return np.power(1 + discount_rate, time)
+
+
+def get_discounted_curve(
+    discount_rate: float, curve: np.ndarray, time=None, continuous: bool = False
+) -> np.ndarray:
     """Get discounted curve
 
     Parameters
@@ -55,16 +258,281 @@ def get_discounted_curve(discount_rate: float, curve: np.ndarray) -> np.ndarray:
     discount_rate : float
         Discount rate expressed as a fraction.
     curve : np.ndarray
+    time : array_like, optional
+        Time (years) of each value of the curve, by default 0, 1, 2, ...
+    continuous : bool
+        If True, discount continuously by exp(-discount_rate * t) instead of by
+        (1 + discount_rate)^-t
 
     Returns
     -------
     discounted_curve : np.ndarray
         Curve with discount rate applied.
     """
-    return curve / np.power(1 + discount_rate, np.arange(len(curve)))
+    if time is None:
+        time = np.arange(len(curve))
+    return curve / _discount_divisor(discount_rate, time, continuous)
+
+
+def _irf_parameters(baseline) -> Tuple[np.ndarray, np.ndarray]:
+    """IRF weights and timescales from a curve name or an (a, tau) pair"""
+    if isinstance(baseline, str):
+        a, tau = get_curve_parameters(baseline)
+    elif isinstance(baseline, tuple) and len(baseline) == 2:
+        a, tau = baseline
+    else:
+        raise ValueError(
+            "Analytic integration needs IRF parameters: pass a curve name or (a, tau) "
+            "as the baseline."
+        )
+    return np.asarray(a, dtype=float), np.asarray(tau, dtype=float)
+
+
+def _baseline_array(baseline, length: int) -> np.ndarray:
+    """Baseline curve array from an array, a curve name or an (a, tau) pair"""
+    if isinstance(baseline, str):
+        return get_baseline_curve(baseline, length)
+    if isinstance(baseline, tuple) and len(baseline) == 2:
+        return sum_of_exponentials(*_irf_parameters(baseline), np.arange(length))
+    return np.asarray(baseline)
+
+
+def _integrate_exponentials(
+    a: np.ndarray, tau: np.ndarray, length, log_discount, paired: bool = False
+) -> np.ndarray:
+    """Integrate sum_i a[i] * exp(-t / tau[i]) * exp(-log_discount * t) over 0 <= t <= length
+
+    ``length`` and ``log_discount`` broadcast against each other; leading (ensemble) axes
+    of ``a`` and ``tau`` are appended to the result, or broadcast against it if ``paired``.
+    """
+
+    length, log_discount = np.broadcast_arrays(
+        np.asarray(length, dtype=float), np.asarray(log_discount, dtype=float)
+    )
+    trailing = (1,) if paired else (1,) * a.ndim
+    length = length.reshape(length.shape + trailing)
+    log_discount = log_discount.reshape(log_discount.shape + trailing)
+
+    rate = np.divide(1, tau, out=np.zeros_like(tau), where=tau != 0) + log_discount
+    with np.errstate(divide="ignore", invalid="ignore"):
+        integral = np.where(rate == 0, length, -np.expm1(-rate * length) / rate)
+    return np.sum(a * integral, axis=-1)
 
 
-def print_benefit_report(method_output: dict) -> None:
+@instrumented()
+def analytic_tonyears(
+    method: str,
+    a,
+    tau,
+    time_horizon,
+    delay,
+    discount_rate,
+    paired: bool = False,
+    continuous_discounting: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Closed-form baseline cost and benefit for an IRF expressed as a sum of exponentials.
+
+    The integrals behind each method are evaluated exactly over continuous time, in
+    O(number of terms), so there is no trapezoid discretisation error and the cost does not
+    depend on the time horizon. The discount factor (1 + discount_rate)^-t is integrated as
+    exp(-log(1 + discount_rate) * t). Time horizons and delays need not be whole years.
+
+    Parameters
+    ----------
+    method : str
+        The ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+    a, tau : array_like
+        IRF weights and timescales (years), with terms along the last axis. Leading axes
+        (e.g. Monte Carlo runs) are appended to the shape of the results.
+    time_horizon, delay, discount_rate : array_like
+        Accounting parameters, broadcast against each other
+    paired : bool
+        If True, the accounting parameters are broadcast against the leading axes of ``a``
+        and ``tau`` instead, pairing e.g. each Monte Carlo run with its own time horizon,
+        delay and discount rate.
+    continuous_discounting : bool
+        If True, discount by exp(-discount_rate * t) instead of (1 + discount_rate)^-t
+
+    Returns
+    -------
+    baseline_atm_cost : np.ndarray
+        Array of shape broadcast(time_horizon, discount_rate).shape + a.shape[:-1]
+    benefit : np.ndarray
+        Array of shape broadcast(time_horizon, delay, discount_rate).shape + a.shape[:-1].
+        Combinations where the delay exceeds the time horizon are NaN.
+
+        With ``paired``, both shapes are broadcast with ``a.shape[:-1]`` instead of
+        extended by it.
+    """
+
+    a, tau = np.broadcast_arrays(
+        np.asarray(a, dtype=float), np.asarray(tau, dtype=float)
+    )
+    time_horizon = np.asarray(time_horizon, dtype=float)
+    delay = np.asarray(delay, dtype=float)
+    discount_rate = np.asarray(discount_rate, dtype=float)
+    if np.any(delay < 0):
+        raise ValueError("Delay cannot be negative.")
+    if np.any(time_horizon <= 0):
+        raise ValueError("Time horizon must be greater than zero.")
+
+    def expand(x):
+        return x if paired else x.reshape(x.shape + (1,) * (a.ndim - 1))
+
+    log_discount = discount_rate if continuous_discounting else np.log1p(discount_rate)
+    cost = _integrate_exponentials(a, tau, time_horizon, log_discount, paired)
+
+    if method == "mc":
+        benefit = _integrate_exponentials(np.ones(1), np.zeros(1), delay, log_discount)
+        benefit = expand(benefit)
+    elif method == "lashof":
+        remaining = _integrate_exponentials(
+            a, tau, np.maximum(time_horizon - delay, 0), log_discount, paired
+        )
+        benefit = cost - remaining * expand(np.exp(-log_discount * delay))
+    elif method == "car":
+        benefit = cost * expand(delay / time_horizon)
+    elif method == "qc":
+        benefit = _integrate_exponentials(a, tau, delay, 0, paired)
+    else:
+        raise ValueError(f"No ton-year accounting method called {method}")
+
+    shape = np.broadcast_shapes(time_horizon.shape, delay.shape, discount_rate.shape)
+    if paired:
+        shape = np.broadcast_shapes(shape, a.shape[:-1])
+    else:
+        shape = shape + a.shape[:-1]
+    valid = expand(delay <= time_horizon)
+    benefit = np.where(valid, benefit, np.nan)
+    return cost, np.broadcast_to(benefit, shape).copy()
+
+
+class TonYearResult(Mapping):
+    """Result of ``calculate_tonyears`` that builds its scenario array on first access.
+
+    A read-only mapping with the same keys as the dict returned by ``calculate_tonyears``,
+    whose values are also available as attributes.
+
+    Parameters
+    ----------
+    parameters : dict
+        Key parameters used for the calculation (method, time_horizon, delay, discount_rate)
+    baseline_atm_cost : float
+        The cost of a baseline emission
+    benefit : float
+        The benefit of delaying an emission
+    baseline : np.ndarray, optional
+        Discounted baseline curve over 0<=t<=time_horizon (None for analytic integration)
+    curve : np.ndarray, optional
+        Undiscounted baseline curve the scenario is built from
+    time : np.ndarray, optional
+        Time (years) of each value of the baseline and scenario arrays, if they are not
+        annual. It is then also available under the `time` key.
+    continuous_discounting : bool
+        Whether the scenario is discounted continuously
+    """
+
+    __slots__ = (
+        "parameters",
+        "baseline_atm_cost",
+        "benefit",
+        "baseline",
+        "time",
+        "_curve",
+        "_scenario",
+        "_continuous",
+    )
+
+    _KEYS = (
+        "parameters",
+        "baseline",
+        "scenario",
+        "baseline_atm_cost",
+        "benefit",
+        "num_for_equivalence",
+    )
+
+    def __init__(
+        self,
+        parameters: dict,
+        baseline_atm_cost,
+        benefit,
+        baseline: Union[np.ndarray, None] = None,
+        curve: Union[np.ndarray, None] = None,
+        time: Union[np.ndarray, None] = None,
+        continuous_discounting: bool = False,
+    ) -> None:
+        self.parameters = parameters
+        self.baseline_atm_cost = baseline_atm_cost
+        self.benefit = benefit
+        self.baseline = baseline
+        self.time = time
+        self._curve = curve
+        self._continuous = continuous_discounting
+        self._scenario: Union[np.ndarray, None] = None
+
+    @property
+    def num_for_equivalence(self) -> float:
+        """The ratio between the baseline cost and the benefit"""
+        return self.baseline_atm_cost / self.benefit
+
+    @property
+    def scenario(self) -> Union[np.ndarray, None]:
+        """Scenario curve, discounted if applicable (None for analytic integration)"""
+        if self._scenario is None and self._curve is not None:
+            method = self.parameters["method"]
+            delay = self.parameters["delay"]
+            length = len(self._curve)
+            if method == "mc":
+                delay_timesteps = delay + 1
+                scenario = np.concatenate(
+                    (np.full(delay_timesteps, -1), np.zeros(length - delay_timesteps))
+                )
+            else:
+                scenario = np.concatenate((np.zeros(delay), self._curve))[
+                    : self.parameters["time_horizon"] + 1
+                ]
+            self._scenario = get_discounted_curve(
+                self.parameters["discount_rate"], scenario, continuous=self._continuous
+            )
+        return self._scenario
+
+    def to_dict(self) -> dict:
+        """Plain dict of all results, building any arrays not computed yet"""
+        result = {
+            "parameters": self.parameters,
+            "baseline": self.baseline,
+            "scenario": self.scenario,
+            "baseline_atm_cost": self.baseline_atm_cost,
+            "benefit": self.benefit,
+            "num_for_equivalence": self.num_for_equivalence,
+        }
+        if self.time is not None:
+            result["time"] = self.time
+        return result
+
+    def _keys(self) -> Tuple[str, ...]:
+        return self._KEYS if self.time is None else self._KEYS + ("time",)
+
+    def __getitem__(self, key: str):
+        if key not in self._keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return (
+            f"TonYearResult(parameters={self.parameters}, "
+            f"baseline_atm_cost={self.baseline_atm_cost}, benefit={self.benefit})"
+        )
+
+
+def print_benefit_report(method_output: Mapping) -> None:
     """Print the benefit report"""
     discount = str(round(method_output["parameters"]["discount_rate"] * 100, 1))
     delay = str(method_output["parameters"]["delay"])
@@ -81,13 +549,103 @@ def print_benefit_report(method_output: dict) -> None:
     print()
 
 
+def _integrate_between(func, time: np.ndarray, start: float, stop: float) -> float:
+    """Trapezoidal integral of func over start<=t<=stop, at the points of the time grid
+    within the interval and at its ends"""
+    if stop <= start:
+        return 0.0
+    inner = time[(time > start) & (time < stop)]
+    points = np.concatenate(([start], inner, [stop]))
+    return np.trapz(func(points), points)
+
+
+def _tonyears_on_time_grid(
+    method: str,
+    baseline,
+    time_horizon: float,
+    delay: float,
+    discount_rate: float,
+    time: np.ndarray,
+    continuous: bool,
+) -> TonYearResult:
+    """``calculate_tonyears`` with trapezoidal integration over an arbitrary time grid"""
+
+    if time.ndim != 1 or len(time) < 2 or time[0] != 0 or np.any(np.diff(time) <= 0):
+        raise ValueError("time must be an increasing 1D array starting at zero")
+    if max(time_horizon, delay) > time[-1]:
+        raise ValueError("Time horizon and delay cannot be longer than the time grid.")
+    if method not in METHODS:
+        raise ValueError(f"No ton-year accounting method called {method}")
+
+    if isinstance(baseline, (str, tuple)):
+        a, tau = _irf_parameters(baseline)
+
+        def curve(t):
+            return sum_of_exponentials(a, tau, t)
+
+    else:
+        values = np.asarray(baseline, dtype=float)
+        if values.shape != time.shape:
+            raise ValueError("baseline and time must have the same length")
+
+        def curve(t):
+            return np.interp(t, time, values)
+
+    def discount(t):
+        return 1 / _discount_divisor(discount_rate, t, continuous)
+
+    with stage("integration"):
+        baseline_atm_cost = _integrate_between(
+            lambda t: curve(t) * discount(t), time, 0, time_horizon
+        )
+        if method == "mc":
+            benefit = _integrate_between(discount, time, 0, delay)
+        elif method == "lashof":
+            remaining = _integrate_between(
+                lambda u: curve(u) * discount(u + delay), time, 0, time_horizon - delay
+            )
+            benefit = baseline_atm_cost - remaining
+        elif method == "car":
+            benefit = baseline_atm_cost * delay / time_horizon
+        else:
+            # as with annual timesteps, the baseline is only integrated up to the time horizon
+            benefit = _integrate_between(curve, time, 0, min(delay, time_horizon))
+
+    # baseline and scenario over 0<=t<=time_horizon, at the grid points and the horizon
+    t = np.union1d(time[time < time_horizon], [time_horizon])
+    if method == "mc":
+        scenario = np.where(t <= delay, -1.0, 0.0)
+    else:
+        scenario = np.where(t >= delay, curve(np.maximum(t - delay, 0)), 0.0)
+    result = TonYearResult(
+        {
+            "method": method,
+            "time_horizon": time_horizon,
+            "delay": delay,
+            "discount_rate": discount_rate,
+        },
+        baseline_atm_cost,
+        benefit,
+        curve(t) * discount(t),
+        time=t,
+        continuous_discounting=continuous,
+    )
+    result._scenario = scenario * discount(t)
+    return result
+
+
+@instrumented()
 def calculate_tonyears(
     method: str,
-    baseline: np.ndarray,
-    time_horizon: int,
-    delay: int,
+    baseline: Union[np.ndarray, str, tuple],
+    time_horizon: float,
+    delay: float,
     discount_rate: float,
-) -> dict:
+    integration: str = "trapz",
+    lazy: bool = False,
+    time=None,
+    continuous_discounting: bool = False,
+) -> Union[dict, TonYearResult]:
     """This function calculates the benefit of a delayed emission according one
     of two ton-year accounting methods.
 
@@ -96,9 +654,10 @@ def calculate_tonyears(
     method : str
         The ton-year accounting method (Moura Costa: 'mc', Lashof: 'lashof', Climate Action
         Reserve: 'car', or Quebec: 'qc')
-    baseline : np.ndarray
+    baseline : np.ndarray, str or tuple
         Array modeling the residence of an emission in the atmosphere over time, i.e. a decay
-        curve / impulse response function
+        curve / impulse response function. A curve name or an (a, tau) pair of IRF
+        parameters is also accepted, and is required for analytic integration.
     time_horizon : int
         Specifies the period over which the impact of an emission is considered (years)
     delay : int
@@ -107,19 +666,41 @@ def calculate_tonyears(
         Specifies the discount rate to apply time preference to both costs and benefits over the
         time horizon. Extreme caution should be used when applying discounting within ton-year
         accounting. See documentation for more details.
+    integration : str
+        How costs and benefits are integrated over time: 'trapz' (default) applies the
+        trapezoidal rule to annual timesteps of the baseline array, and 'analytic' integrates
+        the IRF exactly (see ``analytic_tonyears``). Analytic integration needs the IRF
+        parameters, so ``baseline`` must then be a curve name or an (a, tau) pair.
+    lazy : bool
+        If True, return a ``TonYearResult`` that builds the scenario array only when it is
+        accessed, instead of a dict. This avoids allocating arrays that are never used when
+        only the scalar results are needed, e.g. in loops over many parameter sets.
+    time : array_like, optional
+        Time coordinate (years) of the baseline for trapezoidal integration, e.g. from
+        ``get_time_grid``: increasing, starting at 0 and reaching past the time horizon and
+        the delay. A baseline array then holds the IRF at these times; a curve name or
+        (a, tau) pair is evaluated at them. Between the grid points the IRF is taken to be
+        linear, so the time horizon and delay need not be grid points (or whole years).
+        By default the baseline is sampled at annual timesteps 0, 1, 2, ...
+    continuous_discounting : bool
+        If True, discount by exp(-discount_rate * t) instead of (1 + discount_rate)^-t
 
     Returns
     -------
-    method_dict : dict
-        Return dict with the following keys:
+    method_dict : dict or TonYearResult
+        Return dict (or read-only mapping, if ``lazy``) with the following keys:
 
         - `parameters` : key parameters used for the calculation
         - `baseline` : array modeling baseline emission curve, discounted if applicable
+          (None for analytic integration)
         - `scenario` : array modeling the scenario curve, discounted if applicable
+          (None for analytic integration)
         - `baseline_atm_cost` : the cost of of a baseline emission
         - `benefit` : the benefit of delaying an emission, calculated according to
           specified accounting method
         - `num_for_equivalence` : the ratio between the baseline cost and the benefit
+        - `time` : the time (years) of each value of `baseline` and `scenario`, only given
+          with a ``time`` coordinate
 
     """
 
@@ -127,6 +708,53 @@ def calculate_tonyears(
         raise ValueError("Delay cannot be negative.")
     if time_horizon <= 0:
         raise ValueError("Time horizon must be greater than zero.")
+
+    if integration == "analytic":
+        a, tau = _irf_parameters(baseline)
+        if method not in METHODS:
+            raise ValueError(f"No ton-year accounting method called {method}")
+        cost, benefit = analytic_tonyears(
+            method,
+            a,
+            tau,
+            time_horizon,
+            delay,
+            discount_rate,
+            continuous_discounting=continuous_discounting,
+        )
+        result = TonYearResult(
+            {
+                "method": method,
+                "time_horizon": time_horizon,
+                "delay": delay,
+                "discount_rate": discount_rate,
+            },
+            cost[()],
+            benefit[()],
+        )
+        return result if lazy else result.to_dict()
+    elif integration != "trapz":
+        raise ValueError(f"No integration method called {integration}")
+
+    if time is not None:
+        result = _tonyears_on_time_grid(
+            method,
+            baseline,
+            time_horizon,
+            delay,
+            discount_rate,
+            np.asarray(time, dtype=float),
+            continuous_discounting,
+        )
+        return result if lazy else result.to_dict()
+
+    if time_horizon != int(time_horizon) or delay != int(delay):
+        raise ValueError(
+            "Time horizon and delay must be whole years without a time coordinate."
+        )
+    time_horizon, delay = int(time_horizon), int(delay)
+    baseline = _baseline_array(baseline, time_horizon + 1)
+
     if len(baseline) < time_horizon:
         raise ValueError(
             "Time horizon cannot be longer than length of the baseline array."
@@ -136,65 +764,527 @@ def calculate_tonyears(
     # atmospheric ton-years incurred over the period 0<=t<=time_horizon.
     time_horizon_timesteps = time_horizon + 1
     baseline = baseline[:time_horizon_timesteps]
-    baseline_discounted = get_discounted_curve(discount_rate, baseline)
-    baseline_atm_cost = np.trapz(baseline_discounted)
-
-    if method == "mc":
-        # The Moura-Costa method calculates the ton-year benefit of a delayed emission
-        # as the ton-years of carbon storage outside of the atmosphere over the period
-        # 0<=t<=delay. Moura-Costa ignores the atmospheric impact of post-storage re-emission.
-        delay_timesteps = delay + 1
-        scenario = np.concatenate(
-            (np.full(delay_timesteps, -1), np.zeros(len(baseline) - delay_timesteps))
+    with stage("integration"):
+        baseline_discounted = get_discounted_curve(
+            discount_rate, baseline, continuous=continuous_discounting
         )
-        scenario = get_discounted_curve(discount_rate, scenario)
-        benefit = -np.trapz(scenario[:delay_timesteps])
+        baseline_atm_cost = np.trapz(baseline_discounted)
 
-    elif method == "lashof":
-        # The Lashof method calculates calculates the ton-year benefit of an emission at t=delay
-        # as the atmospheric cost that no longer occurs within the time horizon. This can also
-        # be understood as the difference between the baseline atmospheric cost and the scenario
-        # atmospheric cost, calculated over the period delay<=t<=time_horizon.
-        scenario = np.concatenate((np.zeros(delay), baseline))[:time_horizon_timesteps]
-        scenario = get_discounted_curve(discount_rate, scenario)
-        benefit = baseline_atm_cost - np.trapz(scenario[delay:])
+        if method == "mc":
+            # The Moura-Costa method calculates the ton-year benefit of a delayed emission
+            # as the ton-years of carbon storage outside of the atmosphere over the period
+            # 0<=t<=delay. Moura-Costa ignores the atmospheric impact of post-storage re-emission.
+            storage = get_discounted_curve(
+                discount_rate,
+                np.full(delay + 1, -1.0),
+                continuous=continuous_discounting,
+            )
+            benefit = -np.trapz(storage)
 
-    elif method == "car":
-        # The Climate Action Reserve method calculates the benefit of temporary carbon storage
-        # by (1) defining the duration of carbon storage considered equivalent to an emission
-        # and (2) awarding proportional credit linearly over the time horizon for more temporary
-        # storage.
-        scenario = np.concatenate((np.zeros(delay), baseline))[:time_horizon_timesteps]
-        scenario = get_discounted_curve(discount_rate, scenario)
-        benefit = (1 / time_horizon) * baseline_atm_cost * delay
+        elif method == "lashof":
+            # The Lashof method calculates calculates the ton-year benefit of an emission at t=delay
+            # as the atmospheric cost that no longer occurs within the time horizon. This can also
+            # be understood as the difference between the baseline atmospheric cost and the scenario
+            # atmospheric cost, calculated over the period delay<=t<=time_horizon.
+            scenario = baseline[: max(time_horizon_timesteps - delay, 0)]
+            scenario = scenario / _discount_divisor(
+                discount_rate,
+                np.arange(delay, delay + len(scenario)),
+                continuous_discounting,
+            )
+            benefit = baseline_atm_cost - np.trapz(scenario)
 
-    elif method == "qc":
-        # The Quebec method calculates the benefit of temporary carbon storage by (1) defining
-        # the duration of carbon storage considered equivalent to an emission and (2) awarding
-        # credit over the time horizon in proportion to the shape of the IRF curve.
-        scenario = np.concatenate((np.zeros(delay), baseline))[:time_horizon_timesteps]
-        scenario = get_discounted_curve(discount_rate, scenario)
-        benefit = np.trapz(baseline[: delay + 1])
+        elif method == "car":
+            # The Climate Action Reserve method calculates the benefit of temporary carbon storage
+            # by (1) defining the duration of carbon storage considered equivalent to an emission
+            # and (2) awarding proportional credit linearly over the time horizon for more temporary
+            # storage.
+            benefit = (1 / time_horizon) * baseline_atm_cost * delay
 
-    else:
-        raise ValueError(f"No ton-year accounting method called {method}")
+        elif method == "qc":
+            # The Quebec method calculates the benefit of temporary carbon storage by (1) defining
+            # the duration of carbon storage considered equivalent to an emission and (2) awarding
+            # credit over the time horizon in proportion to the shape of the IRF curve.
+            benefit = np.trapz(baseline[: delay + 1])
 
-    return {
-        "parameters": {
+        else:
+            raise ValueError(f"No ton-year accounting method called {method}")
+
+    result = TonYearResult(
+        {
             "method": method,
             "time_horizon": time_horizon,
             "delay": delay,
             "discount_rate": discount_rate,
         },
-        "baseline": baseline_discounted,
-        "scenario": scenario,
+        baseline_atm_cost,
+        benefit,
+        baseline_discounted,
+        baseline,
+        continuous_discounting=continuous_discounting,
+    )
+    if lazy:
+        return result
+    # reuse the discounted parts of the scenario already computed for the benefit
+    if method == "mc":
+        result._scenario = np.concatenate(
+            (storage, np.zeros(len(baseline) - delay - 1))
+        )
+    elif method == "lashof":
+        result._scenario = np.concatenate((np.zeros(delay), scenario))[
+            :time_horizon_timesteps
+        ]
+    return result.to_dict()
+
+
+METHODS = ("mc", "lashof", "car", "qc")
+
+
+def _cumulative_trapz(y: np.ndarray) -> np.ndarray:
+    """Cumulative trapezoidal integral along the first axis, starting at zero"""
+    out = np.zeros_like(y, dtype=np.result_type(y, np.float64))
+    np.cumsum((y[1:] + y[:-1]) / 2, axis=0, out=out[1:])
+    return out
+
+
+class TonYearIndex:
+    """Precomputed cumulative integrals of a baseline curve for fast ton-year queries.
+
+    The index stores cumulative trapezoidal integrals of the discounted baseline, the
+    undiscounted baseline and the discount factors. Costs, benefits and equivalence ratios
+    for any (time horizon, delay) pair then take a constant number of array lookups instead
+    of a fresh ``np.trapz`` over the baseline. Queries accept scalars or arrays, which are
+    broadcast against each other.
+
+    Results match ``calculate_tonyears`` up to floating point summation order. Queries where
+    the delay exceeds the time horizon return NaN.
+
+    The baseline may also be an ensemble of curves, e.g. the (t_horizon, runs) results of
+    ``joos_2013_monte_carlo``. Query results then gain the trailing ensemble axes.
+
+    Parameters
+    ----------
+    baseline : np.ndarray
+        Array modeling the residence of an emission in the atmosphere over time, with time
+        along the first axis. Queries need the baseline at t=0, ..., time_horizon, i.e. at
+        least time_horizon + 1 values.
+    discount_rate : float
+        Discount rate expressed as a fraction
+    """
+
+    def __init__(self, baseline: np.ndarray, discount_rate: float = 0.0) -> None:
+        self.baseline = np.asarray(baseline)
+        self.discount_rate = discount_rate
+
+        with np.errstate(over="ignore"):
+            # long horizons overflow the denominator, correctly giving a factor of zero
+            self.discount_factors = 1 / np.power(
+                1 + discount_rate, np.arange(len(baseline))
+            )
+        with stage("tonyear_index"):
+            self.cum_discount = _cumulative_trapz(self.discount_factors)
+            self.cum_baseline = _cumulative_trapz(self.baseline)
+            self.cum_baseline_discounted = _cumulative_trapz(
+                self.baseline * self._expand(self.discount_factors)
+            )
+
+    def __len__(self) -> int:
+        return len(self.baseline)
+
+    def _expand(self, x) -> np.ndarray:
+        """Append unit axes so x broadcasts against the ensemble axes of the baseline"""
+        x = np.asarray(x)
+        return x.reshape(x.shape + (1,) * (self.baseline.ndim - 1))
+
+    def _check_time_horizon(self, time_horizon) -> np.ndarray:
+        time_horizon = np.asarray(time_horizon)
+        if np.any(time_horizon <= 0):
+            raise ValueError("Time horizon must be greater than zero.")
+        # the baseline must cover 0<=t<=time_horizon, i.e. time_horizon + 1 samples
+        if np.any(len(self) <= time_horizon):
+            raise ValueError(
+                "Time horizon cannot be longer than length of the baseline array."
+            )
+        return time_horizon
+
+    def baseline_atm_cost(self, time_horizon):
+        """The (discounted) cost of a baseline emission over the time horizon
+
+        Parameters
+        ----------
+        time_horizon : int or array_like of int
+            Period over which the impact of an emission is considered (years)
+
+        Returns
+        -------
+        baseline_atm_cost : float or np.ndarray
+        """
+
+        time_horizon = self._check_time_horizon(time_horizon)
+        return self.cum_baseline_discounted[time_horizon][()]
+
+    def benefit(self, method: str, time_horizon, delay):
+        """The benefit of delaying an emission
+
+        Parameters
+        ----------
+        method : str
+            The ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+        time_horizon : int or array_like of int
+            Period over which the impact of an emission is considered (years)
+        delay : int or array_like of int
+            Emission delay for which a ton-year benefit will be calculated (years)
+
+        Returns
+        -------
+        benefit : float or np.ndarray
+        """
+
+        delay = np.asarray(delay)
+        if np.any(delay < 0):
+            raise ValueError("Delay cannot be negative.")
+        time_horizon = self._check_time_horizon(time_horizon)
+        time_horizon, delay = np.broadcast_arrays(time_horizon, delay)
+
+        clipped_delay = np.minimum(delay, time_horizon)
+
+        if method == "mc":
+            benefit = self._expand(self.cum_discount[clipped_delay])
+        elif method == "lashof":
+            cost = self.cum_baseline_discounted[time_horizon]
+            remaining = self.cum_baseline_discounted[time_horizon - clipped_delay]
+            remaining = remaining * self._expand(self.discount_factors[clipped_delay])
+            benefit = cost - np.where(self._expand(delay <= time_horizon), remaining, 0)
+        elif method == "car":
+            benefit = self.cum_baseline_discounted[time_horizon] * self._expand(delay)
+            benefit = benefit / self._expand(time_horizon)
+        elif method == "qc":
+            benefit = self.cum_baseline[clipped_delay]
+        else:
+            raise ValueError(f"No ton-year accounting method called {method}")
+
+        benefit = np.where(self._expand(delay <= time_horizon), benefit, np.nan)
+        return np.broadcast_to(benefit, delay.shape + self.baseline.shape[1:]).copy()[
+            ()
+        ]
+
+    def num_for_equivalence(self, method: str, time_horizon, delay):
+        """The ratio between the baseline cost and the benefit
+
+        Parameters
+        ----------
+        method : str
+            The ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+        time_horizon : int or array_like of int
+            Period over which the impact of an emission is considered (years)
+        delay : int or array_like of int
+            Emission delay for which a ton-year benefit will be calculated (years)
+
+        Returns
+        -------
+        num_for_equivalence : float or np.ndarray
+        """
+
+        benefit = self.benefit(method, time_horizon, delay)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.baseline_atm_cost(time_horizon) / benefit
+
+    def solve_delay(self, method: str, time_horizon: int, num_for_equivalence):
+        """The delay at which a given number of delayed emissions is equivalent to one
+        baseline emission, i.e. the inverse of ``num_for_equivalence`` over delays
+
+        Benefits are computed for every whole-year delay within the time horizon and
+        linearly interpolated between them, so fractional delays are returned. Where
+        the benefit stops increasing, the shortest delay reaching the target is
+        returned. Targets that no delay within the time horizon reaches are NaN.
+
+        Parameters
+        ----------
+        method : str
+            The ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+        time_horizon : int
+            Period over which the impact of an emission is considered (years)
+        num_for_equivalence : float or array_like of float
+            Target ratios between the baseline cost and the benefit
+
+        Returns
+        -------
+        delay : float or np.ndarray
+            Delays (years), with the shape of ``num_for_equivalence``
+        """
+
+        self._check_single_curve()
+        delays = np.arange(min(int(time_horizon), len(self) - 1) + 1)
+        benefit = self.benefit(method, time_horizon, delays)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            target = self.baseline_atm_cost(time_horizon) / np.asarray(
+                num_for_equivalence, dtype=float
+            )
+        return _first_crossing(benefit, delays, target)
+
+    def solve_time_horizon(self, method: str, delay: int, num_for_equivalence):
+        """The time horizon at which a given number of emissions delayed by ``delay`` is
+        equivalent to one baseline emission, i.e. the inverse of ``num_for_equivalence``
+        over time horizons
+
+        Ratios are computed for every whole-year time horizon from the delay to the end
+        of the baseline and linearly interpolated between them, so fractional time
+        horizons are returned. Where the ratio stops increasing, the shortest time
+        horizon reaching the target is returned. Targets that no time horizon reaches
+        are NaN.
+
+        Parameters
+        ----------
+        method : str
+            The ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+        delay : int
+            Emission delay for which a ton-year benefit will be calculated (years)
+        num_for_equivalence : float or array_like of float
+            Target ratios between the baseline cost and the benefit
+
+        Returns
+        -------
+        time_horizon : float or np.ndarray
+            Time horizons (years), with the shape of ``num_for_equivalence``
+        """
+
+        self._check_single_curve()
+        time_horizons = np.arange(max(int(delay), 1), len(self))
+        ratio = self.num_for_equivalence(method, time_horizons, delay)
+        return _first_crossing(
+            ratio, time_horizons, np.asarray(num_for_equivalence, dtype=float)
+        )
+
+    def _check_single_curve(self) -> None:
+        if self.baseline.ndim != 1:
+            raise ValueError(
+                "Inverse solves need a single baseline curve, not an ensemble."
+            )
+
+
+def _first_crossing(values: np.ndarray, coords: np.ndarray, target: np.ndarray):
+    """Linearly interpolated coordinate at which values first reach each target
+
+    NaN where the target is never reached, or is already exceeded at the first coordinate.
+    """
+
+    running_max = np.maximum.accumulate(np.nan_to_num(values, nan=-np.inf))
+    # searching sorted targets is several times faster for large batches
+    order = np.argsort(target, axis=None)
+    index = np.empty(target.shape, dtype=np.intp)
+    index.flat[order] = np.searchsorted(running_max, target.flat[order], side="left")
+    inside = np.isfinite(target) & (index < len(coords))
+    index = np.clip(index, 1, len(coords) - 1)
+    lower, upper = running_max[index - 1], running_max[index]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.clip((target - lower) / (upper - lower), 0, 1)
+    result = coords[index - 1] + fraction * (coords[index] - coords[index - 1])
+    result = np.where(target == running_max[0], coords[0], result)
+    return np.where(inside & (target >= running_max[0]), result, np.nan)[()]
+
+
+@instrumented()
+def calculate_tonyears_grid(
+    methods: Sequence[str],
+    baseline: Union[np.ndarray, str, tuple],
+    time_horizons,
+    delays,
+    discount_rates,
+    integration: str = "trapz",
+) -> dict:
+    """Calculate ton-year benefits over a grid of methods, time horizons, delays and
+    discount rates in a single vectorized pass.
+
+    Every combination gives the same result as ``calculate_tonyears`` (up to floating point
+    summation order). Combinations where the delay exceeds the time horizon are set to NaN.
+
+    Parameters
+    ----------
+    methods : sequence of str
+        Ton-year accounting methods ('mc', 'lashof', 'car', 'qc')
+    baseline : np.ndarray, str or tuple
+        Array modeling the residence of an emission in the atmosphere over time. A curve
+        name or an (a, tau) pair of IRF parameters is also accepted, and is required for
+        analytic integration.
+    time_horizons : array_like of int
+        Periods over which the impact of an emission is considered (years)
+    delays : array_like of int
+        Emission delays for which a ton-year benefit will be calculated (years)
+    discount_rates : array_like of float
+        Discount rates expressed as fractions
+    integration : str
+        'trapz' (default) or 'analytic', as in ``calculate_tonyears``. With analytic
+        integration the cost of the sweep does not depend on the time horizons.
+
+    Returns
+    -------
+    grid_dict : dict
+        Return dict with the following keys:
+
+        - `dims` : names of the dimensions of each result array, ('method',
+          'time_horizon', 'delay', 'discount_rate')
+        - `coords` : dict mapping each dimension name to its coordinate values
+        - `baseline_atm_cost` : the cost of a baseline emission
+        - `benefit` : the benefit of delaying an emission
+        - `num_for_equivalence` : the ratio between the baseline cost and the benefit
+    """
+
+    methods = list(methods)
+    time_horizons = np.atleast_1d(np.asarray(time_horizons, dtype=int))
+    delays = np.atleast_1d(np.asarray(delays, dtype=int))
+    discount_rates = np.atleast_1d(np.asarray(discount_rates, dtype=float))
+
+    for method in methods:
+        if method not in METHODS:
+            raise ValueError(f"No ton-year accounting method called {method}")
+
+    shape = (len(methods), len(time_horizons), len(delays), len(discount_rates))
+    baseline_atm_cost = np.empty(shape)
+    benefit = np.empty(shape)
+
+    if integration == "analytic":
+        a, tau = _irf_parameters(baseline)
+        time_horizon = time_horizons[:, np.newaxis, np.newaxis]
+        delay = delays[np.newaxis, :, np.newaxis]
+        for i, method in enumerate(methods):
+            cost, benefit[i] = analytic_tonyears(
+                method, a, tau, time_horizon, delay, discount_rates
+            )
+            baseline_atm_cost[i] = np.where(delay <= time_horizon, cost, np.nan)
+    elif integration == "trapz":
+        baseline = _baseline_array(baseline, time_horizons.max() + 1)
+        time_horizon = time_horizons[:, np.newaxis]
+        delay = delays[np.newaxis, :]
+        for j, discount_rate in enumerate(discount_rates):
+            index = TonYearIndex(baseline, discount_rate)
+            cost = index.baseline_atm_cost(time_horizon)
+            for i, method in enumerate(methods):
+                benefit[i, ..., j] = index.benefit(method, time_horizon, delay)
+                baseline_atm_cost[i, ..., j] = np.where(
+                    delay <= time_horizon, cost, np.nan
+                )
+    else:
+        raise ValueError(f"No integration method called {integration}")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        num_for_equivalence = baseline_atm_cost / benefit
+
+    return {
+        "dims": ("method", "time_horizon", "delay", "discount_rate"),
+        "coords": {
+            "method": np.array(methods),
+            "time_horizon": time_horizons,
+            "delay": delays,
+            "discount_rate": discount_rates,
+        },
         "baseline_atm_cost": baseline_atm_cost,
         "benefit": benefit,
-        "num_for_equivalence": baseline_atm_cost / benefit,
+        "num_for_equivalence": num_for_equivalence,
     }
 
 
+@instrumented()
+def calculate_delay_for_equivalence(
+    method: str,
+    baseline: Union[np.ndarray, str, tuple],
+    time_horizon: int,
+    discount_rate: float,
+    num_for_equivalence,
+):
+    """Calculate the storage duration (delay) at which a given number of tonnes of delayed
+    emissions is equivalent to one baseline emission.
+
+    This inverts ``calculate_tonyears`` for one or many target ratios in a single vectorized
+    pass, instead of sweeping over delays. See ``TonYearIndex.solve_delay``.
+
+    Parameters
+    ----------
+    method : str
+        The ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+    baseline : np.ndarray, str or tuple
+        Array modeling the residence of an emission in the atmosphere over time, or a curve
+        name or an (a, tau) pair of IRF parameters
+    time_horizon : int
+        Specifies the period over which the impact of an emission is considered (years)
+    discount_rate : float
+        Discount rate expressed as a fraction
+    num_for_equivalence : float or array_like of float
+        Target ratios between the baseline cost and the benefit
+
+    Returns
+    -------
+    delay : float or np.ndarray
+        Fractional delays (years) reaching each target ratio, NaN where no delay within the
+        time horizon does
+    """
+
+    baseline = _baseline_array(baseline, time_horizon + 1)
+    index = TonYearIndex(baseline[: time_horizon + 1], discount_rate)
+    return index.solve_delay(method, time_horizon, num_for_equivalence)
+
+
+@instrumented()
+def calculate_time_horizon_for_equivalence(
+    method: str,
+    baseline: Union[np.ndarray, str, tuple],
+    delay: int,
+    discount_rate: float,
+    num_for_equivalence,
+    max_time_horizon: int = 1000,
+):
+    """Calculate the time horizon at which a given number of tonnes of emissions delayed by
+    ``delay`` years is equivalent to one baseline emission.
+
+    This inverts ``calculate_tonyears`` for one or many target ratios in a single vectorized
+    pass, instead of sweeping over time horizons. See ``TonYearIndex.solve_time_horizon``.
+
+    Parameters
+    ----------
+    method : str
+        The ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+    baseline : np.ndarray, str or tuple
+        Array modeling the residence of an emission in the atmosphere over time, or a curve
+        name or an (a, tau) pair of IRF parameters
+    delay : int
+        Specifies the emission delay for which a ton-year benefit will be calculated (years)
+    discount_rate : float
+        Discount rate expressed as a fraction
+    num_for_equivalence : float or array_like of float
+        Target ratios between the baseline cost and the benefit
+    max_time_horizon : int
+        Longest time horizon considered (years)
+
+    Returns
+    -------
+    time_horizon : float or np.ndarray
+        Fractional time horizons (years) reaching each target ratio, NaN where no time
+        horizon up to ``max_time_horizon`` does
+    """
+
+    if delay < 0:
+        raise ValueError("Delay cannot be negative.")
+    baseline = _baseline_array(baseline, max_time_horizon + 1)
+    index = TonYearIndex(baseline[: max_time_horizon + 1], discount_rate)
+    return index.solve_time_horizon(method, delay, num_for_equivalence)
+
+
+def _json_default(obj):
+    """Convert numpy and mapping values that json cannot serialize on its own"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 def write_json(collection, output) -> None:
-    """helper function to write collection to a local json file"""
+    """helper function to write collection to a local json file
+
+    Numpy arrays and scalars (e.g. the arrays returned by ``calculate_tonyears``) are
+    written as lists and numbers. The file is written incrementally, without building the
+    whole JSON string in memory.
+    """
     with open(output, "w") as f:
-        f.write(json.dumps(collection))
+        json.dump(collection, f, default=_json_default)
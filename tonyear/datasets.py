@@ -0,0 +1,265 @@
+"""Labelled xarray output for ton-year grids and Monte Carlo ensembles.
+
+These functions need xarray, and dask for lazy (out-of-core) evaluation. Datasets can be
+persisted with ``Dataset.to_zarr``, which computes and writes dask-backed variables one
+chunk at a time.
+"""
+
+from collections.abc import Mapping
+from typing import Dict, Optional, Union
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+from .core import METHODS, calculate_tonyears_grid
+from .ghgforcing import _joos_2013_chunk, _spawn_sampler_blocks
+
+GRID_VARIABLES = ("baseline_atm_cost", "benefit", "num_for_equivalence")
+
+
+def _import_xarray():
+    try:
+        import xarray as xr
+    except ImportError:  # pragma: no cover
+        raise ImportError("Labelled output requires xarray") from None
+    return xr
+
+
+def _import_dask_array():
+    try:
+        import dask
+        import dask.array as da
+    except ImportError:  # pragma: no cover
+        raise ImportError("Lazy evaluation requires dask") from None
+    return dask, da
+
+
+def to_dataset(result: Mapping):
+    """Convert the output of ``calculate_tonyears`` or ``calculate_tonyears_grid`` to an
+    ``xarray.Dataset``
+
+    Parameters
+    ----------
+    result : dict or TonYearResult
+        Output of ``calculate_tonyears`` (giving `baseline` and `scenario` variables along a
+        `time` dimension, annual unless the result has its own `time` coordinate, scalar
+        results, and the parameters as attributes) or of
+        ``calculate_tonyears_grid`` (giving variables along its `dims`). Results of
+        ``calculate_tonyears`` with analytic integration have no curves and are rejected.
+
+    Returns
+    -------
+    ds : xr.Dataset
+    """
+
+    xr = _import_xarray()
+    if "dims" in result:
+        dims = result["dims"]
+        return xr.Dataset(
+            {name: (dims, result[name]) for name in GRID_VARIABLES},
+            coords=result["coords"],
+        )
+
+    if result["baseline"] is None:
+        raise ValueError(
+            "Results of analytic integration have no curves to label; use "
+            "integration='trapz' or calculate_tonyears_dataset."
+        )
+    time = result.get("time")
+    if time is None:
+        time = np.arange(len(result["baseline"]))
+    return xr.Dataset(
+        {
+            "baseline": ("time", result["baseline"]),
+            "scenario": ("time", result["scenario"]),
+            **{name: result[name] for name in GRID_VARIABLES},
+        },
+        coords={"time": time},
+        attrs=dict(result["parameters"]),
+    )
+
+
+def _chunk_bounds(length: int, size: Optional[int]) -> list:
+    size = length if size is None else size
+    if size <= 0:
+        raise ValueError("chunk sizes must be positive integers")
+    return [(start, min(start + size, length)) for start in range(0, length, size)]
+
+
+def calculate_tonyears_dataset(
+    methods,
+    baseline: Union[np.ndarray, str, tuple],
+    time_horizons,
+    delays,
+    discount_rates,
+    integration: str = "trapz",
+    chunks: Optional[Dict[str, int]] = None,
+):
+    """Calculate ton-year results over a grid of methods, time horizons, delays and discount
+    rates, as an ``xarray.Dataset``.
+
+    The results are those of ``calculate_tonyears_grid``, with `method`, `time_horizon`,
+    `delay` and `discount_rate` dimensions. With ``chunks`` the variables are dask arrays,
+    and each block of the grid is only computed when it is needed, so sweeps too large
+    for memory can be reduced or written out block by block, e.g. with
+    ``calculate_tonyears_dataset(..., chunks={"delay": 1000}).to_zarr(store)``.
+
+    Parameters
+    ----------
+    methods : sequence of str
+        Ton-year accounting methods ('mc', 'lashof', 'car', 'qc')
+    baseline : np.ndarray, str or tuple
+        Baseline curve, curve name or (a, tau) pair, as in ``calculate_tonyears_grid``
+    time_horizons : array_like of int
+        Periods over which the impact of an emission is considered (years)
+    delays : array_like of int
+        Emission delays (years)
+    discount_rates : array_like of float
+        Discount rates expressed as fractions
+    integration : str
+        'trapz' (default) or 'analytic', as in ``calculate_tonyears``
+    chunks : dict, optional
+        Block size along any of the `time_horizon`, `delay` and `discount_rate` dimensions
+        (the full length by default). If None, the grid is computed eagerly.
+
+    Returns
+    -------
+    ds : xr.Dataset
+        Dataset with `baseline_atm_cost`, `benefit` and `num_for_equivalence` variables
+    """
+
+    xr = _import_xarray()
+    if chunks is None:
+        return to_dataset(
+            calculate_tonyears_grid(
+                methods, baseline, time_horizons, delays, discount_rates, integration
+            )
+        )
+
+    dask, da = _import_dask_array()
+    methods = list(methods)
+    for method in methods:
+        if method not in METHODS:
+            raise ValueError(f"No ton-year accounting method called {method}")
+    if integration not in ("trapz", "analytic"):
+        raise ValueError(f"No integration method called {integration}")
+    coords = {
+        "method": np.array(methods),
+        "time_horizon": np.atleast_1d(np.asarray(time_horizons, dtype=int)),
+        "delay": np.atleast_1d(np.asarray(delays, dtype=int)),
+        "discount_rate": np.atleast_1d(np.asarray(discount_rates, dtype=float)),
+    }
+    unknown = set(chunks) - {"time_horizon", "delay", "discount_rate"}
+    if unknown:
+        raise ValueError(f"Cannot chunk along {sorted(unknown)[0]}")
+    bounds = {
+        dim: _chunk_bounds(len(coords[dim]), chunks.get(dim))
+        for dim in ("time_horizon", "delay", "discount_rate")
+    }
+
+    compute_block = dask.delayed(calculate_tonyears_grid, pure=True)
+    blocks: Dict[str, list] = {name: [] for name in GRID_VARIABLES}
+    for h0, h1 in bounds["time_horizon"]:
+        rows: Dict[str, list] = {name: [] for name in GRID_VARIABLES}
+        for d0, d1 in bounds["delay"]:
+            cells: Dict[str, list] = {name: [] for name in GRID_VARIABLES}
+            for r0, r1 in bounds["discount_rate"]:
+                grid = compute_block(
+                    methods,
+                    baseline,
+                    coords["time_horizon"][h0:h1],
+                    coords["delay"][d0:d1],
+                    coords["discount_rate"][r0:r1],
+                    integration,
+                )
+                shape = (len(methods), h1 - h0, d1 - d0, r1 - r0)
+                for name in GRID_VARIABLES:
+                    cells[name].append(
+                        da.from_delayed(grid[name], shape, dtype=np.float64)
+                    )
+            for name in GRID_VARIABLES:
+                rows[name].append(cells[name])
+        for name in GRID_VARIABLES:
+            blocks[name].append(rows[name])
+
+    dims = ("method", "time_horizon", "delay", "discount_rate")
+    return xr.Dataset(
+        {name: (dims, da.block([blocks[name]])) for name in GRID_VARIABLES},
+        coords=coords,
+    )
+
+
+def joos_2013_monte_carlo_dataset(
+    runs: int = 100,
+    t_horizon: int = 1001,
+    seed=None,
+    dtype: DTypeLike = np.float64,
+    chunk_size: int = 10000,
+    sampler: str = "random",
+    lazy: bool = False,
+):
+    """Monte Carlo ensemble of the Joos_2013 IRF as an ``xarray.Dataset``.
+
+    Runs are split into blocks of ``chunk_size`` with child seeds spawned from ``seed``, as
+    in ``joos_2013_monte_carlo`` with ``workers`` set, so results are identical to
+    ``joos_2013_monte_carlo(runs, t_horizon, seed, workers=..., chunk_size=chunk_size)``
+    whether they are computed eagerly or lazily.
+
+    Parameters
+    ----------
+    runs : int
+        Number of runs for Monte Carlo simulation. Must be >1.
+    t_horizon : int
+        Length of the time horizon over which baseline curve is calculated (years)
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Root seed of the run blocks
+    dtype : data-type
+        Data type of the ensemble, e.g. np.float32 to halve memory use
+    chunk_size : int
+        Number of runs in each block (and each dask chunk)
+    sampler : str
+        Sampling strategy, 'random', 'sobol', 'lhs' or 'antithetic' (see
+        ``sample_joos_2013_parameters``). Each block is a separate design.
+    lazy : bool
+        If True, the ensemble is a dask array whose blocks are only computed when needed,
+        so ensembles too large for memory can be reduced or written out block by block,
+        e.g. with ``joos_2013_monte_carlo_dataset(..., lazy=True).to_zarr(store)``.
+
+    Returns
+    -------
+    ds : xr.Dataset
+        Dataset with an `irf` variable of dimensions (`time`, `run`)
+    """
+
+    xr = _import_xarray()
+    if runs <= 1:
+        raise ValueError("number of runs must be >1")
+    blocks = _spawn_sampler_blocks(runs, chunk_size, seed, sampler)
+    dtype = np.dtype(dtype)
+
+    if lazy:
+        dask, da = _import_dask_array()
+        chunk = dask.delayed(_joos_2013_chunk, pure=True)
+        irf = da.concatenate(
+            [
+                da.from_delayed(
+                    chunk(stop - start, t_horizon, block_seed, dtype, block_sampler),
+                    (t_horizon, stop - start),
+                    dtype=dtype,
+                )
+                for start, stop, block_seed, block_sampler in blocks
+            ],
+            axis=1,
+        )
+    else:
+        irf = np.empty((t_horizon, runs), dtype=dtype)
+        for start, stop, block_seed, block_sampler in blocks:
+            irf[:, start:stop] = _joos_2013_chunk(
+                stop - start, t_horizon, block_seed, dtype, block_sampler
+            )
+
+    return xr.Dataset(
+        {"irf": (("time", "run"), irf)},
+        coords={"time": np.arange(t_horizon), "run": np.arange(runs)},
+        attrs={"sampler": sampler},
+    )
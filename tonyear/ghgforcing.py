@@ -22,11 +22,27 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Tuple
+import os
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from scipy.stats import multivariate_normal
+from numpy.typing import DTypeLike
+from scipy import fft
+from scipy.stats import multivariate_normal, norm, qmc
+
+from .core import (
+    METHODS,
+    TonYearIndex,
+    _integrate_exponentials,
+    analytic_tonyears,
+    get_curve_parameters,
+    sum_of_exponentials,
+)
+from .parallel import attach_shared_array, map_blocks, map_blocks_shared, spawn_blocks
+from .profiling import instrumented
+from .stats import HistogramSketch, OnlineMoments, standard_error
 
 
 def joos_2013(t_horizon: int, **kwargs) -> np.ndarray:
@@ -44,27 +60,169 @@ def joos_2013(t_horizon: int, **kwargs) -> np.ndarray:
         IRF curve in the form of an 1D array
     """
 
-    a0 = kwargs.get("a0", 0.2173)
-    a1 = kwargs.get("a1", 0.224)
-    a2 = kwargs.get("a2", 0.2824)
-    a3 = kwargs.get("a3", 0.2763)
-    tau1 = kwargs.get("tau1", 394.4)
-    tau2 = kwargs.get("tau2", 36.54)
-    tau3 = kwargs.get("tau3", 4.304)
+    (a0, a1, a2, a3), (_, tau1, tau2, tau3) = get_curve_parameters("joos_2013")
+    a = [kwargs.get(k, v) for k, v in [("a0", a0), ("a1", a1), ("a2", a2), ("a3", a3)]]
+    tau = [0] + [
+        kwargs.get(k, v) for k, v in [("tau1", tau1), ("tau2", tau2), ("tau3", tau3)]
+    ]
 
-    t = np.arange(t_horizon)
-    IRF = a0 + a1 * np.exp(-t / tau1) + a2 * np.exp(-t / tau2) + a3 * np.exp(-t / tau3)
+    IRF = sum_of_exponentials(a, tau, np.arange(t_horizon))
     return IRF
 
 
+# sigma and x are from Olivie and Peters (2013) Table 5 (J13 values)
+# They are the covariance and mean arrays for CO2 IRF uncertainty, with parameters
+# ordered as log(tau1), log(tau2), log(tau3), b1, b2, b3
+JOOS_2013_SIGMA = np.array(
+    [
+        [0.129, -0.058, 0.017, -0.042, -0.004, -0.009],
+        [-0.058, 0.167, -0.109, 0.072, -0.015, 0.003],
+        [0.017, -0.109, 0.148, -0.043, 0.013, -0.013],
+        [-0.042, 0.072, -0.043, 0.090, 0.009, 0.006],
+        [-0.004, -0.015, 0.013, 0.009, 0.082, 0.013],
+        [-0.009, 0.003, -0.013, 0.006, 0.013, 0.046],
+    ]
+)
+JOOS_2013_X = np.array([5.479, 2.913, 0.496, 0.181, 0.401, -0.472])
+
+
+def _joos_2013_parameters(p_samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert Olivie and Peters (2013) parameter samples of shape (runs, 6) into IRF
+    weights and timescales of shape (runs, 4), constant term first."""
+
+    p_exp = np.exp(p_samples)
+    tau = p_exp[:, :3]
+    b = p_exp[:, 3:]
+    a = b / (1 + b[:, [0]] + b[:, [1]] + b[:, [2]])
+
+    (a0, *_), _ = get_curve_parameters("joos_2013")
+    runs = len(p_samples)
+    a = np.concatenate((np.full((runs, 1), a0), a), axis=1)
+    tau = np.concatenate((np.zeros((runs, 1)), tau), axis=1)
+    return a, tau
+
+
+SAMPLERS = ("random", "sobol", "lhs", "antithetic")
+
+
+class _Joos2013Sampler:
+    """Draws successive batches of Olivie and Peters (2013) parameter samples.
+
+    Successive 'random' and 'sobol' batches continue the same pseudo-random stream or
+    scrambled Sobol sequence, as do 'antithetic' batches of even size. Each 'lhs' batch is
+    a separate Latin hypercube design.
+    """
+
+    def __init__(self, sampler: str = "random", seed=None) -> None:
+        if sampler not in SAMPLERS:
+            raise ValueError(f"No sampler called {sampler}")
+        self.sampler = sampler
+        self.random_state = None if seed is None else np.random.default_rng(seed)
+        if sampler != "random":
+            self.rng = self.random_state or np.random.default_rng()
+            self.cholesky = np.linalg.cholesky(JOOS_2013_SIGMA)
+        if sampler == "sobol":
+            self.engine = qmc.Sobol(d=6, scramble=True, seed=self.rng)
+
+    @instrumented("sample_parameters")
+    def draw(self, runs: int) -> np.ndarray:
+        """Parameter samples of shape (runs, 6)"""
+        if self.sampler == "random":
+            p_samples = multivariate_normal.rvs(
+                JOOS_2013_X, JOOS_2013_SIGMA, runs, random_state=self.random_state
+            )
+            return np.atleast_2d(p_samples)
+
+        if self.sampler == "antithetic":
+            z = self.rng.standard_normal(((runs + 1) // 2, 6))
+            normal = np.empty((2 * len(z), 6))
+            normal[0::2], normal[1::2] = z, -z
+            normal = normal[:runs]
+        else:
+            if self.sampler == "sobol":
+                uniform = self.engine.random(runs)
+            else:
+                uniform = qmc.LatinHypercube(d=6, seed=self.rng).random(runs)
+            # scrambled points are never exactly 0 or 1 in practice; guard the tails anyway
+            uniform = np.clip(uniform, np.finfo(float).tiny, 1 - np.finfo(float).eps)
+            normal = norm.ppf(uniform)
+        return JOOS_2013_X + normal @ self.cholesky.T
+
+
+def sample_joos_2013_parameters(
+    runs: int, seed=None, sampler: str = "random"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Sample Joos_2013 IRF parameters from the Olivie and Peters (2013) uncertainty
+    distribution.
+
+    Parameters
+    ----------
+    runs : int
+        Number of parameter sets to sample
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed or random number generator. If None, numpy's global random state is used for
+        the 'random' sampler and fresh entropy for the others.
+    sampler : str
+        How the multivariate normal samples are drawn:
+
+        - ``'random'``: independent pseudo-random samples (default)
+        - ``'sobol'``: scrambled Sobol' points (best with a power of two ``runs``)
+        - ``'lhs'``: a Latin hypercube design
+        - ``'antithetic'``: pseudo-random samples in antithetic pairs, mirrored about the
+          mean, at positions (0, 1), (2, 3), ...
+
+        Uniform Sobol' and Latin hypercube points are mapped to the Olivie and Peters
+        distribution through the inverse normal CDF and the Cholesky factor of its
+        covariance. These spread samples more evenly than independent draws, so summary
+        statistics converge with far fewer runs.
+
+    Returns
+    -------
+    a, tau : np.ndarray
+        IRF weights and timescales (years) of shape (runs, 4), constant term first
+    """
+
+    return _joos_2013_parameters(_Joos2013Sampler(sampler, seed).draw(runs))
+
+
+def _summary_frame(
+    mean: np.ndarray, std: np.ndarray, p5: np.ndarray, p95: np.ndarray
+) -> pd.DataFrame:
+    summary = pd.DataFrame(columns=["mean", "-2sigma", "+2sigma", "5th", "95th"])
+    summary["mean"] = mean
+    summary["+2sigma"] = mean + (1.96 * std)
+    summary["-2sigma"] = mean - (1.96 * std)
+    summary["5th"] = p5
+    summary["95th"] = p95
+    return summary
+
+
+@instrumented("summarize")
+def _summarize(results: np.ndarray) -> pd.DataFrame:
+    """Summarize an ensemble of shape (t_horizon, runs)"""
+
+    p5, p95 = np.percentile(results, [5, 95], axis=1)
+    return _summary_frame(np.mean(results, axis=1), np.std(results, axis=1), p5, p95)
+
+
+@instrumented()
 def joos_2013_monte_carlo(
-    runs: int = 100, t_horizon: int = 1001, **kwargs
+    runs: int = 100,
+    t_horizon: int = 1001,
+    seed=None,
+    dtype: DTypeLike = np.float64,
+    workers: Optional[int] = None,
+    chunk_size: int = 10000,
+    sampler: str = "random",
+    **kwargs,
 ) -> Tuple[pd.DataFrame, np.ndarray]:
     """Runs a monte carlo simulation for the Joos_2013 baseline IRF curve.
 
     This function uses uncertainty parameters for the Joos_2013 curve calculated by
     Olivie and Peters (2013): https://esd.copernicus.org/articles/4/267/2013/
 
+    All runs are evaluated together as a single (runs, t_horizon) array operation.
+
     Parameters
     ----------
     runs : int
@@ -72,6 +230,22 @@ def joos_2013_monte_carlo(
     t_horizon : int
         Length of the time horizon over which baseline curve is
         calculated (years)
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed or random number generator used to sample parameters. If None, numpy's
+        global random state is used.
+    dtype : data-type
+        Data type of the results array, e.g. np.float32 to halve memory use
+    workers : int, optional
+        Number of processes to spread runs across. Runs are split into blocks of
+        ``chunk_size``, each with its own child seed spawned from ``seed``, and written
+        straight into shared memory. Results are identical for any number of workers (but
+        differ from ``workers=None``, which draws every run from one generator).
+    chunk_size : int
+        Number of runs in each block when ``workers`` is set
+    sampler : str
+        Sampling strategy, 'random', 'sobol', 'lhs' or 'antithetic' (see
+        ``sample_joos_2013_parameters``). With ``workers``, each block is a separate
+        design. ``stats.standard_error`` gives a convergence diagnostic for the results.
 
     Returns
     -------
@@ -79,61 +253,758 @@ def joos_2013_monte_carlo(
         Dataframe with 'mean', '+sigma', and '-sigma' columns summarizing
         results of Monte Carlo simulation.
     results : np.ndarray
-        Results from all Monte Carlo runs.
+        Results from all Monte Carlo runs, with shape (t_horizon, runs).
     """
 
     if runs <= 1:
         raise ValueError("number of runs must be >1")
 
-    results = np.zeros((t_horizon, runs))
+    if workers is None:
+        results = _joos_2013_chunk(runs, t_horizon, seed, dtype, sampler)
+    else:
+        blocks = _spawn_sampler_blocks(runs, chunk_size, seed, sampler)
+        results, _ = map_blocks_shared(
+            _fill_joos_2013_block, blocks, (t_horizon, runs), dtype, workers=workers
+        )
+
+    return _summarize(results), results
+
+
+def _joos_2013_chunk(
+    runs: int, t_horizon: int, seed, dtype: DTypeLike, sampler: str = "random"
+) -> np.ndarray:
+    a, tau = sample_joos_2013_parameters(runs, seed=seed, sampler=sampler)
+    return sum_of_exponentials(a, tau, np.arange(t_horizon), dtype=dtype).T
+
+
+def _spawn_sampler_blocks(
+    runs: int, chunk_size: int, seed, sampler: str
+) -> List[Tuple[int, int, np.random.SeedSequence, str]]:
+    """``spawn_blocks`` with the sampler appended to each block"""
+    if sampler == "antithetic" and chunk_size % 2:
+        raise ValueError("chunk_size must be even for antithetic sampling")
+    return [block + (sampler,) for block in spawn_blocks(runs, chunk_size, seed)]
+
 
-    # Monte Carlo simulations
+def _fill_joos_2013_block(
+    name: str,
+    shape: Tuple[int, int],
+    dtype: str,
+    start: int,
+    stop: int,
+    seed,
+    sampler: str = "random",
+) -> None:
+    """Worker task writing one block of runs into a shared results array"""
+    chunk = _joos_2013_chunk(stop - start, shape[0], seed, dtype, sampler)
+    with attach_shared_array(name, shape, dtype) as results:
+        results[:, start:stop] = chunk
+
+
+def iter_joos_2013_monte_carlo(
+    runs: int = 100,
+    t_horizon: int = 1001,
+    chunk_size: int = 10000,
+    seed=None,
+    dtype: DTypeLike = np.float64,
+    sampler: str = "random",
+) -> Iterator[np.ndarray]:
+    """Generate a Monte Carlo ensemble for the Joos_2013 baseline IRF curve in chunks.
+
+    Chunks are drawn sequentially from the same random number generator, so concatenating
+    them along the last axis gives the same ensemble as ``joos_2013_monte_carlo`` with the
+    same ``seed``.
+
+    Parameters
+    ----------
+    runs : int
+        Total number of runs for Monte Carlo simulation
+    t_horizon : int
+        Length of the time horizon over which baseline curve is
+        calculated (years)
+    chunk_size : int
+        Maximum number of runs in each chunk
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed or random number generator used to sample parameters. If None, numpy's
+        global random state is used.
+    dtype : data-type
+        Data type of the yielded arrays
+    sampler : str
+        Sampling strategy (see ``sample_joos_2013_parameters``). Chunks continue the same
+        'sobol' sequence and 'antithetic' pairs (which need an even ``chunk_size``), while
+        each 'lhs' chunk is a separate Latin hypercube design.
+
+    Yields
+    ------
+    chunk : np.ndarray
+        Results from up to ``chunk_size`` Monte Carlo runs, with shape
+        (t_horizon, chunk_size).
+    """
+
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer")
+
+    if sampler == "antithetic" and chunk_size % 2:
+        raise ValueError("chunk_size must be even for antithetic sampling")
+
+    draws = _Joos2013Sampler(sampler, seed)
+    for start in range(0, runs, chunk_size):
+        a, tau = _joos_2013_parameters(draws.draw(min(chunk_size, runs - start)))
+        yield sum_of_exponentials(a, tau, np.arange(t_horizon), dtype=dtype).T
+
+
+def _accumulate_chunks(
+    t_horizon: int,
+    chunks: Iterable[Tuple[int, np.ndarray]],
+    scratch: Optional[str],
+    sketch: Optional[HistogramSketch],
+) -> Tuple[List[OnlineMoments], Optional[HistogramSketch]]:
+    """Accumulate per-chunk moments, and optionally a sketch and a scratch file, from
+    (start, chunk) pairs"""
+
+    moments = []
+    out = None if scratch is None else np.load(scratch, mmap_mode="r+")
+    for start, chunk in chunks:
+        chunk_moments = OnlineMoments(t_horizon)
+        chunk_moments.update(chunk)
+        moments.append(chunk_moments)
+        if sketch is not None:
+            sketch.update(chunk)
+        if out is not None:
+            out[:, start : start + chunk.shape[1]] = chunk
+    if out is not None:
+        out.flush()
+    return moments, sketch
+
+
+def _accumulate_joos_2013_blocks(
+    t_horizon: int,
+    dtype: str,
+    blocks: List[Tuple[int, int, np.random.SeedSequence, str]],
+    scratch: Optional[str],
+    sketch: Optional[HistogramSketch],
+) -> Tuple[List[OnlineMoments], Optional[HistogramSketch]]:
+    """Worker task accumulating statistics over a group of independently seeded blocks"""
+    chunks = (
+        (start, _joos_2013_chunk(stop - start, t_horizon, seed, dtype, sampler))
+        for start, stop, seed, sampler in blocks
+    )
+    return _accumulate_chunks(t_horizon, chunks, scratch, sketch)
+
+
+@instrumented()
+def joos_2013_monte_carlo_summary(
+    runs: int = 100,
+    t_horizon: int = 1001,
+    chunk_size: int = 10000,
+    seed=None,
+    dtype: DTypeLike = np.float64,
+    percentiles: str = "exact",
+    bins: int = 2048,
+    scratch_dir: Optional[str] = None,
+    workers: Optional[int] = None,
+    sampler: str = "random",
+) -> pd.DataFrame:
+    """Summarize a Joos_2013 Monte Carlo ensemble without holding it in memory.
+
+    The ensemble is generated in chunks of ``chunk_size`` runs, so peak memory depends on
+    the chunk size rather than on the number of runs. Mean and standard deviation are
+    accumulated online and agree with ``joos_2013_monte_carlo`` to within floating point
+    rounding (relative differences around 1e-12).
+
+    Percentiles are computed in one of two ways:
+
+    - ``'exact'``: chunks are written to a memory-mapped scratch file and percentiles are
+      computed in a second pass over blocks of time steps. Results are identical to
+      ``joos_2013_monte_carlo``; disk use is ``t_horizon * runs * itemsize`` bytes.
+    - ``'sketch'``: a fixed-size histogram with ``bins`` bins per time step is accumulated.
+      No scratch file is written, and estimates are accurate to about one bin width
+      (three times the spread of the first chunk divided by ``bins``; roughly 1e-4 for the
+      default settings).
+
+    Parameters
+    ----------
+    runs : int
+        Number of runs for Monte Carlo simulation. Must be >1.
+    t_horizon : int
+        Length of the time horizon over which baseline curve is
+        calculated (years)
+    chunk_size : int
+        Maximum number of runs generated at once
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed or random number generator used to sample parameters. If None, numpy's
+        global random state is used.
+    dtype : data-type
+        Data type used to generate each chunk
+    percentiles : str
+        Percentile method, either 'exact' or 'sketch'
+    bins : int
+        Number of histogram bins per time step for the 'sketch' method
+    scratch_dir : str, optional
+        Directory for the scratch file of the 'exact' method. Defaults to the system
+        temporary directory.
+    workers : int, optional
+        Number of processes to spread chunks across. Each chunk then gets its own child
+        seed from ``seed``, so the summary is identical for any number of workers (but
+        differs from ``workers=None``, which draws every chunk from one generator).
+    sampler : str
+        Sampling strategy, as in ``iter_joos_2013_monte_carlo``
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        Dataframe with the same columns as the summary from ``joos_2013_monte_carlo``.
+    """
+
+    if runs <= 1:
+        raise ValueError("number of runs must be >1")
+    if percentiles not in ("exact", "sketch"):
+        raise ValueError(f"No percentile method called {percentiles}")
 
-    # sigma and x are from Olivie and Peters (2013) Table 5 (J13 values)
-    # They are the covariance and mean arrays for CO2 IRF uncertainty
-    sigma = np.array(
-        [
-            [0.129, -0.058, 0.017, -0.042, -0.004, -0.009],
-            [-0.058, 0.167, -0.109, 0.072, -0.015, 0.003],
-            [0.017, -0.109, 0.148, -0.043, 0.013, -0.013],
-            [-0.042, 0.072, -0.043, 0.090, 0.009, 0.006],
-            [-0.004, -0.015, 0.013, 0.009, 0.082, 0.013],
-            [-0.009, 0.003, -0.013, 0.006, 0.013, 0.046],
+    with tempfile.TemporaryDirectory(dir=scratch_dir) as tmp:
+        scratch = None
+        if percentiles == "exact":
+            scratch = os.path.join(tmp, "ensemble.npy")
+            np.lib.format.open_memmap(
+                scratch, mode="w+", dtype=dtype, shape=(t_horizon, runs)
+            ).flush()
+
+        if workers is None:
+            chunks = iter_joos_2013_monte_carlo(
+                runs, t_horizon, chunk_size, seed, dtype, sampler
+            )
+            starts = range(0, runs, chunk_size)
+            sketch = HistogramSketch(bins) if percentiles == "sketch" else None
+            moments, sketch = _accumulate_chunks(
+                t_horizon, zip(starts, chunks), scratch, sketch
+            )
+        else:
+            blocks = _spawn_sampler_blocks(runs, chunk_size, seed, sampler)
+            sketch = None
+            if percentiles == "sketch":
+                # bin ranges come from the first block, as in the serial path
+                start, stop, block_seed, _ = blocks[0]
+                sketch = HistogramSketch(bins)
+                sketch.update(
+                    _joos_2013_chunk(
+                        stop - start, t_horizon, block_seed, dtype, sampler
+                    )
+                )
+            groups = [
+                [blocks[i] for i in group]
+                for group in np.array_split(np.arange(len(blocks)), workers)
+                if len(group)
+            ]
+            tasks = [
+                (
+                    t_horizon,
+                    np.dtype(dtype).str,
+                    group,
+                    scratch,
+                    None if sketch is None else sketch.empty_like(),
+                )
+                for group in groups
+            ]
+            moments, sketch = [], None if sketch is None else sketch.empty_like()
+            for group_moments, group_sketch in map_blocks(
+                _accumulate_joos_2013_blocks, tasks, workers=workers
+            ):
+                moments.extend(group_moments)
+                if sketch is not None and group_sketch is not None:
+                    sketch.merge(group_sketch)
+
+        total = OnlineMoments(t_horizon)
+        for chunk_moments in moments:
+            total.merge(chunk_moments)
+
+        if sketch is not None:
+            p5, p95 = sketch.percentile(5), sketch.percentile(95)
+        else:
+            assert scratch is not None
+            results = np.load(scratch, mmap_mode="r")
+            # second pass over blocks of time steps holding about chunk_size * t_horizon values
+            p5, p95 = np.empty(t_horizon), np.empty(t_horizon)
+            block = max(1, chunk_size * t_horizon // runs)
+            for t0 in range(0, t_horizon, block):
+                p5[t0 : t0 + block], p95[t0 : t0 + block] = np.percentile(
+                    results[t0 : t0 + block], [5, 95], axis=1
+                )
+            del results
+
+    return _summary_frame(total.mean, total.std, p5, p95)
+
+
+def _ensemble_tonyears(
+    method: str, results: np.ndarray, time_horizon: int, delay, discount_rate: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Baseline cost and benefit of every run in an ensemble of shape (t_horizon, runs)"""
+    index = TonYearIndex(results[: time_horizon + 1], discount_rate)
+    return index.baseline_atm_cost(time_horizon), index.benefit(
+        method, time_horizon, delay
+    )
+
+
+def _joos_2013_tonyears_block(
+    method: str,
+    time_horizon: int,
+    delay,
+    discount_rate: float,
+    dtype: str,
+    integration: str,
+    start: int,
+    stop: int,
+    seed,
+    sampler: str = "random",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Worker task generating one block of runs and accounting for it"""
+    if integration == "analytic":
+        a, tau = sample_joos_2013_parameters(stop - start, seed=seed, sampler=sampler)
+        return analytic_tonyears(method, a, tau, time_horizon, delay, discount_rate)
+    chunk = _joos_2013_chunk(stop - start, time_horizon + 1, seed, dtype, sampler)
+    return _ensemble_tonyears(method, chunk, time_horizon, delay, discount_rate)
+
+
+@instrumented()
+def calculate_tonyears_monte_carlo(
+    method: str,
+    time_horizon: int,
+    delay,
+    discount_rate: float,
+    results: Optional[np.ndarray] = None,
+    runs: int = 100,
+    seed=None,
+    dtype: DTypeLike = np.float64,
+    workers: Optional[int] = None,
+    chunk_size: int = 10000,
+    integration: str = "trapz",
+    sampler: str = "random",
+) -> dict:
+    """Propagate Joos_2013 IRF uncertainty through a ton-year accounting method.
+
+    Costs, benefits and equivalence ratios are computed for every run of a Monte Carlo
+    ensemble at once, in chunks of ``chunk_size`` runs, instead of calling
+    ``calculate_tonyears`` once per run.
+
+    Parameters
+    ----------
+    method : str
+        The ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+    time_horizon : int
+        Specifies the period over which the impact of an emission is considered (years)
+    delay : int or array_like of int
+        Emission delay(s) for which a ton-year benefit will be calculated (years)
+    discount_rate : float
+        Specifies the discount rate to apply time preference to both costs and benefits
+    results : np.ndarray, optional
+        Ensemble of baseline curves with shape (t_horizon, runs), e.g. the results from
+        ``joos_2013_monte_carlo``. If None, an ensemble of ``runs`` curves is generated.
+    runs : int
+        Number of runs to generate when ``results`` is None. Must be >1.
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed or random number generator used when generating the ensemble. The generated
+        ensemble matches ``joos_2013_monte_carlo`` with the same ``seed``, ``workers`` and
+        ``chunk_size``.
+    dtype : data-type
+        Data type of the generated ensemble
+    workers : int, optional
+        Number of processes to spread generated runs across (see ``joos_2013_monte_carlo``).
+        Ignored when ``results`` is given.
+    chunk_size : int
+        Number of runs processed at once
+    integration : str
+        'trapz' (default) or 'analytic', as in ``calculate_tonyears``. Analytic integration
+        works directly on the sampled IRF parameters without building any curves, so it
+        cannot be combined with ``results``.
+    sampler : str
+        Sampling strategy when generating the ensemble, as in ``iter_joos_2013_monte_carlo``
+        (or ``joos_2013_monte_carlo`` with ``workers``). For ``results`` from antithetic
+        sampling, pass 'antithetic' so that the standard errors account for the pairs.
+
+    Returns
+    -------
+    ensemble_dict : dict
+        Return dict with the following keys:
+
+        - `parameters` : key parameters used for the calculation
+        - `baseline_atm_cost` : the cost of a baseline emission in each run, with shape
+          (runs,)
+        - `benefit` : the benefit of delaying an emission in each run, with shape
+          delay.shape + (runs,)
+        - `num_for_equivalence` : the ratio between the baseline cost and the benefit in
+          each run, with the same shape as `benefit`
+        - `summary` : dict mapping each of the above quantities to a dataframe with the
+          same columns as the summary from ``joos_2013_monte_carlo``, indexed by delay
+        - `standard_error` : dict mapping each of the above quantities to the standard
+          error of its ensemble mean, indexed by delay (see ``stats.standard_error``)
+    """
+
+    if method not in METHODS:
+        raise ValueError(f"No ton-year accounting method called {method}")
+    if integration not in ("trapz", "analytic"):
+        raise ValueError(f"No integration method called {integration}")
+    if integration == "analytic" and results is not None:
+        raise ValueError(
+            "Analytic integration needs IRF parameters, not results curves."
+        )
+
+    if results is not None:
+        if results.ndim != 2:
+            raise ValueError("results must have shape (t_horizon, runs)")
+        outputs = [
+            _ensemble_tonyears(
+                method,
+                results[:, start : start + chunk_size],
+                time_horizon,
+                delay,
+                discount_rate,
+            )
+            for start in range(0, results.shape[1], chunk_size)
+        ]
+    elif runs <= 1:
+        raise ValueError("number of runs must be >1")
+    elif workers is None and integration == "analytic":
+        if sampler == "antithetic" and chunk_size % 2:
+            raise ValueError("chunk_size must be even for antithetic sampling")
+        draws = _Joos2013Sampler(sampler, seed)
+        outputs = [
+            analytic_tonyears(
+                method,
+                *_joos_2013_parameters(draws.draw(min(chunk_size, runs - start))),
+                time_horizon,
+                delay,
+                discount_rate,
+            )
+            for start in range(0, runs, chunk_size)
+        ]
+    elif workers is None:
+        chunks = iter_joos_2013_monte_carlo(
+            runs, time_horizon + 1, chunk_size, seed=seed, dtype=dtype, sampler=sampler
+        )
+        outputs = [
+            _ensemble_tonyears(method, chunk, time_horizon, delay, discount_rate)
+            for chunk in chunks
         ]
+    else:
+        params = (
+            method,
+            time_horizon,
+            delay,
+            discount_rate,
+            np.dtype(dtype).str,
+            integration,
+        )
+        blocks = _spawn_sampler_blocks(runs, chunk_size, seed, sampler)
+        tasks = [params + block for block in blocks]
+        outputs = map_blocks(_joos_2013_tonyears_block, tasks, workers=workers)
+
+    baseline_atm_cost = np.concatenate([cost for cost, _ in outputs], axis=-1)
+    benefit = np.concatenate([benefit for _, benefit in outputs], axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        num_for_equivalence = baseline_atm_cost / benefit
+
+    delays = np.atleast_1d(delay)
+    summary, errors = {}, {}
+    for key, value in [
+        ("baseline_atm_cost", np.broadcast_to(baseline_atm_cost, benefit.shape)),
+        ("benefit", benefit),
+        ("num_for_equivalence", num_for_equivalence),
+    ]:
+        value = value.reshape(len(delays), -1)
+        summary[key] = _summarize(value)
+        summary[key].index = pd.Index(delays, name="delay")
+        errors[key] = pd.Series(
+            standard_error(value, antithetic=sampler == "antithetic"),
+            index=summary[key].index,
+        )
+
+    return {
+        "parameters": {
+            "method": method,
+            "time_horizon": time_horizon,
+            "delay": delay,
+            "discount_rate": discount_rate,
+        },
+        "baseline_atm_cost": baseline_atm_cost,
+        "benefit": benefit,
+        "num_for_equivalence": num_for_equivalence,
+        "summary": summary,
+        "standard_error": errors,
+    }
+
+
+# Multi-gas forcing. Radiative efficiencies, lifetimes and the CH4 and N2O indirect effects
+# follow IPCC AR5 WG1 Chapter 8 (Myhre et al. 2013, Table 8.A.1 and Section 8.SM.11.3)
+GASES = ("co2", "ch4", "n2o")
+ATMOSPHERE_MASS = 5.1352e18  # kg
+AIR_MOLAR_MASS = 28.97  # g mol-1
+MOLAR_MASS = {"co2": 44.01, "ch4": 16.04, "n2o": 44.01}  # g mol-1
+
+
+def _per_kg(radiative_efficiency: float, molar_mass: float) -> float:
+    """Convert a radiative efficiency from W m-2 ppb-1 to W m-2 kg-1"""
+    return radiative_efficiency * AIR_MOLAR_MASS / molar_mass * 1e9 / ATMOSPHERE_MASS
+
+
+# Radiative efficiency of each gas (W m-2 kg-1). CH4 includes the indirect effects of
+# tropospheric ozone (+50%) and stratospheric water vapour (+15%), and N2O the offsetting
+# decrease in CH4 (0.36 ppb CH4 per ppb N2O)
+RADIATIVE_EFFICIENCY = {
+    "co2": _per_kg(1.37e-5, MOLAR_MASS["co2"]),
+    "ch4": _per_kg(3.63e-4 * 1.65, MOLAR_MASS["ch4"]),
+    "n2o": _per_kg(3.00e-3 * (1 - 0.36 * 1.65 * 3.63e-4 / 3.00e-3), MOLAR_MASS["n2o"]),
+}
+
+# Perturbation lifetimes (years) of the single-exponential CH4 and N2O decays
+LIFETIMES = {"ch4": 12.4, "n2o": 121.0}
+
+# Default relative (1-sigma, lognormal) uncertainties of the multi-gas parameters. These are
+# indicative, of the order of the 5-95% ranges in AR5 WG1 Chapter 8, and should be set for
+# the application at hand. CO2 decay uncertainty comes from Olivie and Peters (2013).
+GAS_UNCERTAINTY = {
+    "co2": {"radiative_efficiency": 0.06},
+    "ch4": {"lifetime": 0.1, "radiative_efficiency": 0.2},
+    "n2o": {"lifetime": 0.1, "radiative_efficiency": 0.1},
+}
+
+
+def _check_gas(gas: str) -> None:
+    if gas not in GASES:
+        raise ValueError(f"No gas called {gas}")
+
+
+def gas_irf_parameters(
+    gas: str, co2_equivalent: bool = False
+) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+    """Returns the IRF parameters of a greenhouse gas as a sum of exponentials
+
+    Parameters
+    ----------
+    gas : str
+        One of 'co2', 'ch4' or 'n2o'
+    co2_equivalent : bool
+        If True, the weights are scaled by the radiative efficiency of the gas relative to
+        CO2, so that the IRF gives the mass of CO2 with the same radiative forcing as the
+        decaying pulse. These parameters can be passed as a baseline to
+        ``calculate_tonyears`` or ``analytic_tonyears`` to account for 1 t of the gas.
+
+    Returns
+    -------
+    a, tau : tuple of float
+        IRF weights and timescales (years), where a timescale of 0 marks the constant term
+    """
+
+    _check_gas(gas)
+    if gas == "co2":
+        a, tau = get_curve_parameters("joos_2013")
+    else:
+        a, tau = (1.0,), (LIFETIMES[gas],)
+    if co2_equivalent:
+        scale = RADIATIVE_EFFICIENCY[gas] / RADIATIVE_EFFICIENCY["co2"]
+        a = tuple(weight * scale for weight in a)
+    return tuple(a), tuple(tau)
+
+
+def global_warming_potential(gas: str, time_horizon) -> np.ndarray:
+    """Returns the global warming potential of a greenhouse gas
+
+    The GWP is the radiative forcing of a 1 kg pulse of the gas integrated over the time
+    horizon, relative to that of 1 kg of CO2.
+
+    Parameters
+    ----------
+    gas : str
+        One of 'co2', 'ch4' or 'n2o'
+    time_horizon : float or array_like
+        Time horizon(s) of the integration (years)
+
+    Returns
+    -------
+    gwp : np.ndarray
+        Global warming potential, with the shape of ``time_horizon``
+    """
+
+    a, tau = gas_irf_parameters(gas, co2_equivalent=True)
+    a_co2, tau_co2 = gas_irf_parameters("co2")
+    agwp = _integrate_exponentials(np.array(a), np.array(tau), time_horizon, 0.0)
+    agwp_co2 = _integrate_exponentials(
+        np.array(a_co2), np.array(tau_co2), time_horizon, 0.0
     )
+    return agwp / agwp_co2
+
 
-    x = np.array([5.479, 2.913, 0.496, 0.181, 0.401, -0.472])
+def sample_gas_parameters(
+    gases: Iterable[str] = GASES, runs: int = 100, seed=None, uncertainty=None
+) -> dict:
+    """Sample uncertain decay and radiative efficiency parameters of greenhouse gases
 
-    p_samples = multivariate_normal.rvs(x, sigma, runs)
-    p_df = pd.DataFrame(p_samples, columns=["t1", "t2", "t3", "b1", "b2", "b3"])
+    CO2 IRF weights and timescales are drawn from the Olivie and Peters (2013) distribution
+    as in ``sample_joos_2013_parameters``. CH4 and N2O lifetimes and all radiative
+    efficiencies are drawn independently from lognormal distributions with medians at their
+    central values.
 
-    p_exp = np.exp(p_df)
-    a1 = p_exp["b1"] / (1 + p_exp["b1"] + p_exp["b2"] + p_exp["b3"])
-    a2 = p_exp["b2"] / (1 + p_exp["b1"] + p_exp["b2"] + p_exp["b3"])
-    a3 = p_exp["b3"] / (1 + p_exp["b1"] + p_exp["b2"] + p_exp["b3"])
+    Parameters
+    ----------
+    gases : iterable of str
+        Gases to sample parameters for
+    runs : int
+        Number of parameter sets to sample per gas
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed or random number generator
+    uncertainty : dict, optional
+        Relative (1-sigma) uncertainty of the 'lifetime' and 'radiative_efficiency' of each
+        gas, updating the defaults in ``GAS_UNCERTAINTY``. A value of 0 fixes a parameter at
+        its central value.
 
-    tau1 = p_exp["t1"]
-    tau2 = p_exp["t2"]
-    tau3 = p_exp["t3"]
+    Returns
+    -------
+    parameters : dict
+        Mapping of each gas to a dict with IRF weights `a` and timescales `tau` of shape
+        (runs, terms), and `radiative_efficiency` (W m-2 kg-1) of shape (runs,), which can
+        be passed to ``calculate_forcing``
+    """
 
-    for count in np.arange(runs):
-        co2_kwargs = {
-            "a1": a1[count],
-            "a2": a2[count],
-            "a3": a3[count],
-            "tau1": tau1[count],
-            "tau2": tau2[count],
-            "tau3": tau3[count],
+    rng = np.random.default_rng(seed)
+    parameters = {}
+    for gas in gases:
+        _check_gas(gas)
+        sigma = {**GAS_UNCERTAINTY[gas], **(uncertainty or {}).get(gas, {})}
+        if gas == "co2":
+            a, tau = sample_joos_2013_parameters(runs, seed=rng)
+        else:
+            a = np.ones((runs, 1))
+            lifetime = LIFETIMES[gas] * np.exp(
+                sigma["lifetime"] * rng.standard_normal(runs)
+            )
+            tau = lifetime[:, np.newaxis]
+        radiative_efficiency = RADIATIVE_EFFICIENCY[gas] * np.exp(
+            sigma["radiative_efficiency"] * rng.standard_normal(runs)
+        )
+        parameters[gas] = {
+            "a": a,
+            "tau": tau,
+            "radiative_efficiency": radiative_efficiency,
         }
+    return parameters
 
-        irf = joos_2013(t_horizon, **co2_kwargs)
-        results[:, count] = irf
 
-    summary = pd.DataFrame(columns=["mean", "-2sigma", "+2sigma", "5th", "95th"])
-    summary["mean"] = np.mean(results, axis=1)
-    summary["+2sigma"] = summary["mean"] + (1.96 * np.std(results, axis=1))
-    summary["-2sigma"] = summary["mean"] - (1.96 * np.std(results, axis=1))
-    summary["5th"] = np.percentile(results, 5, axis=1)
-    summary["95th"] = np.percentile(results, 95, axis=1)
+@instrumented()
+def calculate_forcing(
+    emissions,
+    gases: Iterable[str] = GASES,
+    t_horizon: Optional[int] = None,
+    parameters: Optional[dict] = None,
+    per_gas: bool = False,
+) -> dict:
+    """Calculate the radiative forcing of annual emissions of several greenhouse gases
+
+    Every emission schedule, gas and parameter set is convolved at once: the response of
+    each gas to a 1 t pulse is transformed to the frequency domain a single time, multiplied
+    with the transformed schedules and summed over gases before transforming back, so that
+    the cost grows with schedules x runs rather than schedules x runs x gases.
+
+    Parameters
+    ----------
+    emissions : array_like
+        Annual emissions (t of each gas) at t = 0, 1, 2, ... with shape
+        (..., len(gases), years). Negative values are removals or storage. Leading axes hold
+        batches of independent scenarios.
+    gases : iterable of str
+        Gases along the second-to-last axis of ``emissions``
+    t_horizon : int, optional
+        Number of years t = 0, ..., t_horizon - 1 to calculate the forcing for. Defaults to
+        the length of the emission schedules.
+    parameters : dict, optional
+        Mapping of each gas to a dict with IRF weights `a`, timescales `tau` and
+        `radiative_efficiency` (W m-2 kg-1), e.g. from ``sample_gas_parameters``. Leading
+        axes of these parameters (Monte Carlo runs) are added to the results after the
+        scenario axes. If None, the central values are used.
+    per_gas : bool
+        If True, the forcing of each gas is returned separately along a gas axis following
+        the scenario axes, instead of summed over gases
+
+    Returns
+    -------
+    forcing_dict : dict
+        Return dict with the following keys, each with shape
+        scenarios + [gases] + runs + (t_horizon,):
+
+        - `parameters` : key parameters used for the calculation
+        - `forcing` : radiative forcing (W m-2)
+        - `cumulative_forcing` : forcing integrated from t = 0 with the trapezoidal rule
+          (W m-2 yr)
+        - `co2_equivalent_burden` : the mass of CO2 (tCO2) with the same radiative forcing,
+          at the central CO2 radiative efficiency. With time moved to the first axis it can
+          be passed to ``TonYearIndex`` or used as an atmospheric burden.
+        - `co2_equivalent_tonyears` : cumulative forcing in the same CO2-equivalent units
+          (tCO2-yr), comparable to the `baseline_atm_cost` of ``calculate_tonyears``
+    """
+
+    gases = list(gases)
+    for gas in gases:
+        _check_gas(gas)
+    emissions = np.asarray(emissions, dtype=float)
+    if emissions.ndim < 2 or emissions.shape[-2] != len(gases):
+        raise ValueError("emissions must have shape (..., len(gases), years)")
+    if t_horizon is None:
+        t_horizon = emissions.shape[-1]
+    if t_horizon < 1:
+        raise ValueError("t_horizon must be at least 1 year.")
+
+    if parameters is None:
+        parameters = {}
+        for gas in gases:
+            a, tau = gas_irf_parameters(gas)
+            parameters[gas] = {
+                "a": a,
+                "tau": tau,
+                "radiative_efficiency": RADIATIVE_EFFICIENCY[gas],
+            }
+    missing = [gas for gas in gases if gas not in parameters]
+    if missing:
+        raise ValueError(f"No parameters for gas: {', '.join(missing)}")
+
+    # forcing of a 1 t pulse of each gas, with shape (gases,) + runs + (t_horizon,)
+    t = np.arange(t_horizon)
+    pulses = []
+    for gas in gases:
+        p = parameters[gas]
+        scale = 1000 * np.asarray(p["radiative_efficiency"], dtype=float)
+        pulses.append(scale[..., np.newaxis] * sum_of_exponentials(p["a"], p["tau"], t))
+    kernels = np.stack(np.broadcast_arrays(*pulses))
+    runs = kernels.shape[1:-1]
+
+    # emissions after the horizon cannot affect it, and padding to at least
+    # years + t_horizon - 1 keeps the circular convolution from wrapping around
+    emissions = emissions[..., :t_horizon]
+    n = fft.next_fast_len(emissions.shape[-1] + t_horizon - 1, real=True)
+    emissions_f = fft.rfft(emissions, n, axis=-1)
+    kernels_f = fft.rfft(kernels.reshape(len(gases), -1, t_horizon), n, axis=-1)
+    scenarios = emissions.shape[:-2]
+    if per_gas:
+        forcing_f = emissions_f[..., np.newaxis, :] * kernels_f
+        shape = scenarios + (len(gases),) + runs + (t_horizon,)
+    else:
+        # a batched (scenarios, gases) x (gases, runs) matrix product at each frequency
+        forcing_f = np.matmul(
+            np.moveaxis(emissions_f.reshape(-1, len(gases), n // 2 + 1), -1, 0),
+            np.moveaxis(kernels_f, -1, 0),
+        )
+        forcing_f = np.moveaxis(forcing_f, 0, -1)
+        shape = scenarios + runs + (t_horizon,)
+    forcing = fft.irfft(forcing_f, n, axis=-1)[..., :t_horizon].reshape(shape)
+
+    cumulative_forcing = np.zeros_like(forcing)
+    np.cumsum(
+        (forcing[..., 1:] + forcing[..., :-1]) / 2,
+        axis=-1,
+        out=cumulative_forcing[..., 1:],
+    )
+    co2_forcing = 1000 * RADIATIVE_EFFICIENCY["co2"]
 
-    return summary, results
+    return {
+        "parameters": {"gases": gases, "t_horizon": t_horizon, "per_gas": per_gas},
+        "forcing": forcing,
+        "cumulative_forcing": cumulative_forcing,
+        "co2_equivalent_burden": forcing / co2_forcing,
+        "co2_equivalent_tonyears": cumulative_forcing / co2_forcing,
+    }
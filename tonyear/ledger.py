@@ -0,0 +1,369 @@
+"""Incrementally maintained ton-year ledgers"""
+
+import json
+import os
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from .portfolio import OPTIONAL_COLUMNS, REQUIRED_COLUMNS, calculate_portfolio
+from .profiling import instrumented
+
+INPUT_DTYPES = {
+    "method": object,
+    "tonnes": np.float64,
+    "time_horizon": np.int64,
+    "delay": np.int64,
+    "baseline": object,
+    "discount_rate": np.float64,
+    "vintage": np.int64,
+    "reversal": np.float64,
+}
+RESULT_COLUMNS = [
+    "effective_delay",
+    "baseline_atm_cost",
+    "benefit",
+    "num_for_equivalence",
+    "tonyears",
+    "equivalent_tonnes",
+]
+AGGREGATE_COLUMNS = ["tonnes", "tonyears", "equivalent_tonnes"]
+DERIVED_COLUMNS = ["num_for_equivalence", "tonyears", "equivalent_tonnes"]
+SNAPSHOT_VERSION = 1
+
+
+class Ledger:
+    """Ton-year ledger of a portfolio of storage projects, updated incrementally.
+
+    The ledger holds the results of ``calculate_portfolio`` for each project, and the
+    totals for each vintage. Appending, updating or removing projects evaluates only the
+    affected projects, and adjusts the vintage totals by their change in contributions, so
+    an update costs time proportional to the number of projects it touches rather than
+    the size of the portfolio. Snapshots of the ledger can be saved to a binary ``.npz``
+    file and loaded without evaluating any project.
+
+    Vintage totals are running sums, so they can differ from totals summed afresh by
+    floating point rounding.
+
+    Parameters
+    ----------
+    integration : str
+        'trapz' (default) or 'analytic', as in ``calculate_tonyears``
+
+    Examples
+    --------
+    >>> ledger = Ledger()
+    >>> ids = ledger.append(projects)
+    >>> ledger.update(pd.DataFrame({"project": [ids[0]], "reversal": [2031]}))
+    >>> ledger.aggregate
+    """
+
+    def __init__(self, integration: str = "trapz") -> None:
+        if integration not in ("trapz", "analytic"):
+            raise ValueError(f"No integration method called {integration}")
+        self.integration = integration
+        self._size = 0
+        self._ids = np.empty(0, dtype=object)
+        self._live = np.empty(0, dtype=bool)
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.empty(0, dtype=dtype) for name, dtype in INPUT_DTYPES.items()
+        }
+        self._columns.update({name: np.empty(0) for name in RESULT_COLUMNS})
+        self._rows: Dict = {}
+        self._next_id = 0
+        self._aggregate = pd.DataFrame(
+            columns=AGGREGATE_COLUMNS + ["projects"],
+            index=pd.Index([], dtype=np.int64, name="vintage"),
+            dtype=np.float64,
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, project) -> bool:
+        return project in self._rows
+
+    @property
+    def ids(self) -> pd.Index:
+        """Project ids, in the order the projects were added"""
+        return pd.Index(
+            self._ids[: self._size][self._live[: self._size]], name="project"
+        )
+
+    @property
+    def aggregate(self) -> pd.DataFrame:
+        """Sums of `tonnes`, `tonyears` and `equivalent_tonnes` for each vintage"""
+        return self._aggregate[AGGREGATE_COLUMNS].copy()
+
+    def to_frame(self) -> pd.DataFrame:
+        """The ledger of ``calculate_portfolio``, indexed by project id"""
+        live = self._live[: self._size]
+        frame = pd.DataFrame(
+            {
+                name: column[: self._size][live]
+                for name, column in self._columns.items()
+            },
+            index=self.ids,
+        )
+        frame["delay"] = frame.pop("effective_delay").astype(np.int64)
+        return frame
+
+    def _reserve(self, n: int) -> None:
+        """Grow the columns geometrically to hold n more rows"""
+        capacity = len(self._live)
+        if self._size + n <= capacity:
+            return
+        capacity = max(self._size + n, 2 * capacity, 1024)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[: self._size] = column[: self._size]
+            self._columns[name] = grown
+        ids = np.empty(capacity, dtype=object)
+        ids[: self._size] = self._ids[: self._size]
+        self._ids = ids
+        live = np.zeros(capacity, dtype=bool)
+        live[: self._size] = self._live[: self._size]
+        self._live = live
+
+    def _positions(self, ids: Iterable) -> np.ndarray:
+        try:
+            return np.array([self._rows[project] for project in ids], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"No project with id {e.args[0]!r}") from None
+
+    def _add_to_aggregate(self, positions: np.ndarray, sign: int) -> None:
+        contributions = pd.DataFrame(
+            {
+                **{name: self._columns[name][positions] for name in AGGREGATE_COLUMNS},
+                "projects": 1.0,
+            },
+            index=pd.Index(self._columns["vintage"][positions], name="vintage"),
+        )
+        delta = contributions.groupby(level=0).sum()
+        aggregate = self._aggregate.add(sign * delta, fill_value=0)
+        self._aggregate = aggregate[aggregate["projects"] > 0]
+
+    def _evaluate(self, inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Result columns of the projects with the given input columns"""
+        results, _ = calculate_portfolio(pd.DataFrame(inputs), self.integration)
+        evaluated = {name: results[name].to_numpy() for name in RESULT_COLUMNS[1:]}
+        evaluated["effective_delay"] = results["delay"].to_numpy()
+        return evaluated
+
+    def _inputs(self, projects: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Input columns of a table of projects, with defaults filled in"""
+        missing = [c for c in REQUIRED_COLUMNS if c not in projects.columns]
+        if missing:
+            raise ValueError(f"Missing project columns: {', '.join(missing)}")
+        defaults = dict(OPTIONAL_COLUMNS, reversal=np.nan)
+        return {
+            name: (
+                projects[name].to_numpy(dtype=dtype)
+                if name in projects.columns
+                else np.full(len(projects), defaults[name], dtype=dtype)
+            )
+            for name, dtype in INPUT_DTYPES.items()
+        }
+
+    def _check_new_ids(self, ids: pd.Index) -> None:
+        if ids.inferred_type not in ("integer", "string", "empty"):
+            raise TypeError("Project ids must be integers or strings")
+        if not ids.is_unique:
+            raise ValueError("Project ids must be unique")
+        if self._rows:
+            existing = next(filter(self._rows.__contains__, ids), None)
+            if existing is not None:
+                raise ValueError(f"A project with id {existing!r} already exists")
+
+    @instrumented("ledger_append")
+    def append(self, projects) -> pd.Index:
+        """Add projects to the ledger
+
+        Parameters
+        ----------
+        projects : pd.DataFrame or structured np.ndarray
+            One row per project, with the columns of ``calculate_portfolio`` and an
+            optional `project` column of unique integer or string ids. Projects without ids
+            are numbered after the largest integer id so far.
+
+        Returns
+        -------
+        ids : pd.Index
+            Ids of the added projects
+        """
+
+        projects = pd.DataFrame(projects)
+        n = len(projects)
+        if "project" in projects.columns:
+            ids = pd.Index(projects["project"], name="project")
+        else:
+            ids = pd.RangeIndex(self._next_id, self._next_id + n, name="project")
+        self._check_new_ids(ids)
+        if n == 0:
+            return ids
+        inputs = self._inputs(projects)
+        columns = {**inputs, **self._evaluate(inputs)}
+
+        self._reserve(n)
+        positions = np.arange(self._size, self._size + n)
+        for name, values in columns.items():
+            self._columns[name][positions] = values
+        # ids are kept as Python ints and strings
+        self._ids[positions] = ids.tolist()
+        self._live[positions] = True
+        self._size += n
+        self._rows.update(zip(ids.tolist(), positions.tolist()))
+        if ids.inferred_type == "integer":
+            self._next_id = max(self._next_id, int(ids.max()) + 1)
+        self._add_to_aggregate(positions, +1)
+        return ids
+
+    @instrumented("ledger_update")
+    def update(self, changes) -> None:
+        """Change the inputs of existing projects, e.g. a revised storage duration or a
+        reversal, and re-evaluate them
+
+        Parameters
+        ----------
+        changes : pd.DataFrame or structured np.ndarray
+            A `project` column of the ids of the projects to change, and the new values of
+            any of their input columns
+        """
+
+        changes = pd.DataFrame(changes)
+        if "project" not in changes.columns:
+            raise ValueError("Missing project columns: project")
+        ids = changes["project"].to_numpy(dtype=object)
+        if len(set(ids)) < len(ids):
+            raise ValueError("Project ids must be unique")
+        unknown = set(changes.columns) - set(INPUT_DTYPES) - {"project"}
+        if unknown:
+            raise ValueError(f"No project column called {sorted(unknown)[0]}")
+        positions = self._positions(ids)
+        if len(positions) == 0:
+            return
+
+        inputs = {name: self._columns[name][positions] for name in INPUT_DTYPES}
+        for name in changes.columns.drop("project"):
+            inputs[name] = changes[name].to_numpy(dtype=INPUT_DTYPES[name])
+        # evaluated before anything changes, so invalid updates leave the ledger as it was
+        columns = {**inputs, **self._evaluate(inputs)}
+
+        self._add_to_aggregate(positions, -1)
+        for name, values in columns.items():
+            self._columns[name][positions] = values
+        self._add_to_aggregate(positions, +1)
+
+    @instrumented("ledger_remove")
+    def remove(self, ids) -> None:
+        """Remove projects from the ledger
+
+        Parameters
+        ----------
+        ids : scalar or array_like
+            Ids of the projects to remove
+        """
+
+        ids = np.atleast_1d(np.asarray(ids, dtype=object))
+        if len(set(ids)) < len(ids):
+            raise ValueError("Project ids must be unique")
+        positions = self._positions(ids)
+        self._add_to_aggregate(positions, -1)
+        self._live[positions] = False
+        for project in ids:
+            del self._rows[project]
+        if len(self._rows) < self._size // 2:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop the rows of removed projects"""
+        live = self._live[: self._size]
+        for name, column in self._columns.items():
+            self._columns[name] = column[: self._size][live]
+        self._ids = self._ids[: self._size][live]
+        self._size = len(self._ids)
+        self._live = np.ones(self._size, dtype=bool)
+        self._rows = dict(zip(self._ids, range(self._size)))
+
+    def save(self, path) -> None:
+        """Write a snapshot of the ledger to a binary ``.npz`` file
+
+        Strings are stored as integer codes into their unique values, results that follow
+        from the costs and benefits are recomputed on loading, and nothing is pickled.
+        """
+
+        if len(self) < self._size:
+            self._compact()
+        ids = pd.Index(self._ids[: self._size])
+        if ids.inferred_type not in ("integer", "string", "empty"):
+            raise TypeError(
+                "Only ledgers with all integer or all string ids can be saved"
+            )
+        arrays: Dict[str, np.ndarray] = {
+            "project": ids.to_numpy(
+                dtype=np.int64 if ids.inferred_type == "integer" else str
+            )
+        }
+        for name, column in self._columns.items():
+            column = column[: self._size]
+            if name in DERIVED_COLUMNS:
+                continue
+            if column.dtype == object:
+                codes, categories = pd.factorize(column)
+                arrays[f"{name}.categories"] = categories.astype(str)
+                arrays[f"{name}.codes"] = codes.astype(np.int32)
+            else:
+                arrays[name] = column
+        arrays["aggregate.vintage"] = self._aggregate.index.to_numpy(dtype=np.int64)
+        for name in self._aggregate.columns:
+            arrays[f"aggregate.{name}"] = self._aggregate[name].to_numpy()
+        metadata = {
+            "version": SNAPSHOT_VERSION,
+            "integration": self.integration,
+            "next_id": self._next_id,
+        }
+        arrays["metadata"] = np.array(json.dumps(metadata))
+        with open(os.fspath(path), "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path) -> "Ledger":
+        """Read a ledger from a snapshot written by ``save``"""
+        with np.load(os.fspath(path), allow_pickle=False) as snapshot:
+            metadata = json.loads(str(snapshot["metadata"]))
+            if metadata["version"] > SNAPSHOT_VERSION:
+                raise ValueError("Ledger snapshot is from a newer version of tonyear")
+            ledger = cls(metadata["integration"])
+            ledger._next_id = metadata["next_id"]
+            columns = ledger._columns
+            for name, column in columns.items():
+                if name in DERIVED_COLUMNS:
+                    continue
+                if column.dtype == object:
+                    categories = snapshot[f"{name}.categories"].astype(object)
+                    columns[name] = categories[snapshot[f"{name}.codes"]]
+                else:
+                    columns[name] = snapshot[name]
+            # as in calculate_portfolio
+            cost, benefit = columns["baseline_atm_cost"], columns["benefit"]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                columns["num_for_equivalence"] = cost / benefit
+                columns["tonyears"] = columns["tonnes"] * benefit
+                columns["equivalent_tonnes"] = columns["tonnes"] * benefit / cost
+            ledger._ids = np.empty(len(snapshot["project"]), dtype=object)
+            ledger._ids[:] = snapshot["project"].tolist()
+            ledger._size = len(ledger._ids)
+            ledger._live = np.ones(ledger._size, dtype=bool)
+            ledger._rows = dict(zip(ledger._ids, range(ledger._size)))
+            ledger._aggregate = pd.DataFrame(
+                {
+                    name: snapshot[f"aggregate.{name}"]
+                    for name in AGGREGATE_COLUMNS + ["projects"]
+                },
+                index=pd.Index(snapshot["aggregate.vintage"], name="vintage"),
+            )
+        return ledger
+
+    def __repr__(self) -> str:
+        return f"Ledger(projects={len(self)}, vintages={len(self._aggregate)})"
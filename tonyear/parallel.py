@@ -0,0 +1,152 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+
+def spawn_blocks(
+    runs: int, chunk_size: int, seed=None
+) -> List[Tuple[int, int, np.random.SeedSequence]]:
+    """Split runs into fixed-size blocks, each with an independent child seed.
+
+    Blocks depend only on ``runs``, ``chunk_size`` and ``seed``, never on the number of
+    workers, so results assembled from the blocks are reproducible for any worker count.
+
+    Parameters
+    ----------
+    runs : int
+        Total number of runs
+    chunk_size : int
+        Maximum number of runs in each block
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Root seed. A Generator is used to draw the root entropy.
+
+    Returns
+    -------
+    blocks : list of (start, stop, seed_sequence)
+        Run range and child seed of each block
+    """
+
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer")
+
+    if isinstance(seed, np.random.Generator):
+        seed = int(seed.integers(2**63))
+    if isinstance(seed, np.random.SeedSequence):
+        # copy so spawning does not advance the caller's SeedSequence
+        root = np.random.SeedSequence(
+            seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size
+        )
+    else:
+        root = np.random.SeedSequence(seed)
+
+    starts = range(0, runs, chunk_size)
+    children = root.spawn(len(starts))
+    return [
+        (start, min(start + chunk_size, runs), child)
+        for start, child in zip(starts, children)
+    ]
+
+
+def map_blocks(func: Callable, tasks: Sequence[tuple], workers: int = 1) -> list:
+    """Apply ``func(*task)`` to every task, in order, across a pool of processes.
+
+    With ``workers=1`` tasks run in the calling process.
+    """
+
+    if workers < 1:
+        raise ValueError("workers must be a positive integer")
+    if workers == 1 or len(tasks) <= 1:
+        return [func(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(func, *zip(*tasks)))
+
+
+def imap_blocks(
+    func: Callable,
+    tasks: Iterable[tuple],
+    workers: int = 1,
+    prefetch: Optional[int] = None,
+) -> Iterator:
+    """Lazy, ordered version of ``map_blocks`` for long streams of tasks.
+
+    Tasks are consumed from the iterable as results are yielded, with at most ``prefetch``
+    tasks (default ``2 * workers``) in flight, so memory stays bounded however many tasks
+    there are.
+    """
+
+    if workers < 1:
+        raise ValueError("workers must be a positive integer")
+    if workers == 1:
+        for task in tasks:
+            yield func(*task)
+        return
+
+    prefetch = prefetch or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[Future] = deque()
+        for task in tasks:
+            pending.append(pool.submit(func, *task))
+            if len(pending) >= prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def map_blocks_shared(
+    func: Callable,
+    tasks: Sequence[tuple],
+    shape: Tuple[int, ...],
+    dtype: DTypeLike,
+    workers: int = 1,
+) -> Tuple[np.ndarray, list]:
+    """Like ``map_blocks``, but workers write their output into one shared array.
+
+    Each task is called as ``func(name, shape, dtype, *task)``, where ``name`` is the name
+    of a shared memory block holding an array of ``shape`` and ``dtype`` that the task
+    should fill through ``attach_shared_array``. This avoids pickling large results back
+    to the calling process.
+
+    Returns
+    -------
+    array : np.ndarray
+        Copy of the shared array once every task has finished
+    results : list
+        Return values of each task, in order
+    """
+
+    size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        tasks = [(shm.name, shape, np.dtype(dtype).str) + tuple(task) for task in tasks]
+        results = map_blocks(func, tasks, workers=workers)
+        shared: np.ndarray = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array = shared.copy()
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+    return array, results
+
+
+@contextmanager
+def attach_shared_array(
+    name: str, shape: Tuple[int, ...], dtype: DTypeLike
+) -> Iterator[np.ndarray]:
+    """Attach to an array created by ``map_blocks_shared`` in another process.
+
+    Pool workers share their parent's resource tracker, so attaching does not take
+    ownership of the memory; it is unlinked only by ``map_blocks_shared``.
+    """
+
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        array: np.ndarray = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        yield array
+        del array
+    finally:
+        shm.close()
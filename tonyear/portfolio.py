@@ -0,0 +1,156 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from .core import (
+    METHODS,
+    TonYearIndex,
+    _irf_parameters,
+    analytic_tonyears,
+    get_baseline_curve,
+)
+from .profiling import instrumented
+
+REQUIRED_COLUMNS = ["method", "tonnes", "time_horizon", "delay"]
+OPTIONAL_COLUMNS = {"baseline": "joos_2013", "discount_rate": 0.0, "vintage": 0}
+
+
+def _check_scenarios(time_horizon, delay) -> None:
+    """Raise the errors of ``calculate_tonyears`` for time horizons and delays that it
+    would reject, instead of truncating or evaluating them to NaN"""
+    time_horizon = np.asarray(time_horizon, dtype=float)
+    delay = np.asarray(delay, dtype=float)
+    if np.any(np.mod(time_horizon, 1) != 0) or np.any(np.mod(delay, 1) != 0):
+        raise ValueError("Time horizon and delay must be whole years.")
+    if np.any(delay < 0):
+        raise ValueError("Delay cannot be negative.")
+    if np.any(time_horizon <= 0):
+        raise ValueError("Time horizon must be greater than zero.")
+    if np.any(delay > time_horizon):
+        raise ValueError("Delay cannot be longer than the time horizon.")
+
+
+@instrumented()
+def evaluate_scenarios(
+    scenarios: pd.DataFrame, integration: str = "trapz"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Baseline costs and benefits of a table of scenarios, one row per scenario.
+
+    Rows sharing a baseline curve, time horizon and discount rate are evaluated together
+    with one ``TonYearIndex`` (or one analytic evaluation per method).
+
+    Parameters
+    ----------
+    scenarios : pd.DataFrame
+        Table with `method`, `baseline` (curve name), `time_horizon`, `delay` and
+        `discount_rate` columns
+    integration : str
+        'trapz' (default) or 'analytic', as in ``calculate_tonyears``
+
+    Returns
+    -------
+    baseline_atm_cost, benefit : np.ndarray
+        Per-tonne cost and benefit of each row
+    """
+
+    delay = scenarios["delay"].to_numpy(dtype=int)
+    cost = np.empty(len(scenarios))
+    benefit = np.empty(len(scenarios))
+    methods = scenarios["method"].to_numpy()
+    groups = scenarios.groupby(
+        ["baseline", "time_horizon", "discount_rate"], sort=False
+    ).indices
+    for (baseline, time_horizon, discount_rate), rows in groups.items():
+        if integration == "analytic":
+            a, tau = _irf_parameters(baseline)
+        else:
+            index = TonYearIndex(
+                get_baseline_curve(baseline, time_horizon + 1), discount_rate
+            )
+            cost[rows] = index.baseline_atm_cost(time_horizon)
+        for method in np.unique(methods[rows]):
+            subset = rows[methods[rows] == method]
+            if integration == "analytic":
+                cost[subset], benefit[subset] = analytic_tonyears(
+                    method, a, tau, time_horizon, delay[subset], discount_rate
+                )
+            else:
+                benefit[subset] = index.benefit(method, time_horizon, delay[subset])
+    return cost, benefit
+
+
+@instrumented()
+def calculate_portfolio(
+    projects, integration: str = "trapz"
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Calculate ton-year ledgers for a portfolio of storage projects.
+
+    Projects sharing a baseline curve, time horizon and discount rate are evaluated together
+    in one vectorized pass, instead of calling ``calculate_tonyears`` once per project.
+
+    Parameters
+    ----------
+    projects : pd.DataFrame or structured np.ndarray
+        One row per project, with columns:
+
+        - `method` : ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+        - `tonnes` : tonnes of CO2 stored
+        - `time_horizon` : time horizon of the accounting (whole years)
+        - `delay` : storage duration (whole years), at most the time horizon
+        - `baseline` (optional) : name of the baseline curve, default 'joos_2013'
+        - `discount_rate` (optional) : discount rate, default 0
+        - `vintage` (optional) : year storage starts, default 0
+        - `reversal` (optional) : year the stored carbon was re-released, if it was
+          released before the end of its storage duration (NaN otherwise)
+    integration : str
+        'trapz' (default) or 'analytic', as in ``calculate_tonyears``
+
+    Returns
+    -------
+    ledger : pd.DataFrame
+        The input projects with the effective storage duration (`delay`, shortened by any
+        reversal) and the per-tonne `baseline_atm_cost`, `benefit` and
+        `num_for_equivalence`, plus each project's total `tonyears` of benefit and the
+        `equivalent_tonnes` of emissions it is equivalent to (tonnes / num_for_equivalence).
+    aggregate : pd.DataFrame
+        Sums of `tonnes`, `tonyears` and `equivalent_tonnes` for each vintage.
+    """
+
+    ledger = pd.DataFrame(projects).copy()
+    missing = [column for column in REQUIRED_COLUMNS if column not in ledger.columns]
+    if missing:
+        raise ValueError(f"Missing project columns: {', '.join(missing)}")
+    for column, default in OPTIONAL_COLUMNS.items():
+        if column not in ledger.columns:
+            ledger[column] = default
+    unknown = set(ledger["method"]) - set(METHODS)
+    if unknown:
+        raise ValueError(f"No ton-year accounting method called {sorted(unknown)[0]}")
+    if integration not in ("trapz", "analytic"):
+        raise ValueError(f"No integration method called {integration}")
+
+    _check_scenarios(ledger["time_horizon"], ledger["delay"])
+    delay = ledger["delay"].to_numpy(dtype=int)
+    if "reversal" in ledger.columns:
+        reversed_delay = (
+            ledger["reversal"].to_numpy(dtype=float) - ledger["vintage"].to_numpy()
+        )
+        reversed_delay = np.fmin(reversed_delay, delay)
+        if np.any(reversed_delay < 0):
+            raise ValueError("Reversals cannot occur before the vintage year.")
+        delay = reversed_delay.astype(int)
+    ledger["delay"] = delay
+
+    cost, benefit = evaluate_scenarios(ledger, integration)
+    ledger["baseline_atm_cost"] = cost
+    ledger["benefit"] = benefit
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ledger["num_for_equivalence"] = cost / benefit
+    ledger["tonyears"] = ledger["tonnes"] * benefit
+    ledger["equivalent_tonnes"] = ledger["tonnes"] * benefit / cost
+
+    aggregate = ledger.groupby("vintage")[
+        ["tonnes", "tonyears", "equivalent_tonnes"]
+    ].sum()
+    return ledger, aggregate
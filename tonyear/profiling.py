@@ -0,0 +1,207 @@
+"""Opt-in instrumentation of the main accounting functions.
+
+Profiling is off by default, and instrumented functions then only pay for one global
+check. It is turned on for a block of code with ``profile``, or for a whole process by
+setting the ``TONYEAR_PROFILE`` environment variable to a file path (or to 1 for stderr),
+to which the report is written as JSON at exit.
+
+Work done in worker processes (``workers=...``) is not recorded.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+_lock = threading.Lock()
+_local = threading.local()
+# active profiles, innermost last
+_profiles: List["Profile"] = []
+
+
+class Profile:
+    """Timings, call counts, allocations and counters recorded while profiling.
+
+    Each stage records its number of calls and total wall time (including any stages
+    nested within it), and, when memory is traced, the largest increase in traced memory
+    during any one call (`peak_bytes`), which includes temporary arrays. Counters record
+    events such as cache hits and misses.
+    """
+
+    def __init__(self, memory: bool = False) -> None:
+        self.memory = memory
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    def _add_stage(self, name: str, seconds: float, peak_bytes: Optional[int]) -> None:
+        with _lock:
+            stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+            if self.memory and peak_bytes is not None:
+                stage["peak_bytes"] = max(stage.get("peak_bytes", 0), peak_bytes)
+
+    def _add_count(self, name: str, n: int) -> None:
+        with _lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        """Report as a dict with `stages` and `counters` entries"""
+        with _lock:
+            return {
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def to_json(self, path=None) -> str:
+        """Report as a JSON string, also written to ``path`` if given"""
+        report = json.dumps(self.to_dict(), indent=2, sort_keys=True)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(report)
+        return report
+
+    def __repr__(self) -> str:
+        return f"Profile(stages={len(self.stages)}, counters={len(self.counters)})"
+
+
+@contextmanager
+def profile(memory: bool = False) -> Iterator[Profile]:
+    """Record the stages of instrumented functions called within the block.
+
+    Parameters
+    ----------
+    memory : bool
+        Also trace allocations with ``tracemalloc``, which slows down the profiled code
+
+    Examples
+    --------
+    >>> with tonyear.profile() as report:
+    ...     tonyear.joos_2013_monte_carlo(runs=10000, seed=0)
+    >>> report.to_dict()["stages"]["sample_parameters"]["seconds"]
+    """
+
+    recorder = Profile(memory=memory)
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    with _lock:
+        _profiles.append(recorder)
+    try:
+        yield recorder
+    finally:
+        with _lock:
+            _profiles.remove(recorder)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def _frames() -> list:
+    frames = getattr(_local, "frames", None)
+    if frames is None:
+        frames = _local.frames = []
+    return frames
+
+
+@contextmanager
+def _record(name: str) -> Iterator[None]:
+    profiles = list(_profiles)
+    tracing = tracemalloc.is_tracing() and any(p.memory for p in profiles)
+    frames = _frames()
+    # traced memory at the start of the stage, highest traced memory since
+    frame = [0, 0]
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        # fold the peak so far into the enclosing stages before resetting it
+        for outer in frames:
+            outer[1] = max(outer[1], peak)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        frame = [current, current]
+    frames.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        frames.pop()
+        peak_bytes = None
+        if tracing:
+            frame[1] = max(frame[1], tracemalloc.get_traced_memory()[1])
+            for outer in frames:
+                outer[1] = max(outer[1], frame[1])
+            peak_bytes = frame[1] - frame[0]
+        for recorder in profiles:
+            recorder._add_stage(name, seconds, peak_bytes)
+
+
+def is_profiling() -> bool:
+    """Whether any profile is recording"""
+    return bool(_profiles)
+
+
+def stage(name: str):
+    """Context manager timing a named stage of work while profiling is on"""
+    if not _profiles:
+        return _NULL_STAGE
+    return _record(name)
+
+
+class _NullStage:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_STAGE = _NullStage()
+
+
+def instrumented(name: Optional[str] = None) -> Callable:
+    """Decorator recording each call of a function as a stage (named after the function)"""
+
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _profiles:
+                return func(*args, **kwargs)
+            with _record(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add ``n`` to a named counter while profiling is on"""
+    for recorder in _profiles:
+        recorder._add_count(name, n)
+
+
+def _profile_from_environment(target: str) -> None:
+    """Profile the whole process, writing the report to ``target`` at exit"""
+    context = profile(memory=os.environ.get("TONYEAR_PROFILE_MEMORY", "") == "1")
+    recorder = context.__enter__()
+
+    def report() -> None:
+        context.__exit__(None, None, None)
+        if target in ("1", "stderr"):
+            print(recorder.to_json(), file=sys.stderr)
+        else:
+            recorder.to_json(target)
+
+    atexit.register(report)
+
+
+if os.environ.get("TONYEAR_PROFILE"):
+    _profile_from_environment(os.environ["TONYEAR_PROFILE"])
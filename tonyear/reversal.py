@@ -0,0 +1,253 @@
+from typing import Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .core import METHODS, TonYearIndex, _baseline_array
+from .profiling import instrumented
+
+HAZARDS = ("constant", "weibull", "empirical")
+
+
+def _sample_empirical(table: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """Inverse-CDF sampling from annual reversal probabilities, uniform within each year"""
+    # cumulative probability of a reversal by the end of each year (1 after any year with
+    # a certain reversal, whose log survival is -inf)
+    with np.errstate(divide="ignore"):
+        cdf = -np.expm1(np.cumsum(np.log1p(-table), axis=-1))
+    cdf = np.broadcast_to(cdf, u.shape[:-1] + cdf.shape[-1:])
+    rows = cdf.reshape(-1, cdf.shape[-1])
+    n_years = rows.shape[-1]
+
+    # offsetting each project's CDF (and draws) by its row number gives one sorted array,
+    # so all projects are sampled with a single searchsorted
+    offset = np.arange(len(rows))[:, np.newaxis]
+    flat_u = (u.reshape(len(rows), -1) + offset).ravel()
+    year = np.searchsorted((rows + offset).ravel(), flat_u, side="right")
+    year = year.reshape(len(rows), -1) - offset * n_years
+    u_rows = u.reshape(len(rows), -1)
+
+    reversed_ = year < n_years
+    year = np.minimum(year, n_years - 1)
+    upper = np.take_along_axis(rows, year, axis=-1)
+    lower = np.where(
+        year > 0, np.take_along_axis(rows, np.maximum(year - 1, 0), axis=-1), 0.0
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        within = np.clip((u_rows - lower) / (upper - lower), 0, 1)
+    duration = np.where(reversed_, year + within, np.inf)
+    return duration.reshape(u.shape)
+
+
+@instrumented()
+def sample_storage_durations(
+    hazard: str,
+    draws: int,
+    seed=None,
+    rate=None,
+    shape=None,
+    scale=None,
+    table=None,
+) -> np.ndarray:
+    """Sample the time until carbon in storage is re-released (reversed).
+
+    Parameters
+    ----------
+    hazard : str
+        Hazard model:
+
+        - 'constant' : a constant hazard ``rate`` (per year), giving exponentially
+          distributed durations. An annual reversal probability p is a rate of -log(1 - p).
+        - 'weibull' : Weibull distributed durations with the given ``shape`` and ``scale``
+          (years). Shapes above 1 give hazards that grow with time (e.g. aging stands),
+          below 1 hazards that fall with time (e.g. early business failure).
+        - 'empirical' : a ``table`` of annual reversal probabilities, the probability of a
+          reversal during each year t = 0, 1, 2, ... given storage up to the start of that
+          year. Reversals are spread uniformly over each year, and never occur after the
+          last year of the table.
+    draws : int
+        Number of durations to sample for each project
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed or random number generator
+    rate, shape, scale : float or array_like, optional
+        Parameters of the 'constant' and 'weibull' hazards, broadcast against each other.
+        Arrays give one project per element.
+    table : array_like, optional
+        Annual reversal probabilities for the 'empirical' hazard, with years along the last
+        axis and projects along any leading axes
+
+    Returns
+    -------
+    durations : np.ndarray
+        Storage durations (years; inf if storage is never reversed), with the project axes
+        of the hazard parameters followed by a draws axis
+    """
+
+    if draws <= 0:
+        raise ValueError("draws must be a positive integer")
+    rng = np.random.default_rng(seed)
+
+    if hazard == "constant":
+        if rate is None:
+            raise ValueError("The constant hazard needs a rate")
+        rate = np.asarray(rate, dtype=float)
+        if np.any(rate < 0):
+            raise ValueError("rate cannot be negative")
+        exponential = rng.standard_exponential(rate.shape + (draws,))
+        with np.errstate(divide="ignore"):
+            return exponential / rate[..., np.newaxis]
+    elif hazard == "weibull":
+        if shape is None or scale is None:
+            raise ValueError("The Weibull hazard needs a shape and a scale")
+        shape, scale = np.broadcast_arrays(
+            np.asarray(shape, dtype=float), np.asarray(scale, dtype=float)
+        )
+        if np.any(shape <= 0) or np.any(scale <= 0):
+            raise ValueError("shape and scale must be greater than zero")
+        exponential = rng.standard_exponential(shape.shape + (draws,))
+        return scale[..., np.newaxis] * exponential ** (1 / shape[..., np.newaxis])
+    elif hazard == "empirical":
+        if table is None:
+            raise ValueError("The empirical hazard needs a table")
+        table = np.atleast_1d(np.asarray(table, dtype=float))
+        if np.any(table < 0) or np.any(table > 1):
+            raise ValueError("Reversal probabilities must be between 0 and 1")
+        u = rng.random(table.shape[:-1] + (draws,))
+        return _sample_empirical(table, u)
+    else:
+        raise ValueError(f"No hazard model called {hazard}")
+
+
+@instrumented()
+def simulate_reversals(
+    method: str,
+    baseline: Union[np.ndarray, str, tuple],
+    time_horizon: int,
+    hazard: str,
+    draws: int,
+    delay=None,
+    discount_rate: float = 0.0,
+    seed=None,
+    rate=None,
+    shape=None,
+    scale=None,
+    table=None,
+    percentiles: Tuple[float, float] = (5, 95),
+) -> dict:
+    """Distribution of ton-year benefits of temporary storage at risk of reversal.
+
+    Storage durations are sampled for each project from a hazard model (see
+    ``sample_storage_durations``), and each project stores carbon for the shorter of its
+    sampled duration and its planned storage period ``delay``. Benefits for every whole-year
+    delay are computed once from the cumulative integrals of a ``TonYearIndex``, and
+    linearly interpolated at each sampled duration, so each draw costs a table lookup rather
+    than an integration.
+
+    Parameters
+    ----------
+    method : str
+        The ton-year accounting method ('mc', 'lashof', 'car', or 'qc')
+    baseline : np.ndarray, str or tuple
+        Baseline curve, curve name or (a, tau) pair, as in ``calculate_tonyears``
+    time_horizon : int
+        Specifies the period over which the impact of an emission is considered (years)
+    hazard : str
+        Hazard model: 'constant', 'weibull' or 'empirical'
+    draws : int
+        Number of storage durations sampled for each project
+    delay : int or array_like of int, optional
+        Planned storage period of each project (years), by default the time horizon
+    discount_rate : float
+        Specifies the discount rate to apply time preference to both costs and benefits
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed or random number generator used to sample durations
+    rate, shape, scale, table : optional
+        Hazard parameters of each project, see ``sample_storage_durations``
+    percentiles : tuple of float
+        Lower and upper percentiles reported in the summary
+
+    Returns
+    -------
+    reversal_dict : dict
+        Return dict with the following keys:
+
+        - `parameters` : key parameters used for the calculation
+        - `duration` : effective storage duration of each draw (years), with shape
+          projects + (draws,)
+        - `baseline_atm_cost` : the cost of a baseline emission
+        - `benefit` : the benefit of each draw, with the same shape as `duration`
+        - `num_for_equivalence` : the ratio between the baseline cost and the benefit of
+          each draw (inf for reversals at t=0)
+        - `summary` : dataframe with one row per project, giving the probability that
+          storage is reversed before its planned end, the mean duration and benefit,
+          percentiles of the benefit and of the equivalence ratio, and the equivalence
+          ratio of the expected benefit (`num_for_equivalence`), i.e. the number of tonnes
+          of at-risk storage equivalent to one tonne of emissions on average.
+    """
+
+    if method not in METHODS:
+        raise ValueError(f"No ton-year accounting method called {method}")
+    if time_horizon <= 0:
+        raise ValueError("Time horizon must be greater than zero.")
+    planned = np.asarray(time_horizon if delay is None else delay, dtype=float)
+    if np.any(planned < 0):
+        raise ValueError("Delay cannot be negative.")
+    if np.any(planned > time_horizon):
+        raise ValueError("Delay cannot be longer than the time horizon.")
+
+    duration = sample_storage_durations(
+        hazard, draws, seed=seed, rate=rate, shape=shape, scale=scale, table=table
+    )
+    duration = np.minimum(duration, planned[..., np.newaxis])
+
+    index = TonYearIndex(
+        _baseline_array(baseline, time_horizon + 1)[: time_horizon + 1], discount_rate
+    )
+    if len(index) < time_horizon + 1:
+        raise ValueError(
+            "Time horizon cannot be longer than length of the baseline array."
+        )
+    delays = np.arange(time_horizon + 1)
+    baseline_atm_cost = index.baseline_atm_cost(time_horizon)
+    benefit = np.interp(duration, delays, index.benefit(method, time_horizon, delays))
+    with np.errstate(divide="ignore"):
+        num_for_equivalence = baseline_atm_cost / benefit
+
+    # equivalence ratios fall as benefits rise, so their percentiles are the ratios of the
+    # opposite benefit percentiles (avoiding infinite ratios in the interpolation)
+    low, high = percentiles
+    rows = benefit.reshape(-1, draws)
+    benefit_low, benefit_high = np.percentile(rows, [low, high], axis=-1)
+    mean_benefit = rows.mean(axis=-1)
+    with np.errstate(divide="ignore"):
+        summary = pd.DataFrame(
+            {
+                "reversal_probability": np.mean(
+                    duration < planned[..., np.newaxis], axis=-1
+                ).ravel(),
+                "mean_duration": duration.reshape(-1, draws).mean(axis=-1),
+                "mean_benefit": mean_benefit,
+                f"benefit_{low:g}th": benefit_low,
+                f"benefit_{high:g}th": benefit_high,
+                "num_for_equivalence": baseline_atm_cost / mean_benefit,
+                f"num_for_equivalence_{low:g}th": baseline_atm_cost / benefit_high,
+                f"num_for_equivalence_{high:g}th": baseline_atm_cost / benefit_low,
+            },
+            index=pd.RangeIndex(len(rows), name="project"),
+        )
+
+    return {
+        "parameters": {
+            "method": method,
+            "time_horizon": time_horizon,
+            "delay": delay,
+            "discount_rate": discount_rate,
+            "hazard": hazard,
+            "draws": draws,
+        },
+        "duration": duration,
+        "baseline_atm_cost": baseline_atm_cost,
+        "benefit": benefit,
+        "num_for_equivalence": num_for_equivalence,
+        "summary": summary,
+    }
@@ -0,0 +1,140 @@
+from typing import Optional, Union
+
+import numpy as np
+from scipy.signal import fftconvolve
+
+from .core import _baseline_array
+from .profiling import instrumented
+
+# Direct convolution is faster than FFT convolution while the shorter of the two series is
+# at most this long
+DIRECT_CONVOLUTION_MAX_LENGTH = 128
+
+
+@instrumented()
+def get_atmospheric_burden(
+    flux, baseline: np.ndarray, method: str = "auto"
+) -> np.ndarray:
+    """Convolve an annual emission series with an IRF to get the atmospheric burden
+
+    Parameters
+    ----------
+    flux : array_like
+        Annual net emissions (tCO2) at t = 0, 1, 2, ... Negative values are removals or
+        storage. Leading axes hold batches of independent series.
+    baseline : np.ndarray
+        IRF of a 1 tCO2 pulse emitted at t=0, e.g. from ``get_baseline_curve``
+    method : str
+        'direct', 'fft' or 'auto'. 'auto' uses direct convolution when the shorter of the two
+        series has at most ``DIRECT_CONVOLUTION_MAX_LENGTH`` values, and FFT convolution
+        (O(n log n)) otherwise. Both convolve every series of a batch at once; direct
+        convolution as a single matrix product with a (len(flux), len(baseline)) matrix.
+
+    Returns
+    -------
+    burden : np.ndarray
+        Atmospheric burden (tCO2) at t = 0, ..., len(baseline) - 1, with the leading axes of
+        ``flux``
+    """
+
+    flux = np.asarray(flux, dtype=float)
+    baseline = np.asarray(baseline, dtype=float)
+    n = len(baseline)
+    if flux.shape[-1] > n:
+        raise ValueError("flux cannot be longer than the baseline array.")
+
+    if method == "auto":
+        shortest = min(flux.shape[-1], n)
+        method = "direct" if shortest <= DIRECT_CONVOLUTION_MAX_LENGTH else "fft"
+
+    if method == "direct":
+        # all rows at once, as a product with the banded matrix of baseline[k - j]
+        lag = np.arange(n) - np.arange(flux.shape[-1])[:, np.newaxis]
+        kernel = np.where(lag >= 0, baseline[np.maximum(lag, 0)], 0.0)
+        return flux @ kernel
+    elif method == "fft":
+        kernel = baseline.reshape((1,) * (flux.ndim - 1) + (n,))
+        return fftconvolve(flux, kernel, axes=-1)[..., :n]
+    else:
+        raise ValueError(f"No convolution method called {method}")
+
+
+@instrumented()
+def calculate_tonyears_series(
+    flux,
+    baseline: Union[np.ndarray, str],
+    time_horizon: int,
+    discount_rate: float = 0.0,
+    reference=None,
+    method: str = "auto",
+) -> dict:
+    """Calculate the atmospheric ton-year cost of an emission and removal time series.
+
+    The atmospheric burden is the convolution of the flux series with the IRF, and its cost
+    is integrated over 0<=t<=time_horizon exactly as in ``calculate_tonyears``. With a
+    ``reference`` series the benefit of the flux series relative to the reference is
+    returned too. For instance, a 1 tCO2 pulse at t=delay against a reference pulse at t=0
+    gives the Lashof benefit, less the half (discounted) ton-year the trapezoid rule
+    attributes to the ramp up to the delayed pulse, which Lashof leaves out by integrating
+    the scenario from t=delay only.
+
+    Parameters
+    ----------
+    flux : array_like
+        Annual net emissions (tCO2) at t = 0, 1, 2, ..., optionally batched along leading axes
+    baseline : np.ndarray or str
+        IRF of a 1 tCO2 pulse emitted at t=0, or the name of a registered baseline curve
+    time_horizon : int
+        Specifies the period over which the impact of emissions is considered (years)
+    discount_rate : float
+        Discount rate expressed as a fraction
+    reference : array_like, optional
+        Reference flux series to compare against, broadcast against ``flux``
+    method : str
+        Convolution method, see ``get_atmospheric_burden``
+
+    Returns
+    -------
+    series_dict : dict
+        Return dict with the following keys:
+
+        - `parameters` : key parameters used for the calculation
+        - `burden` : atmospheric burden over 0<=t<=time_horizon, discounted if applicable
+        - `atm_cost` : ton-years of atmospheric burden over the time horizon
+        - `reference_atm_cost` : ton-years of the reference burden (if given)
+        - `benefit` : reference_atm_cost - atm_cost (if a reference is given)
+    """
+
+    if time_horizon <= 0:
+        raise ValueError("Time horizon must be greater than zero.")
+    baseline = _baseline_array(baseline, time_horizon + 1)
+    if len(baseline) < time_horizon:
+        raise ValueError(
+            "Time horizon cannot be longer than length of the baseline array."
+        )
+
+    baseline = baseline[: time_horizon + 1]
+
+    def cost(series) -> tuple:
+        series = np.asarray(series, dtype=float)[..., : len(baseline)]
+        burden = get_atmospheric_burden(series, baseline, method=method)
+        burden = burden / np.power(1 + discount_rate, np.arange(burden.shape[-1]))
+        return burden, np.trapz(burden, axis=-1)
+
+    burden, atm_cost = cost(flux)
+    reference_atm_cost: Optional[np.ndarray] = None
+    benefit: Optional[np.ndarray] = None
+    if reference is not None:
+        _, reference_atm_cost = cost(reference)
+        benefit = reference_atm_cost - atm_cost
+
+    return {
+        "parameters": {
+            "time_horizon": time_horizon,
+            "discount_rate": discount_rate,
+        },
+        "burden": burden,
+        "atm_cost": atm_cost,
+        "reference_atm_cost": reference_atm_cost,
+        "benefit": benefit,
+    }
@@ -0,0 +1,511 @@
+"""Local ton-year query service: ``tonyear-server --port 8765``
+
+A long-running process keeps baseline curves and their cumulative integrals warm in
+memory and answers ton-year queries over HTTP, on a TCP port or a Unix socket. Queries
+arriving within a short window of each other are coalesced into one vectorized batch.
+
+Queries are POSTed to ``/tonyears`` as a JSON object, a JSON list of objects, or an Arrow
+IPC stream (``Content-Type: application/vnd.apache.arrow.stream``), with `method`,
+`time_horizon` and `delay` fields and optionally `curve` (default joos_2013) and
+`discount_rate` (default 0). Time horizons and delays are whole years. Results are
+returned in request order as JSON, with non-finite values as null, or as an Arrow IPC
+stream if the request's ``Accept`` header asks for one. ``GET /stats`` reports the number
+of queries and batches served.
+"""
+
+import argparse
+import asyncio
+import functools
+import io
+import itertools
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .core import METHODS, TonYearIndex, get_curve_parameters, sum_of_exponentials
+from .profiling import count, stage
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+RESULT_COLUMNS = ("baseline_atm_cost", "benefit", "num_for_equivalence")
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    406: "Not Acceptable",
+    411: "Length Required",
+    413: "Payload Too Large",
+}
+MAX_BODY_BYTES = 64 * 2**20
+
+Queries = Dict[str, np.ndarray]
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_index(parameters: tuple, discount_rate: float, length: int) -> TonYearIndex:
+    a, tau = parameters
+    return TonYearIndex(sum_of_exponentials(a, tau, np.arange(length)), discount_rate)
+
+
+def _warm_index(curve: str, discount_rate: float, length: int) -> TonYearIndex:
+    """Index of a baseline curve, kept across batches (keyed by the curve's parameters, so
+    re-registering a curve name never serves a stale index)"""
+    return _cached_index(get_curve_parameters(curve), discount_rate, length)
+
+
+QUERY_FIELDS = {
+    "method": None,
+    "curve": "joos_2013",
+    "time_horizon": None,
+    "delay": None,
+    "discount_rate": 0.0,
+}
+
+
+def _is_sequence(value) -> bool:
+    return isinstance(value, (list, tuple, np.ndarray))
+
+
+def _is_single_query(payload) -> bool:
+    """Whether a payload is one query object rather than a list or dict of columns"""
+    return isinstance(payload, dict) and not any(
+        _is_sequence(payload.get(key)) for key in QUERY_FIELDS
+    )
+
+
+def _query_columns(payload) -> Dict[str, list]:
+    """Field values of queries given as a dict, a list of dicts or a dict of columns"""
+    if _is_single_query(payload):
+        payload = [payload]
+    if isinstance(payload, list):
+        if not all(isinstance(query, dict) for query in payload):
+            raise ValueError("Queries must be JSON objects")
+        columns = {key: [query.get(key) for query in payload] for key in QUERY_FIELDS}
+    elif isinstance(payload, dict):
+        n = max(len(payload[k]) for k in QUERY_FIELDS if _is_sequence(payload.get(k)))
+        columns = {}
+        for key in QUERY_FIELDS:
+            value: Any = payload.get(key)
+            if not _is_sequence(value):
+                value = [value] * n
+            elif len(value) != n:
+                raise ValueError("Query fields must have the same length")
+            columns[key] = list(value)
+    else:
+        raise ValueError("Queries must be JSON objects")
+
+    for key, default in QUERY_FIELDS.items():
+        if any(value is None for value in columns[key]):
+            if default is None:
+                raise ValueError(f"Missing query field: {key}")
+            columns[key] = [default if v is None else v for v in columns[key]]
+    return columns
+
+
+def _validate(columns: Dict[str, list], max_time_horizon: int) -> Queries:
+    queries = {
+        "method": np.array(columns["method"], dtype=object),
+        "curve": np.array(columns["curve"], dtype=object),
+        "time_horizon": np.array(columns["time_horizon"], dtype=float),
+        "delay": np.array(columns["delay"], dtype=float),
+        "discount_rate": np.array(columns["discount_rate"], dtype=float),
+    }
+    unknown = set(queries["method"]) - set(METHODS)
+    if unknown:
+        raise ValueError(f"No ton-year accounting method called {sorted(unknown)[0]}")
+    for name in set(queries["curve"]):
+        get_curve_parameters(name)
+    time_horizon, delay = queries["time_horizon"], queries["delay"]
+    if np.any(time_horizon != np.round(time_horizon)) or np.any(
+        delay != np.round(delay)
+    ):
+        raise ValueError("Time horizon and delay must be whole years.")
+    if np.any(time_horizon <= 0):
+        raise ValueError("Time horizon must be greater than zero.")
+    if np.any(time_horizon > max_time_horizon):
+        raise ValueError(
+            f"Time horizon cannot be longer than {max_time_horizon} years."
+        )
+    if np.any(delay < 0):
+        raise ValueError("Delay cannot be negative.")
+    if np.any(delay > time_horizon):
+        raise ValueError("Delay cannot be longer than the time horizon.")
+    queries["time_horizon"] = time_horizon.astype(np.int64)
+    queries["delay"] = delay.astype(np.int64)
+    return queries
+
+
+def parse_queries(payload, max_time_horizon: int) -> Queries:
+    """Validate queries given as a dict, a list of dicts or a dict of columns.
+
+    Fields given as a single value in a dict of columns apply to every query.
+
+    Returns
+    -------
+    queries : dict
+        `method`, `curve`, `time_horizon`, `delay` and `discount_rate` arrays
+    """
+
+    return _validate(_query_columns(payload), max_time_horizon)
+
+
+def evaluate_queries(queries: Queries, max_time_horizon: int) -> Queries:
+    """Ton-year results of validated queries, one warm index per curve and discount rate"""
+
+    n = len(queries["method"])
+    cost = np.empty(n)
+    benefit = np.empty(n)
+    groups: Dict[Tuple[str, float], List[int]] = {}
+    for i, key in enumerate(zip(queries["curve"], queries["discount_rate"])):
+        groups.setdefault(key, []).append(i)
+    for (curve, discount_rate), positions in groups.items():
+        rows = np.asarray(positions)
+        index = _warm_index(curve, float(discount_rate), max_time_horizon + 1)
+        time_horizon = queries["time_horizon"][rows]
+        delay = queries["delay"][rows]
+        methods = queries["method"][rows]
+        cost[rows] = index.baseline_atm_cost(time_horizon)
+        for method in set(methods):
+            subset = methods == method
+            benefit[rows[subset]] = index.benefit(
+                method, time_horizon[subset], delay[subset]
+            )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        num_for_equivalence = cost / benefit
+    return {
+        "baseline_atm_cost": cost,
+        "benefit": benefit,
+        "num_for_equivalence": num_for_equivalence,
+    }
+
+
+class TonYearServer:
+    """Micro-batching ton-year query service.
+
+    Concurrent calls to ``evaluate`` (and the HTTP requests that make them) are held for
+    up to ``window`` seconds, or until ``max_batch`` queries are waiting, and then
+    evaluated together with ``evaluate_queries``. Batches are evaluated on the event loop,
+    which for annual indexes takes microseconds per query.
+
+    Parameters
+    ----------
+    max_time_horizon : int
+        Longest time horizon served (years)
+    window : float
+        Time to wait for more queries before evaluating a batch (seconds)
+    max_batch : int
+        Number of waiting queries that triggers a batch without waiting
+    """
+
+    def __init__(
+        self,
+        max_time_horizon: int = 1000,
+        window: float = 0.001,
+        max_batch: int = 10000,
+    ) -> None:
+        if max_time_horizon <= 0:
+            raise ValueError("max_time_horizon must be a positive integer")
+        if window < 0:
+            raise ValueError("window cannot be negative")
+        if max_batch <= 0:
+            raise ValueError("max_batch must be a positive integer")
+        self.max_time_horizon = max_time_horizon
+        self.window = window
+        self.max_batch = max_batch
+        self.queries = 0
+        self.batches = 0
+        self._pending: List[Tuple[Dict[str, list], asyncio.Future]] = []
+        self._pending_rows = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def warm(self, curves=("joos_2013",), discount_rates=(0.0,)) -> None:
+        """Build the indexes of the given curves and discount rates ahead of queries"""
+        for curve in curves:
+            for discount_rate in discount_rates:
+                _warm_index(curve, float(discount_rate), self.max_time_horizon + 1)
+
+    async def evaluate(self, payload) -> Queries:
+        """Results of queries given as in ``parse_queries``, evaluated in the next batch"""
+        columns = _query_columns(payload)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((columns, future))
+        self._pending_rows += len(columns["method"])
+        if self._pending_rows >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.window, self._flush
+            )
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_rows = self._pending, [], 0
+        if pending:
+            self._run_batch(pending)
+
+    def _run_batch(self, pending: List[Tuple[Dict[str, list], asyncio.Future]]) -> None:
+        try:
+            queries = self._validate_batch(pending)
+        except (ValueError, TypeError):
+            pass
+        else:
+            self._evaluate_batch(pending, queries)
+            return
+
+        # validation is elementwise, so only the requests that fail on their own are
+        # rejected, and the others are evaluated together
+        valid = []
+        for columns, future in pending:
+            try:
+                alone = self._validate_batch([(columns, future)])
+            except (ValueError, TypeError) as e:
+                future.set_exception(e)
+            else:
+                valid.append(((columns, future), alone))
+        if not valid:
+            return
+        try:
+            queries = self._validate_batch([request for request, _ in valid])
+        except (ValueError, TypeError):
+            # requests that are valid alone but cannot be combined are evaluated one by one
+            for request, alone in valid:
+                self._evaluate_batch([request], alone)
+        else:
+            self._evaluate_batch([request for request, _ in valid], queries)
+
+    def _validate_batch(
+        self, pending: List[Tuple[Dict[str, list], asyncio.Future]]
+    ) -> Queries:
+        batch = {
+            key: list(itertools.chain.from_iterable(c[key] for c, _ in pending))
+            for key in QUERY_FIELDS
+        }
+        return _validate(batch, self.max_time_horizon)
+
+    def _evaluate_batch(
+        self, pending: List[Tuple[Dict[str, list], asyncio.Future]], queries: Queries
+    ) -> None:
+        try:
+            with stage("server_batch"):
+                results = evaluate_queries(queries, self.max_time_horizon)
+        except Exception as e:  # pragma: no cover
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        n = len(queries["method"])
+        self.batches += 1
+        self.queries += n
+        count("server.batches")
+        count("server.queries", n)
+        start = 0
+        for columns, future in pending:
+            stop = start + len(columns["method"])
+            if not future.done():
+                future.set_result(
+                    {key: value[start:stop] for key, value in results.items()}
+                )
+            start = stop
+
+    async def _respond(
+        self, method: str, target: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, str, bytes]:
+        path = target.split("?", 1)[0]
+        if path == "/stats":
+            if method != "GET":
+                raise _HTTPError(405, "Use GET for /stats")
+            stats = {
+                "queries": self.queries,
+                "batches": self.batches,
+                "indexes": _cached_index.cache_info().currsize,
+            }
+            return 200, "application/json", json.dumps(stats).encode()
+        if path != "/tonyears":
+            raise _HTTPError(404, f"No endpoint {path}")
+        if method != "POST":
+            raise _HTTPError(405, "Use POST for /tonyears")
+
+        arrow_output = ARROW_STREAM in headers.get("accept", "")
+        if arrow_output or headers.get("content-type", "").startswith(ARROW_STREAM):
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:  # pragma: no cover
+                raise _HTTPError(
+                    406, "Arrow input and output require pyarrow"
+                ) from None
+        try:
+            if headers.get("content-type", "").startswith(ARROW_STREAM):
+                payload = _read_arrow(body)
+            else:
+                payload = json.loads(body)
+            results = await self.evaluate(payload)
+        except (ValueError, TypeError) as e:
+            raise _HTTPError(400, str(e)) from None
+
+        if arrow_output:
+            return 200, ARROW_STREAM, _write_arrow(results)
+        output: Dict[str, Any] = {
+            key: [_json_value(x) for x in value.tolist()]
+            for key, value in results.items()
+        }
+        if _is_single_query(payload):
+            # a single query object gets a single result object
+            output = {key: value[0] for key, value in output.items()}
+        return 200, "application/json", json.dumps(output).encode()
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve HTTP/1.1 requests on one connection, keeping it alive between requests"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ")
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+
+                try:
+                    if "chunked" in headers.get("transfer-encoding", ""):
+                        raise _HTTPError(411, "Requests need a Content-Length")
+                    try:
+                        length = int(headers.get("content-length", 0))
+                    except ValueError:
+                        length = -1
+                    if length < 0:
+                        # the body cannot be skipped, so the connection is closed
+                        keep_alive = False
+                        raise _HTTPError(400, "Invalid Content-Length")
+                    if length > MAX_BODY_BYTES:
+                        raise _HTTPError(413, "Request body too large")
+                    body = await reader.readexactly(length)
+                    status, content_type, response = await self._respond(
+                        method, target, headers, body
+                    )
+                except _HTTPError as e:
+                    status, content_type = e.status, "application/json"
+                    response = json.dumps({"error": str(e)}).encode()
+                    keep_alive = keep_alive and e.status not in (411, 413)
+
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                        f"Content-Type: {content_type}\r\n"
+                        f"Content-Length: {len(response)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode()
+                    + response
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 8765, path: Optional[str] = None
+    ) -> asyncio.AbstractServer:
+        """Start serving on a TCP port, or on the Unix socket ``path`` if given"""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path=path)
+        return await asyncio.start_server(self.handle, host=host, port=port)
+
+
+def _json_value(value: float) -> Optional[float]:
+    return value if np.isfinite(value) else None
+
+
+def _read_arrow(body: bytes) -> dict:
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(body).read_all()
+    return {name: table.column(name).to_pylist() for name in table.column_names}
+
+
+def _write_arrow(results: Queries) -> bytes:
+    import pyarrow as pa
+
+    table = pa.table({key: results[key] for key in RESULT_COLUMNS})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as stream:
+        stream.write_table(table)
+    return sink.getvalue()
+
+
+async def _serve_forever(server: TonYearServer, host: str, port: int, path) -> None:
+    listener = await server.start(host, port, path)
+    where = path or f"http://{host}:{port}"
+    print(f"tonyear-server: serving on {where}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="tonyear-server",
+        description=(
+            "Serve ton-year queries over HTTP. POST method, time_horizon, delay and "
+            "optionally curve and discount_rate to /tonyears as JSON or Arrow."
+        ),
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", help="serve on a Unix socket instead of TCP")
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=0.001,
+        help="seconds to wait for more queries before evaluating a batch",
+    )
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=10000,
+        help="waiting queries that trigger a batch without waiting",
+    )
+    parser.add_argument("--max-time-horizon", type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        server = TonYearServer(args.max_time_horizon, args.window, args.max_batch)
+        server.warm()
+        asyncio.run(_serve_forever(server, args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        return 0
+    except (ValueError, OSError) as e:
+        print(f"tonyear-server: error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,252 @@
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+
+class OnlineMoments:
+    """Running mean and variance along the last axis of a stream of chunks.
+
+    Chunks are combined with the parallel algorithm of Chan et al. (1979), so partial
+    results computed on separate chunks (or in separate processes) can be merged exactly.
+
+    Parameters
+    ----------
+    shape : int or tuple of int
+        Shape of the statistics, i.e. the shape of each chunk without its last axis
+    """
+
+    def __init__(self, shape: Union[int, Sequence[int]]) -> None:
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, chunk: np.ndarray) -> None:
+        """Add a chunk of samples, with samples along the last axis"""
+        other = OnlineMoments(self.mean.shape)
+        other.count = chunk.shape[-1]
+        other.mean = np.mean(chunk, axis=-1, dtype=np.float64)
+        other.m2 = np.sum(
+            np.square(chunk - other.mean[..., np.newaxis], dtype=np.float64), axis=-1
+        )
+        self.merge(other)
+
+    def merge(self, other: "OnlineMoments") -> None:
+        """Merge the statistics of another set of samples into this one"""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = (
+            self.m2 + other.m2 + np.square(delta) * (self.count * other.count / count)
+        )
+        self.count = count
+
+    @property
+    def var(self) -> np.ndarray:
+        """Population variance (ddof=0), matching ``np.var``"""
+        return self.m2 / self.count
+
+    @property
+    def std(self) -> np.ndarray:
+        """Population standard deviation (ddof=0), matching ``np.std``"""
+        return np.sqrt(self.var)
+
+
+class HistogramSketch:
+    """Bounded-memory percentile estimates along the last axis of a stream of chunks.
+
+    Each row keeps a fixed number of equal-width bins. The bin range of each row is set
+    from the first chunk and padded by that chunk's spread on either side; later samples
+    outside the range are counted in the edge bins. Percentiles are interpolated linearly
+    within a bin, so estimates are accurate to about one bin width, i.e. three times the
+    spread of the first chunk divided by ``bins``.
+
+    Parameters
+    ----------
+    bins : int
+        Number of bins per row
+    """
+
+    def __init__(self, bins: int = 2048) -> None:
+        self.bins = bins
+        self.lower: Optional[np.ndarray] = None
+        self.width: Optional[np.ndarray] = None
+        self.counts: Optional[np.ndarray] = None
+
+    def empty_like(self) -> "HistogramSketch":
+        """A sketch with the same bins as this one and no samples, for parallel updates
+        that are merged back afterwards"""
+        sketch = HistogramSketch(self.bins)
+        if self.counts is not None:
+            sketch.lower, sketch.width = self.lower, self.width
+            sketch.counts = np.zeros_like(self.counts)
+        return sketch
+
+    def update(self, chunk: np.ndarray) -> None:
+        """Add a chunk of samples of shape (rows, samples)"""
+        if self.counts is None:
+            lo = np.min(chunk, axis=1).astype(np.float64)
+            hi = np.max(chunk, axis=1).astype(np.float64)
+            spread = np.maximum(
+                hi - lo, np.finfo(np.float64).eps * np.maximum(np.abs(hi), 1)
+            )
+            self.lower = lo - spread
+            self.width = 3 * spread / self.bins
+            self.counts = np.zeros((len(chunk), self.bins), dtype=np.int64)
+
+        assert self.lower is not None and self.width is not None
+        index = np.floor(
+            (chunk - self.lower[:, np.newaxis]) / self.width[:, np.newaxis]
+        )
+        index = np.clip(index, 0, self.bins - 1).astype(np.int64)
+        index += np.arange(len(chunk))[:, np.newaxis] * self.bins
+        self.counts += np.bincount(index.ravel(), minlength=self.counts.size).reshape(
+            self.counts.shape
+        )
+
+    def merge(self, other: "HistogramSketch") -> None:
+        """Merge the counts of another sketch built with the same bin ranges"""
+        if other.counts is None:
+            return
+        if self.counts is None:
+            self.lower, self.width, self.counts = (
+                other.lower,
+                other.width,
+                other.counts.copy(),
+            )
+            return
+        assert self.lower is not None and self.width is not None
+        assert other.lower is not None and other.width is not None
+        if not (
+            np.array_equal(self.lower, other.lower)
+            and np.array_equal(self.width, other.width)
+        ):
+            raise ValueError("Cannot merge sketches with different bin ranges")
+        self.counts += other.counts
+
+    def percentile(self, q: float) -> np.ndarray:
+        """Estimate the q-th percentile (0 <= q <= 100) of each row"""
+        if self.counts is None:
+            raise ValueError("Cannot estimate percentiles of an empty sketch")
+        assert self.lower is not None and self.width is not None
+
+        cumulative = np.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1]
+        # rank of the percentile among the sorted samples, as in np.percentile
+        target = (total - 1) * q / 100 + 0.5
+        index = np.argmax(cumulative >= target[:, np.newaxis], axis=1)
+        rows = np.arange(len(index))
+        before = np.where(index > 0, cumulative[rows, index - 1], 0)
+        fraction = (target - before) / self.counts[rows, index]
+        return self.lower + self.width * (index + fraction)
+
+
+def standard_error(samples: np.ndarray, antithetic: bool = False) -> np.ndarray:
+    """Standard error of the mean along the last axis of a set of Monte Carlo samples.
+
+    For independent samples this is the sample standard deviation divided by the square
+    root of the number of samples. For antithetic samples, the pairs at positions (0, 1),
+    (2, 3), ... are averaged first and the standard error is taken over the pair means;
+    an unpaired last sample is ignored.
+
+    For Sobol' or Latin hypercube samples the independent-sample formula usually
+    overestimates the error, so it serves as a conservative diagnostic.
+
+    Parameters
+    ----------
+    samples : np.ndarray
+        Samples along the last axis, e.g. a (t_horizon, runs) ensemble
+    antithetic : bool
+        Whether the samples are antithetic pairs
+
+    Returns
+    -------
+    standard_error : np.ndarray
+        Standard error of the mean, with the shape of ``samples`` without its last axis
+    """
+
+    samples = np.asarray(samples, dtype=np.float64)
+    if antithetic:
+        pairs = samples.shape[-1] // 2
+        samples = (
+            samples[..., 0 : 2 * pairs : 2] + samples[..., 1 : 2 * pairs : 2]
+        ) / 2
+    if samples.shape[-1] < 2:
+        raise ValueError(
+            "At least two samples (or pairs) are needed for a standard error"
+        )
+    return np.std(samples, axis=-1, ddof=1) / np.sqrt(samples.shape[-1])
+
+
+def sobol_indices(
+    f_a: np.ndarray,
+    f_b: np.ndarray,
+    f_ab: np.ndarray,
+    bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed=None,
+) -> dict:
+    """First-order and total Sobol' sensitivity indices from Saltelli sample evaluations.
+
+    Uses the estimators of Saltelli et al. (2010) for first-order indices and Jansen (1999)
+    for total indices, with model outputs for the two base sample matrices A and B and for
+    each matrix AB_i (A with its i-th column taken from B). Confidence intervals are
+    percentiles of the indices over bootstrap resamples of the N sample rows.
+
+    Parameters
+    ----------
+    f_a, f_b : np.ndarray
+        Model outputs for the rows of A and B, of shape (N,)
+    f_ab : np.ndarray
+        Model outputs for the rows of each AB_i, of shape (k, N)
+    bootstrap : int
+        Number of bootstrap resamples (0 to skip confidence intervals)
+    confidence : float
+        Confidence level of the intervals
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed for the bootstrap resampling
+
+    Returns
+    -------
+    indices_dict : dict
+        Return dict with the following keys, each an array of shape (k,):
+
+        - `S1`, `S1_low`, `S1_high` : first-order indices and their confidence interval
+        - `ST`, `ST_low`, `ST_high` : total indices and their confidence interval
+    """
+
+    f_a, f_b, f_ab = (np.asarray(f, dtype=np.float64) for f in (f_a, f_b, f_ab))
+
+    def estimate(f_a, f_b, f_ab):
+        outputs = np.concatenate((f_a, f_b), axis=-1)
+        variance = np.var(outputs, axis=-1)
+        # centring f_b leaves the first-order estimate unbiased but cuts its variance when
+        # the outputs have a large mean
+        centred = f_b - np.mean(outputs, axis=-1, keepdims=True)
+        first = np.mean(centred * (f_ab - f_a), axis=-1) / variance
+        total = 0.5 * np.mean(np.square(f_a - f_ab), axis=-1) / variance
+        return first, total
+
+    first, total = estimate(f_a, f_b, f_ab)
+    result = {"S1": first, "ST": total}
+
+    if bootstrap > 0:
+        rng = np.random.default_rng(seed)
+        n, k = len(f_a), len(f_ab)
+        # resample in groups of about 2**22 values to bound memory
+        group = max(1, 2**22 // (n * (k + 2)))
+        firsts, totals = [], []
+        for start in range(0, bootstrap, group):
+            rows = rng.integers(n, size=(min(group, bootstrap - start), n))
+            first_b, total_b = estimate(f_a[rows], f_b[rows], f_ab[:, rows])
+            firsts.append(first_b)
+            totals.append(total_b)
+        quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+        result["S1_low"], result["S1_high"] = np.quantile(
+            np.concatenate(firsts, axis=-1), quantiles, axis=-1
+        )
+        result["ST_low"], result["ST_high"] = np.quantile(
+            np.concatenate(totals, axis=-1), quantiles, axis=-1
+        )
+    return result
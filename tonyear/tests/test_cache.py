@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tonyear import ResultCache, joos_2013_monte_carlo
+
+
+def test_result_cache(tmp_path) -> None:
+    calls = []
+
+    def model(n, scale=1.0, seed=0):
+        calls.append(n)
+        return {"values": np.arange(n) * scale, "label": ("a", 1)}
+
+    cache = ResultCache(tmp_path)
+    first = cache(model, 5, seed=3)
+    second = cache(model, n=5, seed=3, scale=1.0)
+    assert calls == [5]
+    assert cache.hits == 1 and cache.misses == 1
+    assert isinstance(second["values"], np.memmap)
+    assert not second["values"].flags.writeable
+    np.testing.assert_array_equal(first["values"], second["values"])
+    assert second["label"] == ("a", 1)
+
+    # different arguments are different entries
+    cache(model, 5, scale=2.0, seed=3)
+    assert calls == [5, 5]
+    assert len(cache) == 2
+
+    # entries persist across instances
+    memoized = ResultCache(tmp_path).memoize(model)
+    memoized(5, seed=3)
+    assert calls == [5, 5]
+
+    # runs seeded from fresh entropy are never cached
+    cache(model, 5, seed=None)
+    cache(model, 5, seed=np.random.default_rng(0))
+    assert calls == [5, 5, 5, 5]
+    assert cache.bypasses == 2
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_result_cache_monte_carlo(tmp_path) -> None:
+    cache = ResultCache(tmp_path)
+    summary, ensemble = cache(joos_2013_monte_carlo, runs=20, t_horizon=51, seed=0)
+    cached_summary, cached_ensemble = cache(
+        joos_2013_monte_carlo, runs=20, t_horizon=51, seed=0
+    )
+    assert cache.hits == 1
+    pd.testing.assert_frame_equal(summary, cached_summary)
+    np.testing.assert_array_equal(ensemble, cached_ensemble)
+
+
+def test_result_cache_eviction(tmp_path) -> None:
+    def model(n, seed=0):
+        return np.zeros(n)
+
+    cache = ResultCache(tmp_path, max_bytes=2000)
+    cache(model, 100)
+    cache(model, 101)
+    cache(model, 100)  # the 100-value entry is now the most recently used
+    cache(model, 102)
+    assert len(cache) == 2
+    assert cache.nbytes == 8 * (100 + 102)
+    cache(model, 100)
+    assert cache.hits == 2
+
+    # results larger than the cache are not stored
+    cache(model, 1000)
+    assert len(cache) == 2
+
+    with pytest.raises(TypeError):
+        cache(lambda seed=0: object())
@@ -0,0 +1,119 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tonyear import calculate_portfolio, calculate_tonyears, get_baseline_curve
+from tonyear.cli import main
+from tonyear.core import write_json
+
+
+@pytest.fixture
+def scenarios(tmp_path) -> str:
+    rng = np.random.default_rng(0)
+    n = 50
+    path = tmp_path / "scenarios.csv"
+    pd.DataFrame(
+        {
+            "method": rng.choice(["mc", "lashof", "car", "qc"], n),
+            "curve": rng.choice(["joos_2013", "ipcc_2007"], n),
+            "time_horizon": rng.choice([100, 1000], n),
+            "delay": rng.integers(1, 100, n),
+            "discount_rate": rng.choice([0, 0.02], n),
+        }
+    ).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cli_csv(scenarios, tmp_path, workers) -> None:
+    output = str(tmp_path / "results.csv")
+    assert (
+        main([scenarios, "-o", output, "--chunk-size", "7", "--workers", str(workers)])
+        == 0
+    )
+
+    results = pd.read_csv(output)
+    assert len(results) == 50
+    for _, row in results.iterrows():
+        expected = calculate_tonyears(
+            row["method"],
+            get_baseline_curve(row["curve"]),
+            row["time_horizon"],
+            row["delay"],
+            row["discount_rate"],
+        )
+        assert row["benefit"] == pytest.approx(expected["benefit"])
+        assert row["num_for_equivalence"] == pytest.approx(
+            expected["num_for_equivalence"]
+        )
+
+
+def test_cli_parquet(scenarios, tmp_path) -> None:
+    pytest.importorskip("pyarrow")
+    output = str(tmp_path / "results.parquet")
+    assert main([scenarios, "-o", output, "--chunk-size", "7"]) == 0
+    results = pd.read_parquet(output)
+
+    jsonl = tmp_path / "scenarios.jsonl"
+    pd.read_csv(scenarios).to_json(jsonl, orient="records", lines=True)
+    assert main([str(jsonl), "-o", str(tmp_path / "results.csv")]) == 0
+    pd.testing.assert_frame_equal(results, pd.read_csv(tmp_path / "results.csv"))
+
+
+def test_cli_report(scenarios, capsys) -> None:
+    assert main([scenarios, "--report", "--chunk-size", "7"]) == 0
+    out = capsys.readouterr().out
+    assert "mean_num_for_equivalence" in out
+    assert "benefit," not in out
+
+
+def test_cli_errors(tmp_path, capsys) -> None:
+    path = tmp_path / "scenarios.csv"
+    pd.DataFrame({"method": ["foo"], "time_horizon": [100], "delay": [1]}).to_csv(path)
+    assert main([str(path)]) == 1
+    assert "No ton-year accounting method called foo" in capsys.readouterr().err
+
+    pd.DataFrame({"method": ["mc"], "delay": [1]}).to_csv(path)
+    assert main([str(path)]) == 1
+    assert "Missing scenario columns: time_horizon" in capsys.readouterr().err
+
+    assert main([str(path), "-o", str(tmp_path / "results.txt")]) == 1
+    assert "Unsupported file format txt" in capsys.readouterr().err
+
+
+def test_write_json(tmp_path) -> None:
+    result = calculate_tonyears("lashof", get_baseline_curve("joos_2013"), 100, 10, 0)
+    write_json({"lashof": result}, tmp_path / "result.json")
+    with open(tmp_path / "result.json") as f:
+        loaded = json.load(f)
+    assert loaded["lashof"]["benefit"] == result["benefit"]
+    assert loaded["lashof"]["scenario"] == result["scenario"].tolist()
+
+
+@pytest.mark.parametrize(
+    "time_horizon, delay, message",
+    [
+        (100, 1.5, "Time horizon and delay must be whole years"),
+        (100.5, 1, "Time horizon and delay must be whole years"),
+        (100, 101, "Delay cannot be longer than the time horizon"),
+    ],
+)
+def test_cli_rejects_scenarios_like_portfolio(
+    tmp_path, capsys, time_horizon, delay, message
+) -> None:
+    scenarios = pd.DataFrame(
+        {
+            "method": ["mc", "lashof"],
+            "time_horizon": [100, time_horizon],
+            "delay": [1, delay],
+        }
+    )
+    path = tmp_path / "scenarios.csv"
+    scenarios.to_csv(path, index=False)
+    assert main([str(path), "-o", str(tmp_path / "results.csv")]) == 1
+    assert message in capsys.readouterr().err
+
+    with pytest.raises(ValueError, match=message):
+        calculate_portfolio(scenarios.assign(tonnes=1.0))
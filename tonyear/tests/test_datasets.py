@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from tonyear import (
+    calculate_tonyears,
+    calculate_tonyears_dataset,
+    calculate_tonyears_grid,
+    joos_2013_monte_carlo,
+    joos_2013_monte_carlo_dataset,
+    to_dataset,
+)
+
+xr = pytest.importorskip("xarray")
+
+
+def test_to_dataset() -> None:
+    result = calculate_tonyears("lashof", "joos_2013", 100, 30, 0.01)
+    ds = to_dataset(result)
+    assert ds.baseline.dims == ("time",)
+    assert ds.sizes["time"] == 101
+    assert ds.attrs == result["parameters"]
+    assert float(ds.benefit) == result["benefit"]
+
+    analytic = calculate_tonyears(
+        "lashof", "joos_2013", 100, 30, 0.01, integration="analytic"
+    )
+    with pytest.raises(ValueError, match="analytic integration have no curves"):
+        to_dataset(analytic)
+
+    grid = calculate_tonyears_grid(
+        ["mc", "qc"], "joos_2013", [50, 100], [0, 10, 40], [0]
+    )
+    ds = to_dataset(grid)
+    assert ds.benefit.dims == grid["dims"]
+    # `method` clashes with the keyword argument of .sel, so select with a dict
+    selected = ds.benefit.sel(
+        {"method": "qc", "time_horizon": 100, "delay": 40, "discount_rate": 0}
+    )
+    expected = calculate_tonyears("qc", "joos_2013", 100, 40, 0)["benefit"]
+    assert float(selected) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("integration", ["trapz", "analytic"])
+def test_calculate_tonyears_dataset_chunks(integration) -> None:
+    pytest.importorskip("dask")
+    args = (
+        ["mc", "lashof", "car"],
+        "joos_2013",
+        [50, 100, 200],
+        np.arange(201),
+        [0, 0.02],
+    )
+    expected = calculate_tonyears_dataset(*args, integration=integration)
+    ds = calculate_tonyears_dataset(
+        *args, integration=integration, chunks={"time_horizon": 2, "delay": 64}
+    )
+    assert ds.benefit.chunks[2] == (64, 64, 64, 9)
+    xr.testing.assert_identical(ds.compute(), expected)
+
+    with pytest.raises(ValueError):
+        calculate_tonyears_dataset(*args, chunks={"method": 1})
+
+
+def test_joos_2013_monte_carlo_dataset(tmp_path) -> None:
+    pytest.importorskip("dask")
+    pytest.importorskip("zarr")
+    _, expected = joos_2013_monte_carlo(500, 51, seed=4, workers=1, chunk_size=128)
+    ds = joos_2013_monte_carlo_dataset(500, 51, seed=4, chunk_size=128)
+    np.testing.assert_array_equal(ds.irf.values, expected)
+
+    lazy = joos_2013_monte_carlo_dataset(500, 51, seed=4, chunk_size=128, lazy=True)
+    assert lazy.irf.chunks == ((51,), (128, 128, 128, 116))
+    lazy.to_zarr(tmp_path / "ensemble.zarr")
+    xr.testing.assert_identical(xr.open_zarr(tmp_path / "ensemble.zarr").compute(), ds)
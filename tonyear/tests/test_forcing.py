@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from tonyear import (
+    calculate_forcing,
+    calculate_tonyears,
+    get_atmospheric_burden,
+    get_baseline_curve,
+    global_warming_potential,
+)
+from tonyear.core import sum_of_exponentials
+from tonyear.ghgforcing import GASES, gas_irf_parameters, sample_gas_parameters
+
+
+@pytest.mark.parametrize(
+    "gas, expected", [("co2", (1, 1)), ("ch4", (84, 28)), ("n2o", (264, 265))]
+)
+def test_global_warming_potential(gas, expected) -> None:
+    # IPCC AR5 WG1 Table 8.7, without climate-carbon feedbacks
+    gwp = global_warming_potential(gas, [20, 100])
+    np.testing.assert_allclose(gwp, expected, rtol=0.02)
+
+
+def test_gas_irf_parameters_as_baseline() -> None:
+    # a CO2-equivalent IRF accounts for 1 t of the gas in the ton-year methods
+    baseline = gas_irf_parameters("ch4", co2_equivalent=True)
+    result = calculate_tonyears("mc", baseline, 100, 10, 0.0, integration="analytic")
+    gwp = global_warming_potential("ch4", 100)
+    co2 = calculate_tonyears("mc", "joos_2013", 100, 10, 0.0, integration="analytic")
+    assert result["baseline_atm_cost"] == pytest.approx(gwp * co2["baseline_atm_cost"])
+
+    with pytest.raises(ValueError, match="No gas called sf6"):
+        gas_irf_parameters("sf6")
+
+
+def test_calculate_forcing_pulse() -> None:
+    emissions = np.zeros((3, 1001))
+    emissions[:, 0] = 1
+    result = calculate_forcing(emissions, per_gas=True)
+    assert result["forcing"].shape == (3, 1001)
+
+    # a CO2 pulse gives the baseline curve and cost of the ton-year methods
+    co2 = result["co2_equivalent_burden"][0]
+    np.testing.assert_allclose(co2, get_baseline_curve("joos_2013", 1001))
+    expected = calculate_tonyears("mc", "joos_2013", 1000, 10, 0.0)
+    assert result["co2_equivalent_tonyears"][0, -1] == pytest.approx(
+        expected["baseline_atm_cost"]
+    )
+    gwp = result["cumulative_forcing"][:, 100] / result["cumulative_forcing"][0, 100]
+    np.testing.assert_allclose(gwp, [1, 28, 265], rtol=0.02)
+
+    total = calculate_forcing(emissions)["forcing"]
+    np.testing.assert_allclose(total, result["forcing"].sum(axis=0))
+
+
+def test_calculate_forcing_matches_convolution() -> None:
+    rng = np.random.default_rng(0)
+    emissions = rng.normal(size=(4, 2, 150))
+    gases = ["ch4", "co2"]
+    parameters = sample_gas_parameters(gases, runs=5, seed=0)
+    result = calculate_forcing(emissions, gases, t_horizon=120, parameters=parameters)
+    assert result["forcing"].shape == (4, 5, 120)
+
+    t = np.arange(120)
+    expected = np.zeros((4, 5, 120))
+    for g, gas in enumerate(gases):
+        p = parameters[gas]
+        kernels = sum_of_exponentials(p["a"], p["tau"], t)
+        kernels *= 1000 * p["radiative_efficiency"][:, np.newaxis]
+        for s in range(4):
+            for r in range(5):
+                expected[s, r] += np.convolve(emissions[s, g], kernels[r])[:120]
+    np.testing.assert_allclose(result["forcing"], expected, rtol=1e-10, atol=1e-25)
+
+    # the CO2-equivalent burden of CO2 alone is the atmospheric burden
+    co2 = calculate_forcing(emissions[:, 1:], ["co2"])["co2_equivalent_burden"]
+    burden = get_atmospheric_burden(
+        emissions[:, 1], get_baseline_curve("joos_2013", 150)
+    )
+    np.testing.assert_allclose(co2, burden, atol=1e-12)
+
+    with pytest.raises(ValueError, match="emissions must have shape"):
+        calculate_forcing(emissions)
+    with pytest.raises(ValueError, match="No parameters for gas: co2"):
+        calculate_forcing(emissions, gases, parameters={"ch4": parameters["ch4"]})
+
+
+def test_sample_gas_parameters() -> None:
+    parameters = sample_gas_parameters(runs=2000, seed=0)
+    assert list(parameters) == list(GASES)
+    assert parameters["co2"]["a"].shape == (2000, 4)
+    assert parameters["n2o"]["tau"].shape == (2000, 1)
+    assert np.median(parameters["ch4"]["tau"]) == pytest.approx(12.4, rel=0.02)
+
+    again = sample_gas_parameters(runs=2000, seed=0)
+    np.testing.assert_array_equal(again["ch4"]["tau"], parameters["ch4"]["tau"])
+
+    fixed = sample_gas_parameters(
+        ["ch4"], runs=10, seed=0, uncertainty={"ch4": {"lifetime": 0}}
+    )
+    np.testing.assert_array_equal(fixed["ch4"]["tau"], 12.4)
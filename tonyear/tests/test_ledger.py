@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tonyear import Ledger, calculate_portfolio
+
+
+@pytest.fixture
+def projects() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n = 200
+    return pd.DataFrame(
+        {
+            "method": rng.choice(["mc", "lashof", "car", "qc"], n),
+            "tonnes": rng.uniform(1, 100, n),
+            "time_horizon": rng.choice([100, 1000], n),
+            "delay": rng.integers(1, 100, n),
+            "baseline": rng.choice(["joos_2013", "ipcc_2007"], n),
+            "discount_rate": rng.choice([0, 0.02], n),
+            "vintage": rng.integers(2020, 2025, n),
+        }
+    )
+
+
+def assert_matches_portfolio(ledger: Ledger, projects: pd.DataFrame) -> None:
+    expected, aggregate = calculate_portfolio(projects)
+    frame = ledger.to_frame()
+    for column in ["delay", "benefit", "num_for_equivalence", "tonyears"]:
+        np.testing.assert_allclose(frame[column], expected[column], rtol=1e-12)
+    pd.testing.assert_frame_equal(ledger.aggregate, aggregate, check_dtype=False)
+
+
+def test_ledger_append(projects) -> None:
+    ledger = Ledger()
+    first = ledger.append(projects[:150])
+    second = ledger.append(projects[150:])
+    assert list(first) == list(range(150)) and list(second) == list(range(150, 200))
+    assert len(ledger) == 200 and 199 in ledger
+    assert_matches_portfolio(ledger, projects)
+
+    with pytest.raises(ValueError, match="already exists"):
+        ledger.append(projects[:1].assign(project=[3]))
+    with pytest.raises(ValueError, match="No ton-year accounting method"):
+        ledger.append(projects[:1].assign(method="foo"))
+    with pytest.raises(ValueError, match="Delay cannot be longer"):
+        ledger.append(projects[:1].assign(delay=1001))
+    assert len(ledger) == 200
+
+
+def test_ledger_update_and_remove(projects) -> None:
+    ledger = Ledger()
+    ledger.append(projects)
+
+    changes = pd.DataFrame(
+        {"project": [5, 17], "delay": [10, 3], "vintage": [2030, 2020]}
+    )
+    ledger.update(changes)
+    projects.loc[[5, 17], ["delay", "vintage"]] = [[10, 2030], [3, 2020]]
+    assert_matches_portfolio(ledger, projects)
+
+    # a reversal shortens the storage duration
+    vintage = projects.loc[8, "vintage"]
+    ledger.update(pd.DataFrame({"project": [8], "reversal": [vintage + 1]}))
+    assert ledger.to_frame().loc[8, "delay"] == 1
+
+    # invalid updates change nothing
+    before = ledger.to_frame()
+    with pytest.raises(ValueError, match="Reversals cannot occur before"):
+        ledger.update(pd.DataFrame({"project": [8], "reversal": [vintage - 1]}))
+    with pytest.raises(ValueError, match="No project with id 999"):
+        ledger.update(pd.DataFrame({"project": [999], "delay": [1]}))
+    pd.testing.assert_frame_equal(ledger.to_frame(), before)
+
+    projects.loc[8, "reversal"] = vintage + 1
+    ledger.remove([0, 1, 2])
+    ledger.remove(150)
+    with pytest.raises(ValueError, match="No project with id 0"):
+        ledger.remove(0)
+    remaining = projects.drop([0, 1, 2, 150])
+    assert list(ledger.ids) == list(remaining.index)
+    assert_matches_portfolio(ledger, remaining)
+
+    # removing most projects compacts the storage
+    ledger.remove(list(remaining.index[:-10]))
+    assert_matches_portfolio(ledger, remaining[-10:])
+    assert ledger.append(projects[:1]).tolist() == [200]
+
+
+def test_ledger_snapshot(projects, tmp_path) -> None:
+    ledger = Ledger()
+    ledger.append(projects.assign(project=[f"p{i}" for i in range(len(projects))]))
+    ledger.remove(["p3", "p4"])
+    path = tmp_path / "ledger.npz"
+    ledger.save(path)
+
+    restored = Ledger.load(path)
+    pd.testing.assert_frame_equal(restored.to_frame(), ledger.to_frame())
+    pd.testing.assert_frame_equal(restored.aggregate, ledger.aggregate)
+    restored.update(pd.DataFrame({"project": ["p5"], "tonnes": [1.0]}))
+    assert restored.to_frame().loc["p5", "tonnes"] == 1.0
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tonyear import calculate_portfolio, calculate_tonyears, get_baseline_curve
+
+
+@pytest.fixture
+def projects() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n = 200
+    return pd.DataFrame(
+        {
+            "method": rng.choice(["mc", "lashof", "car", "qc"], n),
+            "tonnes": rng.uniform(1, 100, n),
+            "time_horizon": rng.choice([100, 1000], n),
+            "delay": rng.integers(1, 100, n),
+            "baseline": rng.choice(["joos_2013", "ipcc_2007"], n),
+            "discount_rate": rng.choice([0, 0.02], n),
+            "vintage": rng.integers(2020, 2025, n),
+        }
+    )
+
+
+def test_calculate_portfolio(projects) -> None:
+    ledger, aggregate = calculate_portfolio(projects)
+    assert len(ledger) == len(projects)
+
+    for _, project in ledger.iterrows():
+        expected = calculate_tonyears(
+            project["method"],
+            get_baseline_curve(project["baseline"]),
+            project["time_horizon"],
+            project["delay"],
+            project["discount_rate"],
+        )
+        for key in ["baseline_atm_cost", "benefit", "num_for_equivalence"]:
+            np.testing.assert_allclose(project[key], expected[key], rtol=1e-12)
+        np.testing.assert_allclose(
+            project["tonyears"], project["tonnes"] * expected["benefit"], rtol=1e-12
+        )
+
+    assert list(aggregate.index) == sorted(projects["vintage"].unique())
+    np.testing.assert_allclose(aggregate["tonnes"].sum(), projects["tonnes"].sum())
+
+
+def test_calculate_portfolio_structured_array(projects) -> None:
+    ledger, _ = calculate_portfolio(projects.to_records(index=False))
+    expected, _ = calculate_portfolio(projects)
+    np.testing.assert_allclose(ledger["benefit"], expected["benefit"])
+
+
+def test_calculate_portfolio_analytic(projects) -> None:
+    ledger, _ = calculate_portfolio(projects, integration="analytic")
+    expected, _ = calculate_portfolio(projects)
+    np.testing.assert_allclose(ledger["benefit"], expected["benefit"], rtol=1e-2)
+
+
+def test_calculate_portfolio_reversals() -> None:
+    projects = pd.DataFrame(
+        {
+            "method": ["lashof", "lashof"],
+            "tonnes": [10, 10],
+            "time_horizon": [100, 100],
+            "delay": [50, 50],
+            "vintage": [2020, 2020],
+            "reversal": [2030, np.nan],
+        }
+    )
+    ledger, _ = calculate_portfolio(projects)
+    assert list(ledger["delay"]) == [10, 50]
+    assert ledger["tonyears"][0] < ledger["tonyears"][1]
+
+
+def test_calculate_portfolio_raises_invalid_args(projects) -> None:
+    with pytest.raises(ValueError, match="Missing project columns: tonnes"):
+        _ = calculate_portfolio(projects.drop(columns="tonnes"))
+
+    # projects stored for longer than the time horizon would drop out of the totals
+    with pytest.raises(
+        ValueError, match="Delay cannot be longer than the time horizon"
+    ):
+        _ = calculate_portfolio(projects.assign(delay=projects["time_horizon"] + 1))
+    with pytest.raises(ValueError, match="Delay cannot be negative"):
+        _ = calculate_portfolio(projects.assign(delay=-1))
+
+    projects.loc[0, "method"] = "foo"
+    with pytest.raises(ValueError, match="No ton-year accounting method called foo"):
+        _ = calculate_portfolio(projects)
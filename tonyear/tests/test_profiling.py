@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from tonyear import (
+    ResultCache,
+    calculate_tonyears,
+    get_baseline_curve,
+    get_time_grid,
+    joos_2013_monte_carlo,
+    profile,
+)
+from tonyear.core import _cached_baseline_curve
+from tonyear.profiling import is_profiling, stage
+
+
+def test_profile_records_stages() -> None:
+    assert not is_profiling()
+    with profile() as report:
+        assert is_profiling()
+        joos_2013_monte_carlo(runs=50, t_horizon=101, seed=0)
+        calculate_tonyears("lashof", "joos_2013", 100, 50, 0.0)
+        calculate_tonyears("mc", "joos_2013", 100, 50, 0.0)
+        calculate_tonyears("mc", "joos_2013", 100, 0.5, 0.0, time=get_time_grid(100))
+    assert not is_profiling()
+
+    stages = report.to_dict()["stages"]
+    assert stages["calculate_tonyears"]["calls"] == 3
+    # on annual steps and on a time grid alike
+    assert stages["integration"]["calls"] == 3
+    for name in ["joos_2013_monte_carlo", "sample_parameters", "summarize"]:
+        assert stages[name]["calls"] == 1
+        assert stages[name]["seconds"] > 0
+    # stage times include the stages nested within them
+    assert (
+        stages["joos_2013_monte_carlo"]["seconds"]
+        >= stages["sample_parameters"]["seconds"]
+    )
+    assert stages["calculate_tonyears"]["seconds"] >= stages["integration"]["seconds"]
+    assert "peak_bytes" not in stages["summarize"]
+    assert json.loads(report.to_json()) == report.to_dict()
+
+    # nothing is recorded once the profile has ended
+    calculate_tonyears("mc", "joos_2013", 100, 50, 0.0)
+    assert report.to_dict()["stages"]["calculate_tonyears"]["calls"] == 3
+
+
+def test_profile_memory() -> None:
+    with profile(memory=True) as report:
+        with stage("outer"):
+            with stage("inner"):
+                a = np.ones(10**6)
+            del a
+            b = np.ones(2 * 10**6)
+        del b
+    stages = report.to_dict()["stages"]
+    assert 8 * 10**6 <= stages["inner"]["peak_bytes"] < 9 * 10**6
+    assert 16 * 10**6 <= stages["outer"]["peak_bytes"] < 17 * 10**6
+
+
+def test_profile_counters(tmp_path) -> None:
+    _cached_baseline_curve.cache_clear()
+    cache = ResultCache(tmp_path)
+    with profile() as outer:
+        with profile() as inner:
+            get_baseline_curve("joos_2013", 37)
+            get_baseline_curve("joos_2013", 37)
+            cache(joos_2013_monte_carlo, runs=10, t_horizon=11, seed=0)
+            cache(joos_2013_monte_carlo, runs=10, t_horizon=11, seed=0)
+            cache(joos_2013_monte_carlo, runs=10, t_horizon=11, seed=None)
+        get_baseline_curve("joos_2013", 37)
+
+    assert inner.to_dict()["counters"] == {
+        "baseline_curve_cache.misses": 1,
+        "baseline_curve_cache.hits": 1,
+        "result_cache.misses": 1,
+        "result_cache.hits": 1,
+        "result_cache.bypasses": 1,
+    }
+    assert outer.to_dict()["counters"]["baseline_curve_cache.hits"] == 2
+    # only the calls that ran the model were recorded as stages
+    assert inner.to_dict()["stages"]["joos_2013_monte_carlo"]["calls"] == 2
+
+
+def test_profile_from_environment(tmp_path) -> None:
+    output = tmp_path / "profile.json"
+    env = dict(os.environ, TONYEAR_PROFILE=str(output))
+    code = "import tonyear; tonyear.calculate_tonyears('qc', 'joos_2013', 100, 10, 0.0)"
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+    report = json.loads(output.read_text())
+    assert report["stages"]["calculate_tonyears"]["calls"] == 1
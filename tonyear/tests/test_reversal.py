@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from tonyear import calculate_tonyears, sample_storage_durations, simulate_reversals
+
+
+def test_sample_storage_durations() -> None:
+    durations = sample_storage_durations("constant", 100000, seed=0, rate=[0.02, 0.1])
+    assert durations.shape == (2, 100000)
+    np.testing.assert_allclose(durations.mean(axis=-1), [50, 10], rtol=0.02)
+
+    durations = sample_storage_durations("weibull", 100000, seed=0, shape=1, scale=40)
+    np.testing.assert_allclose(durations.mean(), 40, rtol=0.02)
+
+    # one project with a 10% annual risk, one with no risk for 10 years and none after
+    table = np.zeros((2, 20))
+    table[0] = 0.1
+    table[1, 10] = 1
+    durations = sample_storage_durations("empirical", 100000, seed=0, table=table)
+    assert np.mean(durations[0] < 1) == pytest.approx(0.1, abs=0.005)
+    assert np.mean(np.isinf(durations[0])) == pytest.approx(0.9**20, abs=0.005)
+    assert np.all((durations[1] >= 10) & (durations[1] <= 11))
+
+    np.testing.assert_array_equal(
+        sample_storage_durations("constant", 10, seed=1, rate=0.1),
+        sample_storage_durations("constant", 10, seed=1, rate=0.1),
+    )
+
+
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+def test_simulate_reversals(method) -> None:
+    result = simulate_reversals(
+        method,
+        "joos_2013",
+        100,
+        "weibull",
+        1000,
+        delay=[20, 60],
+        discount_rate=0.01,
+        shape=1.5,
+        scale=[30, 300],
+        seed=0,
+    )
+    assert result["duration"].shape == (2, 1000)
+    assert np.all(result["duration"] <= np.array([[20], [60]]))
+
+    # each draw matches calculate_tonyears at whole-year durations
+    duration = np.floor(result["duration"][1, :5]).astype(int)
+    index_benefit = simulate_reversals(
+        method,
+        "joos_2013",
+        100,
+        "constant",
+        1,
+        delay=duration,
+        discount_rate=0.01,
+        rate=0,
+    )["benefit"][:, 0]
+    expected = [
+        calculate_tonyears(method, "joos_2013", 100, d, 0.01)["benefit"]
+        for d in duration
+    ]
+    np.testing.assert_allclose(index_benefit, expected)
+
+    summary = result["summary"]
+    assert list(summary.index) == [0, 1]
+    assert np.all(summary["reversal_probability"].between(0, 1))
+    np.testing.assert_allclose(
+        summary["num_for_equivalence"],
+        result["baseline_atm_cost"] / result["benefit"].mean(axis=-1),
+    )
+    assert np.all(
+        summary["num_for_equivalence_5th"] <= summary["num_for_equivalence_95th"]
+    )
+
+
+def test_simulate_reversals_raises_invalid_args() -> None:
+    with pytest.raises(ValueError, match="No ton-year accounting method called foo"):
+        simulate_reversals("foo", "joos_2013", 100, "constant", 10, rate=0.1)
+    with pytest.raises(ValueError, match="No hazard model called foo"):
+        simulate_reversals("mc", "joos_2013", 100, "foo", 10, rate=0.1)
+    with pytest.raises(ValueError, match="needs a shape and a scale"):
+        simulate_reversals("mc", "joos_2013", 100, "weibull", 10, shape=1)
+    with pytest.raises(ValueError, match="longer than the time horizon"):
+        simulate_reversals("mc", "joos_2013", 100, "constant", 10, delay=200, rate=0.1)
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        sample_storage_durations("empirical", 10, table=[0.1, 2])
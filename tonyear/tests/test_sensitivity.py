@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from tonyear import calculate_sensitivity
+from tonyear.core import analytic_tonyears
+from tonyear.stats import sobol_indices
+
+
+def test_sobol_indices() -> None:
+    # Y = x1 + 2 x2 + 3 x3 with uniform inputs: S1 = ST = w_i^2 / sum(w^2)
+    rng = np.random.default_rng(0)
+    weights = np.array([1.0, 2.0, 3.0])
+    a, b = rng.uniform(size=(2, 20000, 3))
+    ab = np.stack([np.where(np.arange(3) == i, b, a) for i in range(3)])
+    result = sobol_indices(
+        a @ weights, b @ weights, ab @ weights, bootstrap=200, seed=0
+    )
+
+    expected = weights**2 / np.sum(weights**2)
+    np.testing.assert_allclose(result["S1"], expected, atol=0.03)
+    np.testing.assert_allclose(result["ST"], expected, atol=0.03)
+    assert np.all(result["S1_low"] <= result["S1"])
+    assert np.all(result["S1"] <= result["S1_high"])
+    assert np.all(result["ST_low"] <= result["ST"])
+    assert np.all(result["ST"] <= result["ST_high"])
+
+
+def test_calculate_sensitivity() -> None:
+    indices = calculate_sensitivity(
+        "lashof", delay=(10, 90), discount_rate=(0, 0.03), runs=512, seed=1
+    )
+    assert list(indices.index) == [
+        "tau1",
+        "tau2",
+        "tau3",
+        "a1",
+        "a2",
+        "a3",
+        "delay",
+        "discount_rate",
+    ]
+    assert list(indices.columns) == [
+        "S1",
+        "S1_low",
+        "S1_high",
+        "ST",
+        "ST_low",
+        "ST_high",
+    ]
+    # the delay drives the equivalence ratio
+    assert indices["ST"].idxmax() == "delay"
+    assert np.all(indices["ST"] >= 0)
+
+    # results don't depend on how the runs are batched
+    batched = calculate_sensitivity(
+        "lashof",
+        delay=(10, 90),
+        discount_rate=(0, 0.03),
+        runs=512,
+        seed=1,
+        batch_size=1000,
+    )
+    np.testing.assert_allclose(batched, indices)
+
+
+def test_calculate_sensitivity_car() -> None:
+    # CAR benefits and costs don't depend on the IRF, nor on the discount rate
+    indices = calculate_sensitivity(
+        "car", delay=(10, 90), discount_rate=(0, 0.03), runs=64
+    )
+    np.testing.assert_allclose(indices.loc["tau1":"a3", ["S1", "ST"]], 0, atol=1e-12)
+    np.testing.assert_allclose(
+        indices.loc["discount_rate", ["S1", "ST"]], 0, atol=1e-12
+    )
+
+
+def test_analytic_tonyears_paired() -> None:
+    a = np.array([[0.2, 0.3, 0.5], [0.4, 0.4, 0.2]])
+    tau = np.array([[0.0, 30.0, 4.0], [0.0, 100.0, 10.0]])
+    time_horizon, delay, rate = (
+        np.array([100, 80]),
+        np.array([50, 20]),
+        np.array([0.0, 0.02]),
+    )
+    cost, benefit = analytic_tonyears(
+        "mc", a, tau, time_horizon, delay, rate, paired=True
+    )
+    for i in range(2):
+        expected = analytic_tonyears(
+            "mc", a[i], tau[i], time_horizon[i], delay[i], rate[i]
+        )
+        assert cost[i] == pytest.approx(expected[0])
+        assert benefit[i] == pytest.approx(expected[1])
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"method": "nope"},
+        {"method": "mc", "output": "nope"},
+        {"method": "mc", "delay": 0},
+        {"method": "mc", "delay": (10, 120)},
+        {"method": "mc", "irf": False},
+    ],
+)
+def test_calculate_sensitivity_errors(kwargs) -> None:
+    with pytest.raises(ValueError):
+        calculate_sensitivity(runs=8, **kwargs)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from tonyear import (
+    calculate_tonyears,
+    calculate_tonyears_series,
+    get_atmospheric_burden,
+    get_baseline_curve,
+)
+
+
+@pytest.mark.parametrize("method", ["direct", "fft", "auto"])
+@pytest.mark.parametrize("length", [10, 500])
+def test_get_atmospheric_burden(method, length) -> None:
+    baseline = get_baseline_curve("joos_2013", 1001)
+    flux = np.random.default_rng(0).normal(size=(3, 2, length))
+
+    burden = get_atmospheric_burden(flux, baseline, method=method)
+    assert burden.shape == (3, 2, 1001)
+
+    # burden is the sum of shifted baseline curves, one for each year of flux
+    expected = np.zeros((3, 2, 1001))
+    for year in range(length):
+        expected[..., year:] += flux[..., [year]] * baseline[: 1001 - year]
+    np.testing.assert_allclose(burden, expected, atol=1e-10)
+
+    single = get_atmospheric_burden(flux[0, 0], baseline, method=method)
+    np.testing.assert_allclose(single, burden[0, 0], atol=1e-10)
+
+
+def test_get_atmospheric_burden_errors() -> None:
+    baseline = get_baseline_curve("joos_2013", 101)
+    with pytest.raises(ValueError):
+        get_atmospheric_burden(np.ones(102), baseline)
+    with pytest.raises(ValueError):
+        get_atmospheric_burden(np.ones(10), baseline, method="spline")
+
+
+@pytest.mark.parametrize("discount_rate", [0, 0.02])
+@pytest.mark.parametrize("delay", [1, 50, 99])
+def test_calculate_tonyears_series_lashof(delay, discount_rate) -> None:
+    baseline = get_baseline_curve("joos_2013", 1001)
+    expected = calculate_tonyears("lashof", baseline, 100, delay, discount_rate)
+
+    pulse = np.zeros(101)
+    pulse[0] = 1
+    delayed = np.zeros(101)
+    delayed[delay] = 1
+    result = calculate_tonyears_series(
+        delayed, "joos_2013", 100, discount_rate, reference=pulse, method="fft"
+    )
+
+    assert result["reference_atm_cost"] == pytest.approx(expected["baseline_atm_cost"])
+    # Lashof integrates the scenario from t=delay, leaving out the ramp up to the pulse
+    ramp = 0.5 / (1 + discount_rate) ** delay
+    assert result["benefit"] == pytest.approx(expected["benefit"] - ramp)
+
+
+def test_calculate_tonyears_series_batched() -> None:
+    flux = np.random.default_rng(1).normal(size=(4, 200))
+    result = calculate_tonyears_series(flux, "ipcc_2007", 100, 0.01)
+    assert result["burden"].shape == (4, 101)
+    assert result["atm_cost"].shape == (4,)
+    assert result["benefit"] is None
+
+    for row, cost in zip(flux, result["atm_cost"]):
+        single = calculate_tonyears_series(row, "ipcc_2007", 100, 0.01)
+        assert single["atm_cost"] == pytest.approx(cost)
@@ -0,0 +1,267 @@
+import asyncio
+import json
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pytest
+
+import tonyear.server as server_module
+from tonyear import calculate_tonyears
+from tonyear.server import ARROW_STREAM, TonYearServer, parse_queries
+
+
+async def _request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    method: str,
+    target: str,
+    body: bytes = b"",
+    headers: Optional[Dict[str, str]] = None,
+) -> Tuple[int, Dict[str, str], bytes]:
+    lines = [f"{method} {target} HTTP/1.1", f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode().split("\r\n")
+    response_headers = dict(
+        line.lower().split(": ", 1) for line in head[1:] if ": " in line
+    )
+    content = await reader.readexactly(int(response_headers["content-length"]))
+    return int(head[0].split(" ")[1]), response_headers, content
+
+
+def test_server_batches_concurrent_queries() -> None:
+    rng = np.random.default_rng(0)
+    queries = [
+        {
+            "method": str(rng.choice(["mc", "lashof", "car", "qc"])),
+            "curve": str(rng.choice(["joos_2013", "ipcc_2007"])),
+            "time_horizon": int(rng.choice([100, 1000])),
+            "delay": int(rng.integers(1, 100)),
+            "discount_rate": float(rng.choice([0, 0.02])),
+        }
+        for _ in range(200)
+    ]
+
+    async def run():
+        server = TonYearServer(window=0.01)
+        return server, await asyncio.gather(*(server.evaluate(q) for q in queries))
+
+    server, results = asyncio.run(run())
+    assert server.queries == 200
+    assert server.batches == 1
+    for query, result in zip(queries, results):
+        expected = calculate_tonyears(
+            query["method"],
+            query["curve"],
+            query["time_horizon"],
+            query["delay"],
+            query["discount_rate"],
+        )
+        for key in ("baseline_atm_cost", "benefit", "num_for_equivalence"):
+            np.testing.assert_allclose(result[key][0], expected[key], rtol=1e-10)
+
+
+def test_server_max_batch() -> None:
+    async def run():
+        server = TonYearServer(window=10, max_batch=2)
+        query = {"method": "mc", "time_horizon": 100, "delay": 10}
+        await asyncio.gather(*(server.evaluate(query) for _ in range(4)))
+        return server
+
+    assert asyncio.run(run()).batches == 2
+
+
+def test_server_rejects_invalid_requests_alone() -> None:
+    async def run():
+        server = TonYearServer(window=0.01)
+        return server, await asyncio.gather(
+            server.evaluate({"method": "mc", "time_horizon": 100, "delay": 10}),
+            server.evaluate({"method": "mc", "time_horizon": 100, "delay": -1}),
+            server.evaluate({"method": "qc", "time_horizon": 100, "delay": 10}),
+            return_exceptions=True,
+        )
+
+    server, (first, invalid, last) = asyncio.run(run())
+    assert isinstance(invalid, ValueError)
+    assert first["benefit"][0] == 10
+    assert server.batches == 1 and server.queries == 2
+
+
+def test_server_evaluates_uncombinable_requests_alone(monkeypatch) -> None:
+    validate = server_module._validate
+
+    def validate_alone(columns, max_time_horizon):
+        if len(columns["method"]) > 1:
+            raise ValueError("Queries cannot be combined")
+        return validate(columns, max_time_horizon)
+
+    monkeypatch.setattr(server_module, "_validate", validate_alone)
+
+    async def run():
+        server = TonYearServer(window=0.01)
+        query = {"method": "mc", "time_horizon": 100, "delay": 10}
+        return server, await asyncio.gather(*(server.evaluate(query) for _ in range(3)))
+
+    server, results = asyncio.run(run())
+    assert server.batches == 3
+    assert all(result["benefit"][0] == 10 for result in results)
+
+
+def test_parse_queries() -> None:
+    queries = parse_queries(
+        {"method": ["mc", "qc"], "time_horizon": 100, "delay": [0, 50]}, 1000
+    )
+    assert list(queries["curve"]) == ["joos_2013", "joos_2013"]
+    np.testing.assert_array_equal(queries["time_horizon"], [100, 100])
+    np.testing.assert_array_equal(queries["discount_rate"], [0, 0])
+
+    with pytest.raises(ValueError, match="No ton-year accounting method"):
+        parse_queries({"method": "foo", "time_horizon": 100, "delay": 1}, 1000)
+    with pytest.raises(ValueError, match="Missing query field: delay"):
+        parse_queries([{"method": "mc", "time_horizon": 100}], 1000)
+    with pytest.raises(ValueError, match="whole years"):
+        parse_queries({"method": "mc", "time_horizon": 100, "delay": 1.5}, 1000)
+    with pytest.raises(ValueError, match="cannot be longer than 1000 years"):
+        parse_queries({"method": "mc", "time_horizon": 1001, "delay": 1}, 1000)
+    with pytest.raises(ValueError, match="Delay cannot be longer"):
+        parse_queries({"method": "mc", "time_horizon": 10, "delay": 11}, 1000)
+    with pytest.raises(ValueError, match="same length"):
+        parse_queries({"method": ["mc"], "time_horizon": 10, "delay": [1, 2]}, 1000)
+
+
+@pytest.mark.parametrize("unix", [False, True])
+def test_server_http(tmp_path, unix) -> None:
+    async def run():
+        server = TonYearServer()
+        if unix:
+            path = str(tmp_path / "tonyear.sock")
+            listener = await server.start(path=path)
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            listener = await server.start(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        # requests share one keep-alive connection
+        query = {"method": "lashof", "time_horizon": 100, "delay": 50}
+        single = await _request(
+            reader, writer, "POST", "/tonyears", json.dumps(query).encode()
+        )
+        many = await _request(
+            reader,
+            writer,
+            "POST",
+            "/tonyears",
+            json.dumps([query, dict(query, delay=0)]).encode(),
+        )
+        bad = await _request(reader, writer, "POST", "/tonyears", b"{")
+        missing = await _request(reader, writer, "GET", "/nothing")
+        stats = await _request(reader, writer, "GET", "/stats")
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return single, many, bad, missing, stats
+
+    single, many, bad, missing, stats = asyncio.run(run())
+    expected = calculate_tonyears("lashof", "joos_2013", 100, 50, 0.0)
+
+    status, headers, content = single
+    assert status == 200 and headers["content-type"] == "application/json"
+    assert json.loads(content)["benefit"] == pytest.approx(expected["benefit"])
+
+    status, _, content = many
+    results = json.loads(content)
+    assert results["benefit"][0] == pytest.approx(expected["benefit"])
+    # infinite equivalence ratios of zero benefits are returned as null
+    assert results["benefit"][1] == 0 and results["num_for_equivalence"][1] is None
+
+    assert bad[0] == 400 and "error" in json.loads(bad[2])
+    assert missing[0] == 404
+    assert json.loads(stats[2])["queries"] == 3
+
+
+def test_server_arrow() -> None:
+    pa = pytest.importorskip("pyarrow")
+
+    table = pa.table(
+        {
+            "method": ["mc", "car"],
+            "time_horizon": [100, 100],
+            "delay": [10, 20],
+            "discount_rate": [0.0, 0.03],
+        }
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as stream:
+        stream.write_table(table)
+
+    async def run():
+        listener = await TonYearServer().start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        response = await _request(
+            reader,
+            writer,
+            "POST",
+            "/tonyears",
+            sink.getvalue().to_pybytes(),
+            {"Content-Type": ARROW_STREAM, "Accept": ARROW_STREAM},
+        )
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return response
+
+    status, headers, content = asyncio.run(run())
+    assert status == 200 and headers["content-type"] == ARROW_STREAM
+    results = pa.ipc.open_stream(content).read_all().to_pydict()
+    for i, (method, delay, discount_rate) in enumerate(
+        [("mc", 10, 0.0), ("car", 20, 0.03)]
+    ):
+        expected = calculate_tonyears(method, "joos_2013", 100, delay, discount_rate)
+        assert results["benefit"][i] == pytest.approx(expected["benefit"])
+
+
+def test_server_http_columns() -> None:
+    async def run():
+        listener = await TonYearServer().start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        # scalar fields apply to every query in a dict of columns
+        query = {"method": "lashof", "time_horizon": 100, "delay": [10, 20, 30]}
+        response = await _request(
+            reader, writer, "POST", "/tonyears", json.dumps(query).encode()
+        )
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return response
+
+    status, _, content = asyncio.run(run())
+    assert status == 200
+    results = json.loads(content)
+    for i, delay in enumerate([10, 20, 30]):
+        expected = calculate_tonyears("lashof", "joos_2013", 100, delay, 0.0)
+        assert results["benefit"][i] == pytest.approx(expected["benefit"])
+
+
+@pytest.mark.parametrize("length", ["ten", "-1"])
+def test_server_invalid_content_length(length) -> None:
+    async def run():
+        listener = await TonYearServer().start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            f"POST /tonyears HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return response
+
+    head, content = asyncio.run(run()).split(b"\r\n\r\n", 1)
+    assert head.startswith(b"HTTP/1.1 400") and b"Connection: close" in head
+    assert json.loads(content) == {"error": "Invalid Content-Length"}
@@ -1,13 +1,30 @@
+import subprocess
+import sys
+
 import numpy as np
 import pytest
 
+import tonyear
 from tonyear import (
+    TonYearIndex,
+    TonYearResult,
+    calculate_delay_for_equivalence,
+    calculate_time_horizon_for_equivalence,
     calculate_tonyears,
+    calculate_tonyears_grid,
+    calculate_tonyears_monte_carlo,
     get_baseline_curve,
+    get_time_grid,
+    iter_joos_2013_monte_carlo,
     joos_2013,
     joos_2013_monte_carlo,
+    joos_2013_monte_carlo_summary,
     print_benefit_report,
+    register_baseline_curve,
 )
+from tonyear.core import get_curve_parameters
+from tonyear.ghgforcing import JOOS_2013_X, sample_joos_2013_parameters
+from tonyear.stats import standard_error
 
 
 @pytest.mark.parametrize("curve_name", ["joos_2013", "ipcc_2007", "ipcc_2000"])
@@ -28,6 +45,45 @@ def test_get_baseline_curve_raises_invalid_args() -> None:
         _ = get_baseline_curve("foo")
 
 
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_get_baseline_curve_cached(dtype) -> None:
+    curve = get_baseline_curve("joos_2013", t_horizon=100, dtype=dtype)
+    assert curve.dtype == dtype
+    assert not curve.flags.writeable
+    assert get_baseline_curve("joos_2013", t_horizon=100, dtype=dtype) is curve
+    with pytest.raises(ValueError):
+        curve[0] = 0
+
+
+@pytest.fixture
+def curve_registry(monkeypatch):
+    """Discard curves registered by a test once it has finished"""
+    registry = dict(tonyear.core._IRF_PARAMETERS)
+    monkeypatch.setattr(tonyear.core, "_IRF_PARAMETERS", registry)
+    yield
+    monkeypatch.undo()
+    tonyear.core._cached_baseline_curve.cache_clear()
+
+
+def test_register_baseline_curve(curve_registry) -> None:
+    register_baseline_curve("test_curve", [0.5, 0.5], [0, 10])
+    curve = get_baseline_curve("test_curve", t_horizon=11)
+    assert curve[0] == 1
+    np.testing.assert_allclose(curve[10], 0.5 + 0.5 * np.exp(-1))
+
+    with pytest.raises(
+        ValueError, match="Baseline curve test_curve is already registered."
+    ):
+        register_baseline_curve("test_curve", [1], [0])
+
+    register_baseline_curve("test_curve", [1], [0], overwrite=True)
+    assert get_curve_parameters("test_curve") == ((1.0,), (0.0,))
+    assert np.all(get_baseline_curve("test_curve", t_horizon=11) == 1)
+
+    with pytest.raises(ValueError, match="a and tau must have the same length"):
+        register_baseline_curve("bad_curve", [1, 2], [0])
+
+
 def test_baseline_curve_values() -> None:
     """
     Test values taken from Joos 2013, Table 4, Best estimates for time-integrated IRF
@@ -114,6 +170,28 @@ def test_qc_tonyear_values() -> None:
     assert round((qc["benefit"] / qc["baseline_atm_cost"]), 1) == 0.4
 
 
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+@pytest.mark.parametrize("discount_rate", [0, 0.02])
+def test_calculate_tonyears_lazy(method, discount_rate, capsys) -> None:
+    curve = get_baseline_curve("joos_2013")
+    expected = calculate_tonyears(method, curve, 100, 30, discount_rate)
+    result = calculate_tonyears(method, curve, 100, 30, discount_rate, lazy=True)
+    assert isinstance(result, TonYearResult)
+    assert not hasattr(result, "__dict__")
+
+    assert result._scenario is None
+    assert result.benefit == expected["benefit"]
+    assert result["num_for_equivalence"] == expected["num_for_equivalence"]
+    assert list(result) == list(expected)
+    np.testing.assert_array_equal(result["scenario"], expected["scenario"])
+    np.testing.assert_array_equal(result.to_dict()["baseline"], expected["baseline"])
+    with pytest.raises(KeyError):
+        result["foo"]
+
+    print_benefit_report(result)
+    assert "Number needed" in capsys.readouterr().out
+
+
 def test_calculate_tonyears_raises_invalid_args() -> None:
     with pytest.raises(ValueError, match="No ton-year accounting method called foo"):
         _ = calculate_tonyears("foo", np.arange(20), 10, 5, 0.1)
@@ -131,6 +209,108 @@ def test_calculate_tonyears_raises_invalid_args() -> None:
         _ = calculate_tonyears("foo", np.arange(20), 30, 5, 0.1)
 
 
+@pytest.mark.parametrize("curve_name", ["joos_2013", "ipcc_2000"])
+def test_calculate_tonyears_grid(curve_name) -> None:
+    curve = get_baseline_curve(curve_name)
+    methods = ["mc", "lashof", "car", "qc"]
+    time_horizons = [1, 100, 1000]
+    delays = [1, 46, 100]
+    discount_rates = [0, 0.033]
+    grid = calculate_tonyears_grid(
+        methods, curve, time_horizons, delays, discount_rates
+    )
+    assert grid["dims"] == ("method", "time_horizon", "delay", "discount_rate")
+    assert grid["benefit"].shape == (4, 3, 3, 2)
+
+    for i, method in enumerate(methods):
+        for j, time_horizon in enumerate(time_horizons):
+            for k, delay in enumerate(delays):
+                for m, discount_rate in enumerate(discount_rates):
+                    if delay > time_horizon:
+                        assert np.isnan(grid["benefit"][i, j, k, m])
+                        continue
+                    expected = calculate_tonyears(
+                        method, curve, time_horizon, delay, discount_rate
+                    )
+                    for key in ["baseline_atm_cost", "benefit", "num_for_equivalence"]:
+                        np.testing.assert_allclose(
+                            grid[key][i, j, k, m], expected[key], rtol=1e-12
+                        )
+
+
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+@pytest.mark.parametrize("discount_rate", [0, 0.1])
+def test_tonyear_index(method, discount_rate) -> None:
+    curve = get_baseline_curve("joos_2013")
+    index = TonYearIndex(curve, discount_rate)
+
+    expected = calculate_tonyears(method, curve, 100, 46, discount_rate)
+    np.testing.assert_allclose(
+        index.baseline_atm_cost(100), expected["baseline_atm_cost"]
+    )
+    np.testing.assert_allclose(index.benefit(method, 100, 46), expected["benefit"])
+    np.testing.assert_allclose(
+        index.num_for_equivalence(method, 100, 46), expected["num_for_equivalence"]
+    )
+
+    delays = np.arange(1, 101)
+    benefits = index.benefit(method, 100, delays)
+    assert benefits.shape == delays.shape
+    np.testing.assert_allclose(
+        benefits,
+        [
+            calculate_tonyears(method, curve, 100, delay, discount_rate)["benefit"]
+            for delay in delays
+        ],
+    )
+    assert np.isnan(index.benefit(method, 10, 46))
+
+
+def test_tonyear_index_raises_invalid_args() -> None:
+    index = TonYearIndex(np.arange(20), 0.1)
+    with pytest.raises(ValueError, match="No ton-year accounting method called foo"):
+        _ = index.benefit("foo", 10, 5)
+
+    with pytest.raises(ValueError, match="Delay cannot be negative."):
+        _ = index.benefit("mc", 10, -1)
+
+    with pytest.raises(ValueError, match="Time horizon must be greater than zero."):
+        _ = index.benefit("mc", [10, 0], 5)
+
+    with pytest.raises(
+        ValueError,
+        match="Time horizon cannot be longer than length of the baseline array.",
+    ):
+        _ = index.baseline_atm_cost(30)
+
+
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+@pytest.mark.parametrize("delay", [1, 3, 5])
+def test_tonyear_index_needs_full_time_horizon(method, delay) -> None:
+    # the baseline must include t=time_horizon for the index to match calculate_tonyears
+    baseline = get_baseline_curve("joos_2013", 6)
+    index = TonYearIndex(baseline, 0.02)
+    expected = calculate_tonyears(method, baseline, 5, delay, 0.02)
+    assert index.benefit(method, 5, delay) == pytest.approx(expected["benefit"])
+
+    with pytest.raises(ValueError, match="Time horizon cannot be longer"):
+        _ = TonYearIndex(baseline[:5], 0.02).benefit(method, 5, delay)
+
+
+def test_calculate_tonyears_grid_raises_invalid_args() -> None:
+    with pytest.raises(ValueError, match="No ton-year accounting method called foo"):
+        _ = calculate_tonyears_grid(["mc", "foo"], np.arange(20), 10, 5, 0.1)
+
+    with pytest.raises(ValueError, match="Delay cannot be negative."):
+        _ = calculate_tonyears_grid(["mc"], np.arange(20), 10, [-1, 5], 0.1)
+
+    with pytest.raises(
+        ValueError,
+        match="Time horizon cannot be longer than length of the baseline array.",
+    ):
+        _ = calculate_tonyears_grid(["mc"], np.arange(20), [10, 30], 5, 0.1)
+
+
 def test_print_benefit_report() -> None:
     method_dict = {
         "parameters": {
@@ -170,3 +350,420 @@ def test_joos_2013_monte_carlo_raises_invalid_args() -> None:
 def test_joos_2013_monte_carlo(runs, t_horizon) -> None:
     summary, results = joos_2013_monte_carlo(runs=runs, t_horizon=t_horizon)
     assert results.shape == (t_horizon, runs)
+
+
+def test_joos_2013_monte_carlo_seed() -> None:
+    summary, results = joos_2013_monte_carlo(runs=100, t_horizon=101, seed=42)
+    _, same = joos_2013_monte_carlo(
+        runs=100, t_horizon=101, seed=np.random.default_rng(42)
+    )
+    _, other = joos_2013_monte_carlo(runs=100, t_horizon=101, seed=43)
+    np.testing.assert_array_equal(results, same)
+    assert not np.array_equal(results, other)
+    assert list(summary.columns) == ["mean", "-2sigma", "+2sigma", "5th", "95th"]
+
+
+def test_joos_2013_monte_carlo_matches_joos_2013() -> None:
+    _, results = joos_2013_monte_carlo(runs=10, t_horizon=101, seed=0)
+    a, tau = sample_joos_2013_parameters(10, seed=0)
+    for run in range(10):
+        kwargs = dict(zip(["a0", "a1", "a2", "a3"], a[run]))
+        kwargs.update(zip(["tau1", "tau2", "tau3"], tau[run, 1:]))
+        np.testing.assert_array_equal(results[:, run], joos_2013(101, **kwargs))
+
+
+def test_joos_2013_monte_carlo_dtype() -> None:
+    summary, results = joos_2013_monte_carlo(
+        runs=100, t_horizon=101, seed=0, dtype=np.float32
+    )
+    assert results.dtype == np.float32
+    _, expected = joos_2013_monte_carlo(runs=100, t_horizon=101, seed=0)
+    np.testing.assert_allclose(results, expected, rtol=1e-5)
+
+
+def test_iter_joos_2013_monte_carlo() -> None:
+    chunks = list(
+        iter_joos_2013_monte_carlo(runs=250, t_horizon=101, chunk_size=100, seed=0)
+    )
+    assert [chunk.shape for chunk in chunks] == [(101, 100), (101, 100), (101, 50)]
+    _, expected = joos_2013_monte_carlo(runs=250, t_horizon=101, seed=0)
+    np.testing.assert_array_equal(np.concatenate(chunks, axis=1), expected)
+
+
+@pytest.mark.parametrize("percentiles, atol", [("exact", 1e-12), ("sketch", 1e-3)])
+def test_joos_2013_monte_carlo_summary(percentiles, atol) -> None:
+    expected, _ = joos_2013_monte_carlo(runs=2000, t_horizon=501, seed=0)
+    summary = joos_2013_monte_carlo_summary(
+        runs=2000, t_horizon=501, chunk_size=300, seed=0, percentiles=percentiles
+    )
+    np.testing.assert_allclose(summary["mean"], expected["mean"], rtol=1e-12)
+    np.testing.assert_allclose(summary["+2sigma"], expected["+2sigma"], rtol=1e-12)
+    np.testing.assert_allclose(summary["5th"], expected["5th"], atol=atol)
+    np.testing.assert_allclose(summary["95th"], expected["95th"], atol=atol)
+
+
+def test_joos_2013_monte_carlo_summary_raises_invalid_args() -> None:
+    with pytest.raises(ValueError, match="number of runs must be >1"):
+        _ = joos_2013_monte_carlo_summary(1, 1001)
+
+    with pytest.raises(ValueError, match="No percentile method called foo"):
+        _ = joos_2013_monte_carlo_summary(100, 1001, percentiles="foo")
+
+
+def test_joos_2013_monte_carlo_workers() -> None:
+    summary, results = joos_2013_monte_carlo(
+        runs=500, t_horizon=101, seed=0, workers=1, chunk_size=150
+    )
+    summary_parallel, results_parallel = joos_2013_monte_carlo(
+        runs=500, t_horizon=101, seed=0, workers=2, chunk_size=150
+    )
+    assert results.shape == (101, 500)
+    np.testing.assert_array_equal(results, results_parallel)
+    assert summary.equals(summary_parallel)
+
+
+@pytest.mark.parametrize("percentiles", ["exact", "sketch"])
+def test_joos_2013_monte_carlo_summary_workers(percentiles) -> None:
+    expected, _ = joos_2013_monte_carlo(
+        runs=500, t_horizon=101, seed=0, workers=1, chunk_size=150
+    )
+    summaries = [
+        joos_2013_monte_carlo_summary(
+            runs=500,
+            t_horizon=101,
+            chunk_size=150,
+            seed=0,
+            percentiles=percentiles,
+            workers=workers,
+        )
+        for workers in [1, 2]
+    ]
+    assert summaries[0].equals(summaries[1])
+    np.testing.assert_allclose(summaries[0]["mean"], expected["mean"], rtol=1e-12)
+
+
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+def test_calculate_tonyears_monte_carlo(method) -> None:
+    _, results = joos_2013_monte_carlo(runs=50, t_horizon=1001, seed=0)
+    out = calculate_tonyears_monte_carlo(
+        method, 100, 30, 0.02, results=results, chunk_size=20
+    )
+    expected = [
+        calculate_tonyears(method, results[:, run], 100, 30, 0.02) for run in range(50)
+    ]
+    for key in ["baseline_atm_cost", "benefit", "num_for_equivalence"]:
+        assert out[key].shape == (50,)
+        np.testing.assert_allclose(out[key], [e[key] for e in expected], rtol=1e-12)
+        assert list(out["summary"][key].index) == [30]
+
+    generated = calculate_tonyears_monte_carlo(method, 100, 30, 0.02, runs=50, seed=0)
+    np.testing.assert_allclose(generated["benefit"], out["benefit"], rtol=1e-12)
+
+
+def test_calculate_tonyears_monte_carlo_delays() -> None:
+    out = calculate_tonyears_monte_carlo(
+        "lashof", 100, [1, 30, 100], 0, runs=50, seed=0
+    )
+    assert out["benefit"].shape == (3, 50)
+    assert out["baseline_atm_cost"].shape == (50,)
+    summary = out["summary"]["num_for_equivalence"]
+    assert list(summary.index) == [1, 30, 100]
+    assert list(summary.columns) == ["mean", "-2sigma", "+2sigma", "5th", "95th"]
+
+
+def test_calculate_tonyears_monte_carlo_raises_invalid_args() -> None:
+    with pytest.raises(ValueError, match="No ton-year accounting method called foo"):
+        _ = calculate_tonyears_monte_carlo("foo", 100, 30, 0)
+
+    with pytest.raises(ValueError, match="number of runs must be >1"):
+        _ = calculate_tonyears_monte_carlo("mc", 100, 30, 0, runs=1)
+
+
+@pytest.mark.parametrize("curve_name", ["joos_2013", "ipcc_2007", "ipcc_2000"])
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+@pytest.mark.parametrize("discount_rate", [0, 0.033])
+def test_calculate_tonyears_analytic(curve_name, method, discount_rate) -> None:
+    analytic = calculate_tonyears(
+        method, curve_name, 100, 46, discount_rate, integration="analytic"
+    )
+    trapz = calculate_tonyears(
+        method, get_baseline_curve(curve_name), 100, 46, discount_rate
+    )
+    for key in ["baseline_atm_cost", "benefit", "num_for_equivalence"]:
+        assert isinstance(analytic[key], float)
+        np.testing.assert_allclose(analytic[key], trapz[key], rtol=5e-3)
+
+
+def test_calculate_tonyears_analytic_values() -> None:
+    params = ([0.5, 0.5], [0, 10])
+    m = calculate_tonyears("lashof", params, 100, 20, 0, integration="analytic")
+    cost = 0.5 * 100 + 0.5 * 10 * (1 - np.exp(-10))
+    remaining = 0.5 * 80 + 0.5 * 10 * (1 - np.exp(-8))
+    np.testing.assert_allclose(m["baseline_atm_cost"], cost)
+    np.testing.assert_allclose(m["benefit"], cost - remaining)
+
+    m = calculate_tonyears("mc", params, 100, 20, 0.05, integration="analytic")
+    np.testing.assert_allclose(m["benefit"], (1 - 1.05**-20) / np.log(1.05))
+
+
+def test_calculate_tonyears_analytic_grid_and_monte_carlo() -> None:
+    methods = ["mc", "lashof", "car", "qc"]
+    analytic = calculate_tonyears_grid(
+        methods, "joos_2013", [100, 1000], [1, 46], [0, 0.03], integration="analytic"
+    )
+    trapz = calculate_tonyears_grid(
+        methods, get_baseline_curve("joos_2013"), [100, 1000], [1, 46], [0, 0.03]
+    )
+    np.testing.assert_allclose(analytic["benefit"], trapz["benefit"], rtol=1e-2)
+
+    analytic = calculate_tonyears_monte_carlo(
+        "lashof", 100, 46, 0, runs=50, seed=0, integration="analytic"
+    )
+    trapz = calculate_tonyears_monte_carlo("lashof", 100, 46, 0, runs=50, seed=0)
+    np.testing.assert_allclose(analytic["benefit"], trapz["benefit"], rtol=1e-2)
+
+
+def test_calculate_tonyears_analytic_raises_invalid_args() -> None:
+    with pytest.raises(ValueError, match="Analytic integration needs IRF parameters"):
+        _ = calculate_tonyears("mc", np.arange(20), 10, 5, 0, integration="analytic")
+
+    with pytest.raises(ValueError, match="No integration method called foo"):
+        _ = calculate_tonyears("mc", np.arange(20), 10, 5, 0, integration="foo")
+
+
+def test_get_time_grid() -> None:
+    np.testing.assert_allclose(get_time_grid(3), [0, 1, 2, 3])
+    np.testing.assert_allclose(get_time_grid(2.5), [0, 1, 2, 2.5])
+    monthly = get_time_grid(10, dt=1 / 12)
+    assert len(monthly) == 121
+    np.testing.assert_allclose(np.diff(monthly), 1 / 12)
+
+    adaptive = get_time_grid(1000, dt=1 / 12, dt_max=10)
+    steps = np.diff(adaptive)
+    assert adaptive[0] == 0 and adaptive[-1] == 1000
+    assert steps[0] == pytest.approx(1 / 12)
+    assert np.all(steps <= 10 + 1e-9)
+    assert len(adaptive) < 1001
+
+    # steps that do not grow stay at dt rather than jumping to dt_max
+    np.testing.assert_allclose(
+        get_time_grid(100, dt=0.5, dt_max=10, growth=1), get_time_grid(100, dt=0.5)
+    )
+
+    with pytest.raises(ValueError):
+        get_time_grid(0)
+    with pytest.raises(ValueError):
+        get_time_grid(10, dt=0)
+    with pytest.raises(ValueError):
+        get_time_grid(10, dt=1, dt_max=0.5)
+    with pytest.raises(ValueError):
+        get_time_grid(10, dt=1, dt_max=5, growth=0.9)
+
+
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+@pytest.mark.parametrize("discount_rate", [0, 0.02])
+def test_calculate_tonyears_time_grid(method, discount_rate) -> None:
+    # annual time coordinates reproduce the default annual timesteps
+    expected = calculate_tonyears(method, "joos_2013", 100, 30, discount_rate)
+    time = np.arange(201)
+    baselines: list = ["joos_2013", get_baseline_curve("joos_2013", 201)]
+    for baseline in baselines:
+        result = calculate_tonyears(method, baseline, 100, 30, discount_rate, time=time)
+        for key in ["baseline_atm_cost", "benefit", "baseline", "scenario"]:
+            np.testing.assert_allclose(result[key], expected[key], rtol=1e-12)
+        np.testing.assert_array_equal(result["time"], np.arange(101))
+
+    # fine near t=0 and coarse in the tail, with fewer points than annual steps, and for
+    # delays that are not whole years
+    time = get_time_grid(1000, dt=1 / 12, dt_max=10)
+    for delay in [0.5, 30]:
+        exact = calculate_tonyears(
+            method, "joos_2013", 100, delay, discount_rate, integration="analytic"
+        )
+        result = calculate_tonyears(
+            method, "joos_2013", 100, delay, discount_rate, time=time
+        )
+        for key in ["baseline_atm_cost", "benefit"]:
+            np.testing.assert_allclose(result[key], exact[key], rtol=1e-4)
+
+    lazy = calculate_tonyears(
+        method, "joos_2013", 100, 30, discount_rate, time=time, lazy=True
+    )
+    assert isinstance(lazy, TonYearResult)
+    assert "time" in lazy and len(lazy) == 7
+    np.testing.assert_allclose(lazy["scenario"], result["scenario"])
+
+
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+def test_calculate_tonyears_continuous_discounting(method) -> None:
+    exact = calculate_tonyears(
+        method,
+        "joos_2013",
+        100,
+        30,
+        0.03,
+        integration="analytic",
+        continuous_discounting=True,
+    )
+    time = get_time_grid(100, dt=1 / 12)
+    result = calculate_tonyears(
+        method, "joos_2013", 100, 30, 0.03, time=time, continuous_discounting=True
+    )
+    np.testing.assert_allclose(result["benefit"], exact["benefit"], rtol=1e-5)
+    annual = calculate_tonyears(
+        method, "joos_2013", 100, 30, 0.03, continuous_discounting=True
+    )
+    np.testing.assert_allclose(annual["benefit"], exact["benefit"], rtol=5e-3)
+    np.testing.assert_allclose(
+        annual["baseline"],
+        get_baseline_curve("joos_2013", 101) * np.exp(-0.03 * time[::12]),
+    )
+
+
+def test_calculate_tonyears_time_grid_raises_invalid_args() -> None:
+    with pytest.raises(ValueError, match="increasing 1D array"):
+        calculate_tonyears("mc", "joos_2013", 10, 5, 0, time=[0, 2, 1, 20])
+    with pytest.raises(ValueError, match="cannot be longer than the time grid"):
+        calculate_tonyears("mc", "joos_2013", 100, 5, 0, time=np.arange(50))
+    with pytest.raises(ValueError, match="whole years"):
+        calculate_tonyears("mc", "joos_2013", 100, 0.5, 0)
+    with pytest.raises(ValueError, match="same length"):
+        calculate_tonyears("mc", np.ones(10), 10, 5, 0, time=np.arange(20))
+
+
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+@pytest.mark.parametrize("discount_rate", [0, 0.02])
+def test_calculate_delay_for_equivalence(method, discount_rate) -> None:
+    curve = get_baseline_curve("joos_2013")
+    delays = np.arange(1, 101)
+    ratios = TonYearIndex(curve, discount_rate).num_for_equivalence(method, 100, delays)
+
+    solved = calculate_delay_for_equivalence(method, curve, 100, discount_rate, ratios)
+    np.testing.assert_allclose(solved, delays, atol=1e-6)
+
+    # fractional delays fall between the whole-year delays on either side
+    middle = (ratios[:-1] + ratios[1:]) / 2
+    solved = calculate_delay_for_equivalence(
+        method, "joos_2013", 100, discount_rate, middle
+    )
+    assert np.all((solved > delays[:-1]) & (solved < delays[1:]))
+
+
+def test_calculate_delay_for_equivalence_unreachable() -> None:
+    solved = calculate_delay_for_equivalence(
+        "lashof", "joos_2013", 100, 0, [0.5, 0, -1]
+    )
+    assert np.all(np.isnan(solved))
+    assert np.ndim(calculate_delay_for_equivalence("car", "joos_2013", 100, 0, 2)) == 0
+    assert calculate_delay_for_equivalence(
+        "car", "joos_2013", 100, 0, 2
+    ) == pytest.approx(50)
+
+    index = TonYearIndex(joos_2013_monte_carlo(runs=3, t_horizon=101, seed=0)[1])
+    with pytest.raises(ValueError, match="single baseline curve"):
+        index.solve_delay("lashof", 100, 2)
+
+
+@pytest.mark.parametrize("method", ["mc", "lashof", "car", "qc"])
+def test_calculate_time_horizon_for_equivalence(method) -> None:
+    curve = get_baseline_curve("joos_2013")
+    time_horizons = np.arange(30, 1001)
+    ratios = TonYearIndex(curve).num_for_equivalence(method, time_horizons, 30)
+
+    solved = calculate_time_horizon_for_equivalence(method, curve, 30, 0, ratios)
+    np.testing.assert_allclose(solved, time_horizons, atol=1e-6)
+    assert np.isnan(calculate_time_horizon_for_equivalence(method, curve, 30, 0, 1e6))
+
+
+def test_import_is_lazy() -> None:
+    code = (
+        "import sys, tonyear; "
+        "assert not {'pandas', 'scipy'} & {m.split('.')[0] for m in sys.modules}; "
+        "tonyear.joos_2013_monte_carlo; "
+        "assert 'pandas' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+    assert "calculate_portfolio" in dir(tonyear)
+    with pytest.raises(AttributeError):
+        tonyear.foo
+
+
+@pytest.mark.parametrize("sampler", ["sobol", "lhs", "antithetic"])
+def test_joos_2013_monte_carlo_sampler(sampler) -> None:
+    summary, results = joos_2013_monte_carlo(
+        runs=256, t_horizon=101, seed=0, sampler=sampler
+    )
+    _, same = joos_2013_monte_carlo(runs=256, t_horizon=101, seed=0, sampler=sampler)
+    np.testing.assert_array_equal(results, same)
+    assert results.shape == (101, 256)
+
+    # stratified samples estimate the mean of the reference ensemble more precisely
+    reference, _ = joos_2013_monte_carlo(runs=100000, t_horizon=101, seed=1)
+    _, plain = joos_2013_monte_carlo(runs=256, t_horizon=101, seed=0)
+    error = np.abs(summary["mean"] - reference["mean"]).max()
+    assert error < np.abs(plain.mean(axis=1) - reference["mean"]).max()
+    assert error < 3 * standard_error(results, antithetic=sampler == "antithetic").max()
+
+    if sampler == "antithetic":
+        # pairs mirror each other about the mean of the log timescales
+        _, tau = sample_joos_2013_parameters(4, seed=0, sampler=sampler)
+        log_tau = np.log(tau[:, 1:])
+        assert np.allclose(log_tau[0::2] + log_tau[1::2], 2 * JOOS_2013_X[:3])
+
+
+@pytest.mark.parametrize("sampler", ["random", "sobol", "antithetic"])
+def test_iter_joos_2013_monte_carlo_sampler(sampler) -> None:
+    _, expected = joos_2013_monte_carlo(runs=64, t_horizon=11, seed=3, sampler=sampler)
+    chunks = iter_joos_2013_monte_carlo(
+        runs=64, t_horizon=11, chunk_size=16, seed=3, sampler=sampler
+    )
+    np.testing.assert_array_equal(np.concatenate(list(chunks), axis=1), expected)
+
+
+def test_monte_carlo_sampler_errors() -> None:
+    with pytest.raises(ValueError, match="No sampler called foo"):
+        joos_2013_monte_carlo(runs=10, sampler="foo")
+    with pytest.raises(ValueError, match="chunk_size must be even"):
+        list(iter_joos_2013_monte_carlo(runs=10, chunk_size=3, sampler="antithetic"))
+
+
+def test_calculate_tonyears_monte_carlo_standard_error() -> None:
+    out = calculate_tonyears_monte_carlo(
+        "lashof",
+        100,
+        [10, 50],
+        0,
+        runs=128,
+        seed=0,
+        sampler="sobol",
+        workers=1,
+        chunk_size=64,
+    )
+    same = calculate_tonyears_monte_carlo(
+        "lashof",
+        100,
+        [10, 50],
+        0,
+        runs=128,
+        seed=0,
+        sampler="sobol",
+        workers=2,
+        chunk_size=64,
+    )
+    np.testing.assert_array_equal(out["benefit"], same["benefit"])
+    errors = out["standard_error"]["num_for_equivalence"]
+    assert list(errors.index) == [10, 50]
+    np.testing.assert_allclose(
+        errors, np.std(out["num_for_equivalence"], axis=1, ddof=1) / np.sqrt(128)
+    )
+
+
+def test_standard_error_antithetic() -> None:
+    samples = np.array([[1.0, 3.0, 2.0, 6.0, 5.0]])
+    np.testing.assert_allclose(standard_error(samples, antithetic=True), [1.0])
+    np.testing.assert_allclose(
+        standard_error(samples), [np.std(samples, ddof=1) / np.sqrt(5)]
+    )
+    with pytest.raises(ValueError):
+        standard_error(np.ones(3), antithetic=True)